@@ -2,11 +2,28 @@ import pandas as pd
 import spacy
 import numpy as np
 from collections import Counter
-from bs4 import BeautifulSoup
+import os
 import re
 from datetime import datetime
 from keybert import KeyBERT
 
+from competency_registry import COMPETENCY_CATEGORIES, LATEST_TRENDS, REGISTRY
+from confidence_intervals import competency_share_table, required_sample_size
+from csv_loader import read_vacancy_csv
+from emerging_terms import EmergingTermDetector, known_phrases, print_emerging_terms
+from excel_export import export_competency_workbook
+from language_detection import LANGUAGES, detect_language
+from partitioned_store import load_partitions
+from result_writer import write_results
+from sampling import stratified_sample
+from skill_matcher import SkillMatcher
+from taxonomy import taxonomy_versions
+from text_cleaning import clean_html
+from text_sections import BoilerplateCache, section_texts
+from text_store import TextStore, read_vacancies
+from title_clustering import role_families
+from vacancy_columns import TEXT_COLUMN, posting_ids
+
 
 def filter_recent_descriptions(df):
     """Filter descriptions from 2020 onwards using datefound"""
@@ -31,6 +48,26 @@ def filter_recent_descriptions(df):
     return recent_df
 
 
+def load_recent_descriptions(partition_root, start='2020-01-01', end=None):
+    """
+    Load descriptions in a datefound window from the year/month partitions
+
+    Only the partitions overlapping the window are opened (see partitioned_store).
+    """
+    print(f"Loading descriptions from {start} onwards from {partition_root}...")
+    recent_df = load_partitions(partition_root, start=start, end=end)
+
+    print(f"Filtered dataset size ({start}+): {len(recent_df):,} descriptions")
+
+    # Show distribution by year
+    year_counts = recent_df['datefound'].dt.year.value_counts().sort_index()
+    print("\nDistribution by year:")
+    for year, count in year_counts.items():
+        print(f"{year}: {count:,} descriptions")
+
+    return recent_df
+
+
 class CompetencyExtractor:
     def __init__(self):
         """Initialize the competency extractor with necessary models and dictionaries"""
@@ -38,137 +75,146 @@ class CompetencyExtractor:
         self.nlp_nl = spacy.load("nl_core_news_lg")
         self.kw_model = KeyBERT()
 
-        # Define competency categories
-        self.competency_categories = {
-            'technical_marketing': [
-                # English terms
-                'digital marketing', 'social media', 'content marketing', 'seo', 'sea',
-                'google analytics', 'data analysis', 'marketing automation', 'crm',
-                'email marketing', 'growth hacking', 'conversion optimization',
-                # Dutch terms
-                'digitale marketing', 'sociale media', 'contentmarketing', 'zoekmachine optimalisatie',
-                'e-mailmarketing', 'marketing automatisering', 'klantrelatiebeheer',
-                'conversie optimalisatie', 'online marketing', 'digitale strategie',
-                'webanalytics', 'digitale advertising', 'performance marketing',
-                'marketing technologie', 'datagedreven marketing'
-            ],
-            'data_analytics': [
-                # English & Dutch terms
-                'sql', 'python', 'tableau', 'power bi', 'data visualization',
-                'predictive analytics', 'statistical analysis', 'segmentation',
-                'dataanalyse', 'data visualisatie', 'voorspellende analyse',
-                'statistische analyse', 'klantensegmentatie', 'rapportages',
-                'dashboards', 'data-analyse', 'klantinzichten', 'big data',
-                'machine learning', 'data science', 'a/b testing', 'google tag manager',
-                'google data studio', 'excel', 'spss', 'powerpoint'
-            ],
-            'strategic_skills': [
-                # English & Dutch terms
-                'strategische planning', 'marktonderzoek', 'concurrentieanalyse',
-                'merkmanagement', 'productmarketing', 'go-to-market strategie',
-                'customer journey', 'klantreis', 'waardepropositie',
-                'positionering', 'marketingstrategie', 'businessontwikkeling',
-                'strategisch inzicht', 'commercieel inzicht', 'marktinzicht',
-                'stakeholder management', 'budgetbeheer', 'roi'
-            ],
-            'creative_skills': [
-                # English & Dutch terms
-                'content creatie', 'copywriting', 'storytelling', 'visueel ontwerp',
-                'videoproductie', 'creative direction', 'creatieve richting',
-                'merkidentiteit', 'gebruikerservaring', 'grafisch ontwerp',
-                'adobe creative suite', 'photoshop', 'indesign', 'illustrator',
-                'wordpress', 'cms', 'videobewerking', 'fotografie'
-            ],
-            'ai_tools': [
-                # English & Dutch terms
-                'chatgpt', 'midjourney', 'dall-e', 'kunstmatige intelligentie',
-                'generatieve ai', 'ai copywriting', 'ai content', 'ai marketing',
-                'prompt engineering', 'ai automatisering', 'machine learning marketing',
-                'predictive modeling', 'ai strategie', 'ai implementatie'
-            ],
-            'soft_skills': [
-                # Dutch terms
-                'leiderschap', 'communicatie', 'samenwerking', 'projectmanagement',
-                'agile', 'scrum', 'stakeholdermanagement', 'presentatievaardigheden',
-                'analytisch denken', 'probleemoplossend vermogen', 'innovatie',
-                'teamwork', 'timemanagement', 'plannen en organiseren',
-                'zelfstandig werken', 'resultaatgericht', 'klantgericht',
-                'overtuigingskracht', 'ondernemerschap', 'flexibiliteit'
-            ],
-            'languages': [
-                'nederlands', 'english', 'duits', 'frans',
-                'dutch', 'german', 'french',
-                'moedertaal', 'vloeiend', 'uitstekende beheersing'
-            ]
+        self.competency_categories = COMPETENCY_CATEGORIES
+        self.latest_trends = LATEST_TRENDS
+
+        # Canonical competency ids; aliases of one concept map onto the same id
+        self.registry = REGISTRY
+        versions = ', '.join(f"{name} {version}" for name, version in taxonomy_versions().items())
+        print(f"Taxonomy versions: {versions}")
+        self.matcher = SkillMatcher.from_registry(self.registry, 'market', 'trends')
+
+        # Per-language matchers: shared terms plus the terms of one language.
+        # Mixed and unidentified postings use the full matcher.
+        self.language_matchers = {
+            language: SkillMatcher.cached(self.registry.alias_pairs('market', 'trends', language=language))
+            for language in LANGUAGES
         }
 
-        # Latest marketing trends in Dutch
-        self.latest_trends = [
-            'first-party data strategie',
-            'privacy-first marketing',
-            'ai-gedreven marketing automatisering',
-            'generatieve ai implementatie',
-            'zero-party data verzameling',
-            'contextuele advertenties',
-            'social commerce',
-            'marketing in het metaverse',
-            'voice search optimalisatie',
-            'verantwoord ai-gebruik',
-            'duurzaamheidsmarketing',
-            'influencer marketing automatisering',
-            'realtime personalisatie',
-            'crossplatform attributie',
-            'klantgegevensplatform beheer',
-            'marketing automation platform',
-            'customer data platform',
-            'privacywetgeving',
-            'gdpr compliance',
-            'cookieless tracking'
-        ]
+        # Repeated company blurbs per organization, skipped by section-aware extraction
+        self.boilerplate = BoilerplateCache()
+
+        # Competency shares with confidence intervals of the last analyze_descriptions run
+        self.share_table = None
 
     def clean_text(self, html_text):
         """Clean HTML and prepare text for analysis"""
-        if pd.isna(html_text):
-            return ""
-
-        # Remove HTML tags
-        soup = BeautifulSoup(html_text, 'html.parser')
-        text = soup.get_text()
-        text = re.sub(r'\s+', ' ', text)
-        return text.lower().strip()
+        return clean_html(html_text)
 
     def extract_competencies(self, text):
-        """Extract competencies using multiple techniques"""
-        competencies = []
+        """Extract competencies and return their registry ids (each id at most once)"""
+        return self.extract_with_language(text)[0]
+
+    def extract_with_language(self, text, emerging=None, date=None):
+        """
+        Extract competencies with the matcher of the posting's language
+
+        Returns (sorted registry ids, language) with language 'nl', 'en', 'mixed' or 'unknown'.
+        With an EmergingTermDetector the cleaned text is counted in the same pass.
+        """
         clean_text = self.clean_text(text)
+        if emerging is not None:
+            emerging.add(clean_text, date)
+        language = detect_language(clean_text)
+        matcher = self.language_matchers.get(language, self.matcher)
+
+        # Rule-based matching for known competencies and latest trends in one scan
+        return sorted(matcher.match(clean_text)), language
+
+    def extract_batch(self, texts):
+        """
+        Extract competencies for a batch of postings
+
+        Same result as extract_with_language per text, but the texts of one
+        language are matched together in a single scan (SkillMatcher.match_many).
+        Returns a list of (sorted registry ids, language).
+        """
+        clean_texts = [self.clean_text(text) for text in texts]
+        languages = [detect_language(clean_text) for clean_text in clean_texts]
+        positions = {}
+        for position, language in enumerate(languages):
+            positions.setdefault(language, []).append(position)
+
+        results = [None] * len(clean_texts)
+        for language, group in positions.items():
+            matcher = self.language_matchers.get(language, self.matcher)
+            for position, ids in zip(group, matcher.match_many(clean_texts[i] for i in group)):
+                results[position] = (sorted(ids), language)
+        return results
+
+    def extract_by_section(self, html_text, organization=None, emerging=None, date=None):
+        """
+        Extract competencies from the requirement and role sections only
+
+        The posting is segmented on its headings (see text_sections); company,
+        offer and contact sections and the organization's repeated boilerplate
+        are skipped. Returns (sorted registry ids, {id: section}, language); a
+        competency found in several sections is tagged with the first of
+        profile, role, other (intro for postings without headings).
+        """
+        sections = section_texts(html_text, organization, self.boilerplate)
+        if emerging is not None:
+            emerging.add('\n'.join(sections.values()), date)
+        language = detect_language(' '.join(sections.values()))
+        matcher = self.language_matchers.get(language, self.matcher)
+
+        hit_sections = {}
+        for section, ids in zip(sections, matcher.match_many(sections.values())):
+            for competency_id in ids:
+                hit_sections.setdefault(competency_id, section)
+        return sorted(hit_sections), hit_sections, language
+
+    def extract_from_corpus(self, corpus, rows=None):
+        """
+        Competency ids per posting of a TokenCorpus (default: all rows)
+
+        Terms are matched as token sequences on the memory-mapped corpus, so no
+        HTML is parsed; matching is on whole words and not routed per language.
+        """
+        return corpus.match_terms(self.registry.alias_pairs('market', 'trends'), rows)
+
+    def competency_records(self, competency_ids):
+        """Expand registry ids into readable competency dicts"""
+        return [
+            {
+                'competency': self.registry.name(competency_id),
+                'category': self.registry.category(competency_id),
+                'method': self.registry.method(competency_id)
+            }
+            for competency_id in competency_ids
+        ]
 
-        # Rule-based matching for known competencies
-        for category, skills in self.competency_categories.items():
-            for skill in skills:
-                if skill in clean_text:
-                    competencies.append({
-                        'competency': skill,
-                        'category': category,
-                        'method': 'rule-based'
-                    })
-
-        # Check for latest trends
-        for trend in self.latest_trends:
-            if trend in clean_text:
-                competencies.append({
-                    'competency': trend,
-                    'category': 'latest_trends',
-                    'method': 'trend_matching'
-                })
-
-        return competencies
-
-    def analyze_descriptions(self, df, sample_size=5000):
-        """Analyze a sample of job descriptions and extract competencies"""
+    def analyze_descriptions(self, df, sample_size=5000, result_writer=None, stratify_by=None, seed=42,
+                             section_aware=False, corpus=None, text_store=None, confidence=0.95,
+                             bootstrap_resamples=0, workers=1, emerging=None, group_by=None):
+        """
+        Analyze a sample of job descriptions and extract competencies
+
+        When a ResultWriter is given, the competencies of every posting are streamed
+        to it in long format while extracting. With stratify_by (e.g. 'datefound',
+        'physicallocationprovince' or 'positiontitlegeneralized') the sample is
+        balanced over the strata instead of following their sizes. With
+        section_aware only the requirement and role sections are matched and every
+        hit is tagged with its section (competency_sections column). With a
+        TokenCorpus the sample is matched on the corpus (whole tokens) when the corpus
+        contains every sampled posting; otherwise the whole sample is matched on the
+        HTML, so one sample never mixes the two matching semantics. Without a text column the HTML is fetched lazily in batches
+        from text_store (see text_store.split_text_column). Every '% of job posts'
+        comes with a Wilson interval; with bootstrap_resamples > 0 a bootstrap
+        interval is added as well, resampled over workers processes (None: all
+        cores). The share table is kept in self.share_table.
+        With an EmergingTermDetector the matched text of every posting is counted
+        per datefound bucket during extraction and the rising phrases are printed.
+        With group_by (e.g. 'role_family', see title_clustering) the top
+        competencies of the 10 largest groups are printed as well.
+        """
         print(f"Analyzing {sample_size} job descriptions...")
 
         # Take a random sample
-        sample_df = df.sample(n=min(sample_size, len(df)), random_state=42)
+        if stratify_by is not None:
+            sample_df = stratified_sample(df, sample_size, stratify_by=stratify_by, seed=seed)
+        else:
+            sample_df = df.sample(n=min(sample_size, len(df)), random_state=seed)
         processed_df = sample_df.copy()
 
         # Initialize empty competencies column
@@ -177,73 +223,182 @@ class CompetencyExtractor:
         # Process descriptions with progress updates
         total_descriptions = len(processed_df)
         competencies_list = []  # Store all competencies here first
+        languages = []
+        sections_list = []
+        ids = posting_ids(processed_df)
+        corpus_lists = None
+        if corpus is not None:
+            corpus_rows = corpus.index_of(ids)
+            found = int((corpus_rows >= 0).sum())
+            print(f"{found:,} of {total_descriptions:,} postings found in the token corpus")
+            if found == total_descriptions:
+                corpus_lists = self.extract_from_corpus(corpus, corpus_rows)
+            else:
+                print("Matching the whole sample on the HTML instead of the token corpus")
+
+        if corpus_lists is not None:
+            texts = [None] * total_descriptions
+        elif TEXT_COLUMN in processed_df.columns:
+            texts = processed_df[TEXT_COLUMN]
+        else:
+            texts = text_store.iter_texts(ids)
 
         print("Extracting competencies...")
-        for idx, row in enumerate(processed_df.iterrows(), 1):
+        rows = zip(ids, texts, processed_df.itertuples(index=False))
+        for idx, (posting_id, html_text, row) in enumerate(rows, 1):
             if idx % 100 == 0:  # Progress update every 100 descriptions
                 print(
                     f"Processing description {idx} of {total_descriptions}... ({(idx / total_descriptions) * 100:.1f}%)")
 
-            comps = self.extract_competencies(row[1]['selectedtextincludinghtml'])
+            date = getattr(row, 'datefound', None)
+            if corpus_lists is not None:
+                comps = corpus_lists[idx - 1]
+                corpus_text = corpus.posting_text(corpus_rows[idx - 1])
+                language = detect_language(corpus_text)
+                if emerging is not None:
+                    emerging.add(corpus_text, date)
+                if section_aware:
+                    sections_list.append([None] * len(comps))
+            elif section_aware:
+                comps, hit_sections, language = self.extract_by_section(
+                    html_text, getattr(row, 'organizationname', None), emerging=emerging, date=date)
+                sections_list.append([hit_sections[c] for c in comps])
+            else:
+                comps, language = self.extract_with_language(html_text, emerging=emerging, date=date)
             competencies_list.append(comps)
+            languages.append(language)
+            if result_writer is not None:
+                result_writer.write(posting_id, comps, sections=sections_list[-1] if section_aware else None)
 
         # Assign all competencies at once
         processed_df['competencies'] = competencies_list
+        processed_df['language'] = languages
+        if section_aware:
+            processed_df['competency_sections'] = sections_list
 
         # Analyze competency trends
         print("\nAnalyzing competency trends...")
-        all_competencies = []
-        for comp_list in processed_df['competencies']:
-            if isinstance(comp_list, list):  # Check if comp_list is valid
-                all_competencies.extend([c['competency'] for c in comp_list])
-
-        comp_counter = Counter(all_competencies)
+        all_competencies = np.fromiter(
+            (c for comp_list in competencies_list for c in comp_list), dtype=np.int32)
+        comp_counts = np.bincount(all_competencies, minlength=len(self.registry))
 
         # Print results
         print("\n=== Competency Analysis Results ===")
         print(f"Total job descriptions analyzed: {len(processed_df):,}")
+        matched_on = 'token corpus' if corpus_lists is not None else 'HTML'
+        print(f"Matched on the {matched_on}: {len(processed_df):,} postings")
         print(f"Total competencies found: {len(all_competencies):,}")
         print(f"Average competencies per description: {len(all_competencies) / len(processed_df):.1f}")
 
-        # Overall top competencies
-        print("\nTop 50 most mentioned competencies:")
-        for comp, count in comp_counter.most_common(50):
-            percentage = (count / len(processed_df)) * 100
-            print(f"{comp}: {count:,} mentions ({percentage:.1f}% of job posts)")
+        # Posting languages; English-language vacancies are tracked as a trend
+        print("\nPostings by language:")
+        for language, count in processed_df['language'].value_counts().items():
+            print(f"{language}: {count:,} postings ({count / len(processed_df) * 100:.1f}%)")
+        if 'datefound' in processed_df.columns:
+            years = pd.to_datetime(processed_df['datefound'], errors='coerce').dt.year
+            english_share = (processed_df['language'] == 'en').groupby(years).mean()
+            print("\nShare of English-language postings per year:")
+            for year, share in english_share.items():
+                print(f"{int(year)}: {share * 100:.1f}%")
+
+        if section_aware:
+            section_counts = Counter(section for sections in sections_list for section in sections)
+            print("\nCompetency mentions by posting section:")
+            for section, count in section_counts.most_common():
+                print(f"{section}: {count:,} mentions")
+            print(f"Boilerplate blocks skipped: {self.boilerplate.skipped:,}")
+
+        # Overall top competencies with confidence intervals
+        share_table = competency_share_table(competencies_list, self.registry, n_resamples=bootstrap_resamples,
+                                             confidence=confidence, seed=seed, workers=workers)
+        self.share_table = share_table
+        level = f"{confidence * 100:.0f}%"
+        print(f"\nTop 50 most mentioned competencies ({level} Wilson interval"
+              f"{f', {bootstrap_resamples:,} bootstrap resamples' if bootstrap_resamples else ''}):")
+        top = share_table.head(50)
+        for row in top.itertuples(index=False):
+            interval = f"{level} CI {row.wilson_low * 100:.1f}-{row.wilson_high * 100:.1f}%"
+            if bootstrap_resamples:
+                interval += f", bootstrap {row.bootstrap_low * 100:.1f}-{row.bootstrap_high * 100:.1f}%"
+            print(f"{row.competency}: {row.postings:,} mentions ({row.share * 100:.1f}% of job posts, {interval})")
+
+        # Precision of the sample, to justify the sample size
+        if len(top):
+            widest = ((top['wilson_high'] - top['wilson_low']) / 2).max()
+            worst_share = top['share'].iloc[(top['share'] - 0.5).abs().argmin()]
+            print(f"Widest {level} margin in the top 50: +/- {widest * 100:.1f} percentage points")
+            for margin in (0.02, 0.01):
+                needed = required_sample_size(worst_share, margin, confidence)
+                print(f"Postings needed for +/- {margin * 100:.0f} points at {worst_share * 100:.1f}%: {needed:,}")
 
         # Analyze by category
         print("\n=== Competencies by Category ===")
         category_counts = Counter()
-        for comp_list in processed_df['competencies']:
-            if isinstance(comp_list, list):  # Check if comp_list is valid
-                categories = [c['category'] for c in comp_list]
-                category_counts.update(categories)
+        for competency_id in np.flatnonzero(comp_counts):
+            category_counts[self.registry.category(competency_id)] += int(comp_counts[competency_id])
 
         for category, count in category_counts.most_common():
             percentage = (count / len(processed_df)) * 100
             print(f"{category}: {count:,} mentions ({percentage:.1f}% of job posts)")
 
+        if group_by is not None and group_by in processed_df.columns:
+            print(f"\n=== Top Competencies by {group_by} ===")
+            for group in processed_df[group_by].value_counts().head(10).index:
+                group_df = processed_df[processed_df[group_by] == group]
+                group_counts = np.bincount(
+                    np.fromiter((c for comp_list in group_df['competencies'] for c in comp_list), dtype=np.int32),
+                    minlength=len(self.registry))
+                print(f"\n{group} ({len(group_df):,} positions):")
+                for competency_id in np.argsort(-group_counts, kind='stable')[:10]:
+                    if group_counts[competency_id] == 0:
+                        break
+                    percentage = group_counts[competency_id] / len(group_df) * 100
+                    print(f"- {self.registry.name(competency_id)}: {percentage:.1f}% of job posts")
+
+        if emerging is not None:
+            print_emerging_terms(emerging.emerging())
+
         return processed_df
 
 
 if __name__ == "__main__":
     # File paths
     input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions.csv"
-    output_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/marketing_positions_2020_digital_agencies.csv" #
-
-    # Load and filter dataset
-    print("Loading dataset...")
-    df = pd.read_csv(input_file)
-    recent_df = filter_recent_descriptions(df)
-
-    # Initialize and run analysis
+    output_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/marketing_positions_2020_digital_agencies.parquet"
+    excel_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/marketing_positions_2020_digital_agencies.xlsx"
+    partition_root = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions_by_month"
+    text_store_dir = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions_text_store"
+
+    # Load and filter dataset; with a partitioned copy only the 2020+ partitions are read,
+    # with a text store only the metadata is loaded and the HTML of the sample is fetched lazily
+    text_store = None
+    if os.path.isdir(partition_root):
+        recent_df = load_recent_descriptions(partition_root, start='2020-01-01')
+    elif os.path.isdir(text_store_dir):
+        text_store = TextStore(text_store_dir)
+        recent_df = filter_recent_descriptions(read_vacancies(text_store_dir))
+    else:
+        print("Loading dataset...")
+        df = read_vacancy_csv(input_file)
+        recent_df = filter_recent_descriptions(df)
+
+    # Group title variants into role families for the per-family results
+    recent_df['role_family'] = role_families(recent_df['positiontitle'])
+
+    # Initialize and run analysis; new phrases outside the taxonomies are tracked per quarter in the same pass
     extractor = CompetencyExtractor()
-    df_with_competencies = extractor.analyze_descriptions(recent_df, sample_size=5000)
+    emerging = EmergingTermDetector(known_phrases(extractor.registry))
+    df_with_competencies = extractor.analyze_descriptions(
+        recent_df, sample_size=5000, stratify_by='datefound', section_aware=True, text_store=text_store,
+        bootstrap_resamples=1000, workers=None, emerging=emerging, group_by='role_family')
 
-    # Save results
-    df_with_competencies.to_csv(output_file, index=False)
+    # Save results: one row per (posting, competency) plus a slim postings table without the HTML
+    write_results(df_with_competencies, output_file, slim=True)
     print(f"\nResults saved to {output_file}")
 
+    # Same results for the stakeholders in Excel, with the share table (incl. bootstrap intervals) as summary
+    export_competency_workbook(df_with_competencies, excel_file, share_table=extractor.share_table)
+
     # Print some additional statistics
     print("\n=== Additional Statistics ===")
     print("\nCompetencies per job title type:")
@@ -0,0 +1,280 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from competency_registry import REGISTRY, check_registry, registry_state
+from dataset_marketing_agencies import DIGITAL_AGENCIES
+from vacancy_columns import DATE_COLUMN, posting_ids
+
+# Cube dimensions and the source columns they come from
+DIMENSIONS = ('organization', 'year', 'month', 'province', 'title')
+SOURCE_COLUMNS = {
+    'organization': 'organizationname',
+    'province': 'physicallocationprovince',
+    'title': 'positiontitlegeneralized',
+}
+
+
+def _counts_by_code(codes, values, size):
+    """Sum of values per code in a dense array of the given size"""
+    return np.bincount(codes, weights=values, minlength=size).astype(np.int64)
+
+
+class CompetencyCube:
+    """
+    Materialized aggregate of competency mentions per posting segment
+
+    A cell is one combination of organization, datefound year and month,
+    province and generalized title; it stores the number of postings, the
+    number of postings mentioning every competency and the number of postings
+    mentioning at least one competency of every category. Agency categories are
+    resolved to organizations at query time, so agencies listed in several
+    categories are never double counted in roll-ups over all postings.
+
+    Mentions are kept sorted by competency (and category), so a slice or
+    roll-up only touches the cells of the requested term. The cube grows with
+    add(); posting ids already in the cube are skipped, so overlapping batches
+    can be added safely.
+
+    Parameters:
+    registry (CompetencyRegistry): Registry used to resolve competency names and categories
+    agency_categories (dict): Agency category -> organization names
+    """
+
+    def __init__(self, registry=REGISTRY, agency_categories=DIGITAL_AGENCIES):
+        self.registry = registry
+        self.agency_categories = agency_categories
+        self.categories = sorted({c for c in registry.categories if c is not None})
+        self.term_category = np.array([self.categories.index(c) if c is not None else -1
+                                       for c in registry.categories])
+
+        self.cells = pd.DataFrame({dim: pd.Series(dtype=object) for dim in DIMENSIONS}).assign(postings=0)
+        self.hits = pd.DataFrame({'cell': [], 'competency': [], 'postings': []}, dtype=np.int64)
+        self.category_hits = pd.DataFrame({'cell': [], 'category': [], 'postings': []}, dtype=np.int64)
+        self.seen = set()
+        self._compiled = None
+
+    def __len__(self):
+        return len(self.cells)
+
+    def _dimensions(self, df):
+        """Dimension values per posting; missing values become 'unknown' (year and month 0)"""
+        dates = pd.to_datetime(df[DATE_COLUMN], errors='coerce')
+        dims = pd.DataFrame({
+            'year': dates.dt.year.fillna(0).astype(int).to_numpy(),
+            'month': dates.dt.month.fillna(0).astype(int).to_numpy(),
+        })
+        for dim, column in SOURCE_COLUMNS.items():
+            values = df[column] if column in df.columns else pd.Series(None, index=df.index)
+            dims[dim] = values.fillna('unknown').astype(str).to_numpy()
+        return dims[list(DIMENSIONS)]
+
+    def add(self, df, competency_column='competencies'):
+        """
+        Add analysed postings (analyze_descriptions output or read_competency_lists)
+
+        Needs datefound and the competency lists; organization, province and
+        title columns are used when present.
+        """
+        ids = posting_ids(df).astype(str).to_numpy()
+        new = ~pd.Series(ids).duplicated().to_numpy() & ~np.isin(ids, list(self.seen))
+        df = df[new]
+        if len(df) == 0:
+            print("Cube: no new postings")
+            return
+        self.seen.update(ids[new].tolist())
+
+        dims = self._dimensions(df)
+        posting_cell = dims.groupby(list(DIMENSIONS), sort=False).ngroup().to_numpy()
+        batch_cells = dims.groupby(list(DIMENSIONS), sort=False).size().rename('postings').reset_index()
+
+        # (cell, competency) and (cell, category) presence counts of the batch
+        comp_lists = df[competency_column].to_numpy()
+        lengths = np.fromiter((len(c) for c in comp_lists), dtype=np.int64, count=len(comp_lists))
+        posting_idx = np.repeat(np.arange(len(comp_lists)), lengths)
+        comp_ids = np.fromiter((c for comp_list in comp_lists for c in comp_list), dtype=np.int64,
+                               count=int(lengths.sum()))
+        batch_hits = self._pair_counts(posting_cell[posting_idx], comp_ids, 'competency')
+        categories = self.term_category[comp_ids]
+        category_pairs = np.unique(np.stack([posting_idx, categories])[:, categories >= 0], axis=1)
+        batch_category_hits = self._pair_counts(posting_cell[category_pairs[0]], category_pairs[1], 'category')
+
+        # Merge with the existing cells: cells with equal dimensions get one new id
+        combined = pd.concat([self.cells, batch_cells], ignore_index=True)
+        merged_id = combined.groupby(list(DIMENSIONS), sort=False).ngroup().to_numpy()
+        old_id, new_id = merged_id[:len(self.cells)], merged_id[len(self.cells):]
+        self.cells = combined.groupby(merged_id).agg(
+            {**{dim: 'first' for dim in DIMENSIONS}, 'postings': 'sum'}).reset_index(drop=True)
+        self.hits = self._merge_pairs(self.hits, old_id, batch_hits, new_id, 'competency')
+        self.category_hits = self._merge_pairs(self.category_hits, old_id, batch_category_hits, new_id, 'category')
+        self._compiled = None
+        print(f"Cube: added {len(df):,} postings, {len(self.cells):,} cells, {len(self.hits):,} mention counts")
+
+    @staticmethod
+    def _pair_counts(cells, keys, key_name):
+        pairs, counts = np.unique(np.stack([cells, keys]), axis=1, return_counts=True)
+        return pd.DataFrame({'cell': pairs[0], key_name: pairs[1], 'postings': counts})
+
+    @staticmethod
+    def _merge_pairs(old, old_id, batch, new_id, key_name):
+        old = old.assign(cell=old_id[old['cell'].to_numpy()]) if len(old) else old
+        batch = batch.assign(cell=new_id[batch['cell'].to_numpy()])
+        merged = pd.concat([old, batch], ignore_index=True)
+        return merged.groupby(['cell', key_name], as_index=False)['postings'].sum().astype(np.int64)
+
+    def _compile(self):
+        """Sort the mention counts by competency/category for slicing"""
+        if self._compiled is None:
+            compiled = {}
+            for name, table, key, size in (('competency', self.hits, 'competency', len(self.registry)),
+                                           ('category', self.category_hits, 'category', len(self.categories))):
+                table = table.sort_values([key, 'cell'], kind='stable')
+                keys = table[key].to_numpy()
+                compiled[name] = (
+                    np.searchsorted(keys, np.arange(size + 1)),
+                    table['cell'].to_numpy(),
+                    table['postings'].to_numpy(),
+                )
+            self._compiled = compiled
+        return self._compiled
+
+    def _cell_mask(self, agency_category=None, organization=None, year=None, month=None, province=None, title=None):
+        """Cells matching every given filter (a value or a list of values)"""
+        mask = np.ones(len(self.cells), dtype=bool)
+        if agency_category is not None:
+            categories = [agency_category] if isinstance(agency_category, str) else agency_category
+            agencies = [a for category in categories for a in self.agency_categories[category]]
+            mask &= self.cells['organization'].isin(agencies).to_numpy()
+        for dim, value in (('organization', organization), ('year', year), ('month', month),
+                           ('province', province), ('title', title)):
+            if value is not None:
+                values = [value] if isinstance(value, (str, int, np.integer)) else list(value)
+                mask &= self.cells[dim].isin(values).to_numpy()
+        return mask
+
+    def _mention_counts(self, competency=None, category=None):
+        """Postings mentioning the competency (or category) per cell"""
+        if competency is not None:
+            competency_id = (competency if isinstance(competency, (int, np.integer))
+                             else self.registry.lookup(competency))
+            if competency_id is None:
+                raise KeyError(f"Unknown competency {competency!r}")
+            starts, cells, counts = self._compile()['competency']
+            key = competency_id
+        elif category is not None:
+            starts, cells, counts = self._compile()['category']
+            key = self.categories.index(category)
+        else:
+            return self.cells['postings'].to_numpy()
+        return _counts_by_code(cells[starts[key]:starts[key + 1]], counts[starts[key]:starts[key + 1]],
+                               len(self.cells))
+
+    def share(self, competency=None, category=None, **filters):
+        """
+        Postings, postings mentioning the term and their share in one slice
+
+        Example: cube.share(category='ai_tools', agency_category='seo_sea_agencies',
+        province='Utrecht', year=2021)
+        """
+        mask = self._cell_mask(**filters)
+        postings = int(self.cells['postings'].to_numpy()[mask].sum())
+        mentions = int(self._mention_counts(competency, category)[mask].sum())
+        return {'postings': postings, 'mentions': mentions, 'share': mentions / postings if postings else float('nan')}
+
+    def rollup(self, by, competency=None, category=None, **filters):
+        """
+        Postings, mentions and share per group of dimensions
+
+        by may contain 'agency_category'; an agency in several categories then
+        counts in each of them.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        mask = self._cell_mask(**filters)
+        table = self.cells[mask].copy()
+        table['mentions'] = self._mention_counts(competency, category)[mask]
+
+        if 'agency_category' in by:
+            agency_category = {}
+            for category_name, agencies in self.agency_categories.items():
+                for agency in agencies:
+                    agency_category.setdefault(agency, []).append(category_name)
+            table['agency_category'] = table['organization'].map(agency_category)
+            table = table.explode('agency_category').dropna(subset=['agency_category'])
+
+        result = table.groupby(by, as_index=False)[['postings', 'mentions']].sum()
+        result['share'] = result['mentions'] / result['postings']
+        return result
+
+    def top_competencies(self, n=20, **filters):
+        """Competencies mentioned in most postings of a slice"""
+        mask = self._cell_mask(**filters)
+        starts, cells, counts = self._compile()['competency']
+        selected = mask[cells]
+        competency_of = np.repeat(np.arange(len(starts) - 1), np.diff(starts))
+        totals = _counts_by_code(competency_of[selected], counts[selected], len(starts) - 1)
+        postings = int(self.cells['postings'].to_numpy()[mask].sum())
+        order = np.argsort(-totals, kind='stable')[:n]
+        return pd.DataFrame({
+            'competency': [self.registry.name(i) for i in order],
+            'category': [self.registry.category(i) for i in order],
+            'postings': totals[order],
+            'share': totals[order] / postings if postings else np.nan,
+        })
+
+    def save(self, cube_dir):
+        """Store the cube as dictionary-encoded Parquet tables"""
+        os.makedirs(cube_dir, exist_ok=True)
+        cells = self.cells.astype({dim: 'category' for dim in ('organization', 'province', 'title')})
+        cells.astype({'year': np.int16, 'month': np.int8, 'postings': np.int64}).to_parquet(
+            os.path.join(cube_dir, 'cells.parquet'), index=False)
+        self.hits.astype({'cell': np.int32, 'competency': np.int32, 'postings': np.int32}).to_parquet(
+            os.path.join(cube_dir, 'hits.parquet'), index=False)
+        self.category_hits.astype({'cell': np.int32, 'category': np.int16, 'postings': np.int32}).to_parquet(
+            os.path.join(cube_dir, 'category_hits.parquet'), index=False)
+        pd.DataFrame({'posting_id': sorted(self.seen)}).to_parquet(
+            os.path.join(cube_dir, 'postings.parquet'), index=False)
+        with open(os.path.join(cube_dir, 'cube.json'), 'w', encoding='utf-8') as f:
+            json.dump({'categories': self.categories, **registry_state(self.registry)}, f, ensure_ascii=False)
+        print(f"Cube saved to {cube_dir}")
+
+    @classmethod
+    def load(cls, cube_dir, registry=REGISTRY, agency_categories=DIGITAL_AGENCIES):
+        """Load a saved cube; more postings can be added afterwards"""
+        cube = cls(registry, agency_categories)
+        with open(os.path.join(cube_dir, 'cube.json'), encoding='utf-8') as f:
+            state = json.load(f)
+        check_registry(state, registry, 'cube')
+
+        cells = pd.read_parquet(os.path.join(cube_dir, 'cells.parquet'))
+        cube.cells = cells.astype({'organization': object, 'province': object, 'title': object,
+                                   'year': int, 'month': int, 'postings': np.int64})
+        cube.hits = pd.read_parquet(os.path.join(cube_dir, 'hits.parquet')).astype(np.int64)
+        category_hits = pd.read_parquet(os.path.join(cube_dir, 'category_hits.parquet')).astype(np.int64)
+        # Category codes follow the sorted category list, which may have grown
+        mapping = np.array([cube.categories.index(c) for c in state['categories']], dtype=np.int64)
+        cube.category_hits = category_hits.assign(category=mapping[category_hits['category'].to_numpy()])
+        cube.seen = set(pd.read_parquet(os.path.join(cube_dir, 'postings.parquet'))['posting_id'])
+        return cube
+
+
+if __name__ == "__main__":
+    from result_writer import read_competency_lists
+
+    # File paths
+    results_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/marketing_positions_2020_digital_agencies.parquet"
+    cube_dir = "/Users/dennishagen/Desktop/Verzameldocumenten master/competency_cube"
+
+    # Build or extend the cube from the saved extraction results
+    cube = CompetencyCube.load(cube_dir) if os.path.isdir(cube_dir) else CompetencyCube()
+    cube.add(read_competency_lists(results_file))
+    cube.save(cube_dir)
+
+    # Example questions
+    result = cube.share(category='ai_tools', agency_category='seo_sea_agencies', province='Utrecht', year=2021)
+    print(f"\nai_tools at seo_sea_agencies in Utrecht in 2021: {result['mentions']:,} of "
+          f"{result['postings']:,} postings ({result['share'] * 100:.1f}%)")
+
+    print("\nai_tools share per agency category and year:")
+    print(cube.rollup(['agency_category', 'year'], category='ai_tools').to_string(index=False))
@@ -0,0 +1,180 @@
+import re
+
+import pandas as pd
+
+from taxonomy import cached, content_hash, load_taxonomy, taxonomy_hash
+
+
+# Term lists live in versioned taxonomy files (taxonomy/*.json), so changing a term needs no code change
+_MARKET = load_taxonomy('market')
+_CURRICULUM = load_taxonomy('curriculum')
+_ALIASES = load_taxonomy('aliases')
+
+# Competency categories searched for in vacancy texts
+COMPETENCY_CATEGORIES = _MARKET['competency_categories']
+
+# Latest marketing trends in Dutch
+LATEST_TRENDS = _MARKET['latest_trends']
+
+# HU curriculum soft skills and competencies (used by extract_hu_website)
+SOFT_SKILLS = _CURRICULUM['soft_skills']
+COMPETENCIES = _CURRICULUM['competencies']
+
+# Spelling variants and Dutch/English translations of the same competency.
+# The first term of every group is the canonical name.
+ALIAS_GROUPS = _ALIASES['alias_groups']
+
+# Aliases that only occur in one language. Everything else (tool names, loanwords
+# like 'seo' or 'customer journey') is shared and matched in postings of both languages.
+ENGLISH_ALIASES = set(_ALIASES['english_aliases'])
+DUTCH_ALIASES = set(_ALIASES['dutch_aliases'])
+
+
+def alias_language(alias):
+    """'en' or 'nl' for aliases used in one language only, otherwise 'shared'"""
+    if alias in ENGLISH_ALIASES:
+        return 'en'
+    if alias in DUTCH_ALIASES:
+        return 'nl'
+    return 'shared'
+
+
+# Category given to curriculum terms that the vacancy taxonomy does not contain
+CURRICULUM_CATEGORIES = {
+    'hu_soft_skills': SOFT_SKILLS,
+    'hu_competencies': COMPETENCIES,
+}
+
+
+def normalize_term(term):
+    """Map spelling variants of a term onto one key ('data-analyse' and 'dataanalyse' -> 'dataanalyse')"""
+    return re.sub(r'[\s\-_/]+', '', str(term).lower())
+
+
+class CompetencyRegistry:
+    """
+    Canonical competency registry
+
+    Every concept has an integer id, a canonical name, a category and a set of
+    aliases (spelling variants and Dutch/English translations). Each concept also
+    records which taxonomies ('market', 'trends', 'hu_soft_skills', 'hu_competencies')
+    look for it, so every extractor can pick its own subset of the shared id space.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.categories = []
+        self.aliases = []
+        self.sources = []
+        self.alias_index = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, term):
+        """Return the id of a term or one of its aliases, or None"""
+        return self.alias_index.get(normalize_term(term))
+
+    def register(self, term, category=None, source=None, aliases=()):
+        """Register a term (and its aliases) and return the concept id"""
+        competency_id = self.lookup(term)
+        if competency_id is None:
+            for alias in aliases:
+                competency_id = self.lookup(alias)
+                if competency_id is not None:
+                    break
+        if competency_id is None:
+            competency_id = len(self.names)
+            self.names.append(term)
+            self.categories.append(category)
+            self.aliases.append(set())
+            self.sources.append(set())
+        elif self.categories[competency_id] is None:
+            self.categories[competency_id] = category
+
+        for alias in (term, *aliases):
+            self.aliases[competency_id].add(alias)
+            self.alias_index.setdefault(normalize_term(alias), competency_id)
+        if source is not None:
+            self.sources[competency_id].add(source)
+        return competency_id
+
+    def name(self, competency_id):
+        return self.names[competency_id]
+
+    def category(self, competency_id):
+        return self.categories[competency_id]
+
+    def method(self, competency_id):
+        """Extraction method label used in reports"""
+        return 'trend_matching' if self.categories[competency_id] == 'latest_trends' else 'rule-based'
+
+    def ids_for(self, *sources):
+        """Ids of all concepts used by any of the given taxonomies"""
+        return [i for i, concept_sources in enumerate(self.sources) if concept_sources & set(sources)]
+
+    def alias_pairs(self, *sources, language=None):
+        """
+        (alias, id) pairs to match for the given taxonomies, in registry order
+
+        With language ('nl' or 'en') the aliases of the other language are left out;
+        shared aliases are always kept.
+        """
+        return [
+            (alias, i) for i in self.ids_for(*sources) for alias in sorted(self.aliases[i])
+            if language is None or alias_language(alias) in (language, 'shared')
+        ]
+
+    def alias_table(self):
+        """One row per alias with its concept id, canonical name and category"""
+        rows = [
+            {'alias': alias, 'id': i, 'name': self.names[i], 'category': self.categories[i],
+             'language': alias_language(alias)}
+            for i in range(len(self.names)) for alias in sorted(self.aliases[i])
+        ]
+        return pd.DataFrame(rows)
+
+
+def build_registry():
+    """Build the registry from the vacancy, trend and curriculum taxonomies"""
+    registry = CompetencyRegistry()
+    alias_lookup = {normalize_term(alias): group for group in ALIAS_GROUPS for alias in group}
+
+    def register(term, category, source):
+        group = alias_lookup.get(normalize_term(term), [term])
+        competency_id = registry.register(group[0], category, source, aliases=group)
+        registry.register(term, category, source)
+        return competency_id
+
+    for category, terms in COMPETENCY_CATEGORIES.items():
+        for term in terms:
+            register(term, category, 'market')
+    for term in LATEST_TRENDS:
+        register(term, 'latest_trends', 'trends')
+    for category, terms in CURRICULUM_CATEGORIES.items():
+        for term in terms:
+            register(term, category, category)
+    return registry
+
+
+def registry_state(registry):
+    """Fingerprint of the id space, stored next to counts or vectors indexed by competency id"""
+    return {'n_competencies': len(registry), 'registry_hash': content_hash(registry.names)}
+
+
+def check_registry(state, registry, what):
+    """
+    Raise when data saved with registry_state no longer fits the registry
+
+    Competencies appended to the registry since then are allowed (they start at
+    zero); renamed, removed or re-numbered competencies are not.
+    """
+    n_competencies = state.get('n_competencies')
+    if (n_competencies is None or n_competencies > len(registry)
+            or state.get('registry_hash') != content_hash(registry.names[:n_competencies])):
+        raise ValueError(f"The competency registry changed since the {what} was built; rebuild the {what}")
+    return n_competencies
+
+
+# Built once per taxonomy content; later processes load the pickled registry
+REGISTRY = cached(f"registry-{taxonomy_hash(('market', 'curriculum', 'aliases'))}", build_registry)
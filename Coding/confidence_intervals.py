@@ -0,0 +1,98 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+def presence_matrix(competency_lists, n_terms):
+    """Posting x competency 0/1 matrix (float32) from lists of competency ids"""
+    lengths = np.fromiter((len(c) for c in competency_lists), dtype=np.int64, count=len(competency_lists))
+    rows = np.repeat(np.arange(len(competency_lists)), lengths)
+    cols = np.fromiter((c for comp_list in competency_lists for c in comp_list), dtype=np.int64,
+                       count=int(lengths.sum()))
+    presence = np.zeros((len(competency_lists), n_terms), dtype=np.float32)
+    presence[rows, cols] = 1
+    return presence
+
+
+def wilson_interval(counts, n, confidence=0.95):
+    """Wilson score interval for counts out of n, for all terms at once"""
+    counts = np.asarray(counts, dtype=np.float64)
+    if n == 0:
+        return np.full(counts.shape, np.nan), np.full(counts.shape, np.nan)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    share = counts / n
+    denominator = 1 + z ** 2 / n
+    centre = (share + z ** 2 / (2 * n)) / denominator
+    half_width = z * np.sqrt(share * (1 - share) / n + z ** 2 / (4 * n ** 2)) / denominator
+    return np.clip(centre - half_width, 0, 1), np.clip(centre + half_width, 0, 1)
+
+
+def _bootstrap_shares(presence, n_resamples, seed):
+    """Shares of every term in n_resamples bootstrap resamples (resamples x terms)"""
+    rng = np.random.default_rng(seed)
+    n = presence.shape[0]
+    # Resampling postings with replacement = multinomial posting weights
+    weights = rng.multinomial(n, np.full(n, 1 / n), size=n_resamples).astype(np.float32)
+    return (weights @ presence) / n
+
+
+def bootstrap_interval(presence, n_resamples=1000, confidence=0.95, seed=42, workers=1, batch_size=100):
+    """
+    Percentile bootstrap interval of every term's share
+
+    Resamples are drawn as multinomial weight vectors over the postings, so one
+    matrix product gives the shares of all terms in a whole batch of resamples.
+    Batches get independent seeds from one SeedSequence and can run in
+    parallel processes; the result does not depend on the number of workers.
+    """
+    n_batches = -(-n_resamples // batch_size)
+    sizes = [min(batch_size, n_resamples - i * batch_size) for i in range(n_batches)]
+    seeds = np.random.SeedSequence(seed).spawn(n_batches)
+
+    if workers == 1:
+        samples = [_bootstrap_shares(presence, size, s) for size, s in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            samples = list(pool.map(_bootstrap_shares, [presence] * n_batches, sizes, seeds))
+    samples = np.concatenate(samples)
+
+    alpha = 1 - confidence
+    low, high = np.quantile(samples, [alpha / 2, 1 - alpha / 2], axis=0)
+    return low, high
+
+
+def required_sample_size(share, margin, confidence=0.95):
+    """Postings needed to estimate a share within +/- margin (normal approximation)"""
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return int(np.ceil(z ** 2 * share * (1 - share) / margin ** 2))
+
+
+def competency_share_table(competency_lists, registry, n_resamples=0, confidence=0.95, seed=42, workers=1):
+    """
+    Share of postings per competency with confidence intervals
+
+    The Wilson interval is always computed; with n_resamples > 0 a bootstrap
+    interval is added. Only competencies found at least once are listed.
+    """
+    presence = presence_matrix(competency_lists, len(registry))
+    n = presence.shape[0]
+    counts = presence.sum(axis=0).astype(np.int64)
+    wilson_low, wilson_high = wilson_interval(counts, n, confidence)
+
+    table = pd.DataFrame({
+        'competency_id': np.arange(len(registry)),
+        'competency': registry.names,
+        'category': registry.categories,
+        'postings': counts,
+        'share': counts / n if n else np.nan,
+        'wilson_low': wilson_low,
+        'wilson_high': wilson_high,
+    })
+    if n_resamples and n:
+        table['bootstrap_low'], table['bootstrap_high'] = bootstrap_interval(
+            presence, n_resamples, confidence, seed, workers)
+    table = table[table['postings'] > 0]
+    return table.sort_values('postings', ascending=False, kind='stable').reset_index(drop=True)
@@ -0,0 +1,176 @@
+import csv
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+# Default engine of all loaders; 'pandas' gives the single-threaded pd.read_csv
+CSV_ENGINE = 'pyarrow'
+
+# Values pd.read_csv reads as missing, so both engines give the same NaNs
+NA_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A',
+    'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]
+
+
+def csv_header(input_filepath):
+    """Column names of a CSV file"""
+    with open(input_filepath, newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), [])
+
+
+def select_columns(input_filepath, usecols=None):
+    """
+    Columns of a CSV file to read, in file order
+
+    usecols is a list of names or a callable like in pd.read_csv; listed
+    columns that are not in the file raise a ValueError.
+    """
+    header = csv_header(input_filepath)
+    if usecols is None:
+        return header
+    if callable(usecols):
+        return [column for column in header if usecols(column)]
+    missing = set(usecols) - set(header)
+    if missing:
+        raise ValueError(f"Columns not found in {input_filepath}: {sorted(missing)}")
+    wanted = set(usecols)
+    return [column for column in header if column in wanted]
+
+
+def _arrow_type(dtype):
+    if isinstance(dtype, pa.DataType):
+        return dtype
+    if dtype in (str, object, 'str', 'object'):
+        return pa.string()
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+
+def _column_types(columns, dtype):
+    """Arrow type per column: the given types, strings for the rest"""
+    types = dict.fromkeys(columns, pa.string())
+    if isinstance(dtype, dict):
+        types.update({column: _arrow_type(t) for column, t in dtype.items() if column in types})
+    elif dtype is not None:
+        types = dict.fromkeys(columns, _arrow_type(dtype))
+    return types
+
+
+def _arrow_options(columns, dtype, block_size, use_threads):
+    read_options = pa_csv.ReadOptions(use_threads=use_threads, block_size=block_size)
+    # Quoted HTML fields contain newlines; the quote-aware chunker keeps them inside one value
+    parse_options = pa_csv.ParseOptions(newlines_in_values=True)
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=columns, column_types=_column_types(columns, dtype), null_values=NA_VALUES,
+        strings_can_be_null=True, quoted_strings_can_be_null=True)
+    return read_options, parse_options, convert_options
+
+
+def _pandas_dtype(dtype):
+    if isinstance(dtype, dict):
+        return {column: (str if _arrow_type(t) == pa.string() else t) for column, t in dtype.items()}
+    return dtype
+
+
+def _to_pandas(table, start=0):
+    df = table.to_pandas()
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def read_vacancy_csv(input_filepath, usecols=None, dtype=str, engine=None, use_threads=True, block_size=1 << 24):
+    """
+    Read a vacancy CSV file into a DataFrame
+
+    Columns are read as strings unless dtype gives a type (one type for all
+    columns or a dict per column). The pyarrow engine parses blocks of the
+    file in parallel threads; the result equals pd.read_csv with the same
+    columns and types, including quoted fields with embedded newlines. With
+    dtype=None pandas' type inference is wanted, so the pandas engine is used.
+
+    Parameters:
+    input_filepath (str): CSV file
+    usecols (list or callable): Columns to read (default: all)
+    dtype: Column types, see above
+    engine (str): 'pyarrow' or 'pandas' (default: CSV_ENGINE)
+    use_threads (bool): Parse with all cores (pyarrow only)
+    block_size (int): Bytes per parsed block (pyarrow only)
+    """
+    engine = engine or CSV_ENGINE
+    if engine == 'pandas' or dtype is None:
+        return pd.read_csv(input_filepath, usecols=usecols, dtype=_pandas_dtype(dtype))
+    columns = select_columns(input_filepath, usecols)
+    options = _arrow_options(columns, dtype, block_size, use_threads)
+    return _to_pandas(pa_csv.read_csv(input_filepath, *options))
+
+
+def iter_record_batches(input_filepath, usecols=None, dtype=str, use_threads=True, block_size=1 << 24):
+    """Stream a vacancy CSV as pyarrow RecordBatches (one per parsed block)"""
+    columns = select_columns(input_filepath, usecols)
+    with pa_csv.open_csv(input_filepath, *_arrow_options(columns, dtype, block_size, use_threads)) as reader:
+        yield from reader
+
+
+def iter_vacancy_csv(input_filepath, chunksize=100000, usecols=None, dtype=str, engine=None, use_threads=True,
+                     block_size=1 << 24):
+    """
+    Read a vacancy CSV file in DataFrame chunks of chunksize rows
+
+    Like pd.read_csv(chunksize=...): the index runs on across chunks. Chunks
+    are read as strings unless dtype gives types (per-chunk type inference
+    would give the chunks different types); see read_vacancy_csv.
+    """
+    engine = engine or CSV_ENGINE
+    if engine == 'pandas':
+        yield from pd.read_csv(input_filepath, chunksize=chunksize, usecols=usecols,
+                               dtype=_pandas_dtype(dtype if dtype is not None else str))
+        return
+
+    pending = []
+    pending_rows = 0
+    start = 0
+    for batch in iter_record_batches(input_filepath, usecols, dtype if dtype is not None else str,
+                                     use_threads, block_size):
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        if pending_rows < chunksize:
+            continue
+        table = pa.Table.from_batches(pending)
+        while len(table) >= chunksize:
+            yield _to_pandas(table.slice(0, chunksize), start)
+            start += chunksize
+            table = table.slice(chunksize)
+        pending = table.to_batches()
+        pending_rows = len(table)
+    if pending_rows:
+        yield _to_pandas(pa.Table.from_batches(pending), start)
+
+
+def compare_engines(input_filepath, usecols=None, dtype=str, repeats=1):
+    """
+    Read a file with both engines, check that the frames are equal and print the timings
+
+    Use on the raw dump to check the quoting of its HTML fields before switching engines.
+    """
+    frames = {}
+    for engine in ('pandas', 'pyarrow'):
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            frames[engine] = read_vacancy_csv(input_filepath, usecols=usecols, dtype=dtype, engine=engine)
+            timings.append(time.perf_counter() - started)
+        print(f"{engine}: {len(frames[engine]):,} rows in {min(timings):.2f}s")
+    pd.testing.assert_frame_equal(frames['pandas'], frames['pyarrow'], check_dtype=False)
+    print("Both engines give the same frame")
+    return frames['pyarrow']
+
+
+if __name__ == "__main__":
+    # File paths
+    input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_2017_2021.csv"
+
+    # Check that the multi-threaded reader parses the raw dump exactly like pandas, and compare speed
+    compare_engines(input_file)
@@ -1,28 +1,79 @@
+import os
+
 import pandas as pd
 
+from distribution_report import Dimension, DistributionReport, print_or_save
+from title_classifier import TITLE_CLASSIFIER, classify_titles
+from title_clustering import TitleClusterer, role_families
+from text_store import read_vacancies
+from vacancy_db import VacancyDatabase
+
+
+def marketing_mask(df):
+    """Boolean mask of the rows whose positiontitle is classified as a marketing role"""
+    return classify_titles(df['positiontitle']).notna()
 
-def filter_marketing_positions(input_filepath, output_filepath):
+
+def marketing_where(db):
     """
-    Filter positions to keep only marketing-related roles using positiontitle
+    Where clause selecting the marketing positions in a VacancyDatabase, plus a
+    {title: sub-role} mapping; only the distinct titles are classified
     """
-    try:
-        print("Loading dataset...")
-        df = pd.read_csv(input_filepath)
+    titles = db.distinct('positiontitle')
+    roles = {title: role for title, role in zip(titles, TITLE_CLASSIFIER.classify_unique(titles)) if role}
+    return db.register_values('marketing_titles', 'positiontitle', roles), roles
 
-        # Original size
-        original_size = len(df)
-        print(f"\nOriginal dataset size: {original_size:,} rows")
 
-        # Convert to lowercase for case-insensitive matching
-        print("\nFiltering marketing positions...")
-        marketing_mask = df['positiontitle'].str.lower().str.contains('marketing', na=False)
-        filtered_df = df[marketing_mask]
+def filter_marketing_positions(input_filepath, output_filepath, db=None):
+    """
+    Filter positions to keep only marketing-related roles using positiontitle
+
+    Titles are classified into marketing sub-roles (see title_classifier); the
+    label is kept in a 'marketing_role' column. Title variants are clustered
+    into a 'role_family' column (see title_clustering). input_filepath can be the CSV or
+    a text store directory (see text_store), in which case only the metadata is
+    loaded and the output has no HTML column. With a VacancyDatabase the filter
+    runs as a SQL query instead of loading the CSV.
+    """
+    try:
+        if db is not None:
+            print("Querying marketing positions from the database...")
+            original_size = db.count()
+            print(f"\nOriginal dataset size: {original_size:,} rows")
+            where, roles = marketing_where(db)
+            filtered_df = db.select(where)
+            filtered_df['marketing_role'] = filtered_df['positiontitle'].map(roles)
+        else:
+            print("Loading dataset...")
+            df = read_vacancies(input_filepath)
+
+            # Original size
+            original_size = len(df)
+            print(f"\nOriginal dataset size: {original_size:,} rows")
+
+            # Classify the distinct titles into marketing sub-roles
+            print("\nFiltering marketing positions...")
+            roles = classify_titles(df['positiontitle'])
+            filtered_df = df[roles.notna()].assign(marketing_role=roles[roles.notna()])
+
+        # Group the title variants of the marketing positions into role families
+        filtered_df['role_family'] = role_families(filtered_df['positiontitle'])
 
         # Get statistics
         filtered_size = len(filtered_df)
         print(f"\nFiltered dataset size: {filtered_size:,} rows")
         print(f"Removed {original_size - filtered_size:,} rows")
 
+        # Show distribution of marketing sub-roles
+        print("\nDistribution by marketing sub-role:")
+        for role, count in filtered_df['marketing_role'].value_counts().items():
+            print(f"- {role}: {count:,} positions")
+
+        # Show distribution of role families
+        print("\nLargest role families (top 20):")
+        for family, count in filtered_df['role_family'].value_counts().head(20).items():
+            print(f"- {family}: {count:,} positions")
+
         # Show distribution of position titles
         print("\nSample of marketing position titles found (top 20):")
         title_counts = filtered_df['positiontitle'].value_counts()
@@ -53,61 +104,79 @@ def filter_marketing_positions(input_filepath, output_filepath):
         return None
 
 
-def analyze_marketing_positions(df):
+def marketing_report(group_by=None, derived=None):
+    """
+    Distributions and cross-tabs of the marketing positions analysis
+
+    With group_by (e.g. 'role_family') every distribution is also cross-tabbed
+    against the 25 largest groups of that column. derived maps the columns the
+    database does not store ('marketing_role', 'role_family') to a function
+    computing them from the distinct position titles.
+    """
+    start_year = Dimension('Date distribution of positions', 'startingdate', by_year=True)
+    education = Dimension('Education requirements distribution', 'educationdegree')
+    province = Dimension('Geographical distribution', 'physicallocationprovince')
+    role = Dimension('Marketing sub-roles', 'marketing_role')
+    dimensions = [
+        start_year,
+        education,
+        Dimension('Contract type distribution', 'typeofcontract'),
+        Dimension('Top 20 organizations posting marketing positions', 'organizationname', top=20),
+        province,
+        role,
+        Dimension('Top 25 role families', 'role_family', top=25),
+    ]
+    crosstabs = [(start_year, education), (role, province)]
+    if group_by is not None:
+        group = Dimension(f'Top 25 by {group_by}', group_by, top=25)
+        crosstabs += [(group, dimension) for dimension in dimensions if dimension.column != group_by]
+    for dimension in dimensions + [d for pair in crosstabs for d in pair]:
+        if derived and dimension.column in derived:
+            dimension.source_column = 'positiontitle'
+            dimension.derive = derived[dimension.column]
+    return DistributionReport('Marketing Positions Analysis', dimensions, crosstabs=crosstabs)
+
+
+def analyze_marketing_positions(df, db=None, output_path=None, chunksize=100000, group_by=None):
     """
     Analyze the marketing positions in more detail
+
+    All distributions are computed in one pass (see distribution_report) and
+    saved to output_path (.json, .md or .html) or printed as Markdown. With a
+    VacancyDatabase the distributions are counted in SQL and df may be None; the
+    sub-roles and role families are then derived from the title counts.
+    group_by adds cross-tabs per group, e.g. per 'role_family'.
     """
-    if df is not None and not df.empty:
-        print("\n=== Marketing Positions Analysis ===")
-
-        # Analyze starting dates
-        if 'startingdate' in df.columns:
-            print("\nDate distribution of positions:")
-            df['startingdate'] = pd.to_datetime(df['startingdate'], errors='coerce')
-            year_counts = df['startingdate'].dt.year.value_counts().sort_index()
-            for year, count in year_counts.items():
-                if not pd.isna(year):  # Check if year is not NaN
-                    print(f"Year {int(year)}: {count:,} positions")
-
-        # Analyze education requirements
-        if 'educationdegree' in df.columns:
-            print("\nEducation requirements distribution:")
-            edu_counts = df['educationdegree'].value_counts()
-            for edu, count in edu_counts.items():
-                if pd.notna(edu):  # Check if education is not NaN
-                    print(f"{edu}: {count:,} positions")
-
-        # Analyze contract types
-        if 'typeofcontract' in df.columns:
-            print("\nContract type distribution:")
-            contract_counts = df['typeofcontract'].value_counts()
-            for contract, count in contract_counts.items():
-                if pd.notna(contract):  # Check if contract type is not NaN
-                    print(f"{contract}: {count:,} positions")
-
-        # Analyze organization types
-        print("\nTop 20 organizations posting marketing positions:")
-        org_counts = df['organizationname'].value_counts()
-        for org, count in org_counts.head(20).items():
-            print(f"{org}: {count:,} positions")
-
-        # Analyze geographical distribution
-        if 'physicallocationprovince' in df.columns:
-            print("\nGeographical distribution:")
-            location_counts = df['physicallocationprovince'].value_counts()
-            for location, count in location_counts.items():
-                if pd.notna(location):  # Check if location is not NaN
-                    print(f"{location}: {count:,} positions")
+    if db is not None:
+        where, roles = marketing_where(db)
+        source = db.subset(where)
+        # Cluster the titles weighted by their number of postings, like role_families on the rows
+        title_counts = source.value_counts('positiontitle')
+        clusterer = TitleClusterer().fit(pd.Series(title_counts.index.repeat(title_counts.to_numpy())))
+        derived = {'marketing_role': lambda titles: titles.map(roles), 'role_family': clusterer.assign}
+        report = marketing_report(group_by=group_by, derived=derived)
+    elif df is not None:
+        source = df
+        report = marketing_report(group_by=group_by)
+    else:
+        return None
+    report.run(source, chunksize=chunksize)
+    return print_or_save(report, output_path)
 
 
 if __name__ == "__main__":
     # File paths
     input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_2017_2021.csv"
     output_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/marketing_positions_2017_2021.csv"
+    report_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/marketing_positions_report.md"
+    db_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_2017_2021.sqlite"
+
+    # Use the embedded database when it has been built (vacancy_db.ingest_csv)
+    db = VacancyDatabase(db_file) if os.path.exists(db_file) else None
 
     # Filter the data
-    filtered_df = filter_marketing_positions(input_file, output_file)
+    filtered_df = filter_marketing_positions(input_file, output_file, db=db)
 
     # Analyze the filtered data
     if filtered_df is not None:
-        analyze_marketing_positions(filtered_df)
\ No newline at end of file
+        analyze_marketing_positions(filtered_df, output_path=report_file, group_by='role_family')
\ No newline at end of file
@@ -1,78 +1,57 @@
+import os
+
 import pandas as pd
 
-# Define the agencies by category
-DIGITAL_AGENCIES = {
-    'full_service_digital': [
-        'ClickValue', 'Online Dialogue', 'MeasureWorks', 'OrangeValley', 'Adwise',
-        'We are you', 'INFO', 'The Valley', 'Macaw', 'Edenspiekermann',
-        'Accenture Interactive', 'Conclusion Digital', 'Osudio', 'Merkle Nederland',
-        'Fabrique', 'ISAAC', 'TRIMM', 'Xebia', 'Valtech', 'Clockwork', 'Incentro',
-        'Mirabeau', 'Emakina', 'Dept', 'Deloitte Digital', 'Youwe', 'E-sites',
-        'WeAreBrain', 'ID Factory', 'Bitfactory', 'Arlanet', 'One Shoe',
-        'theFactor.e', 'Clever Strategy', 'Bratpack', 'a&m impact', '4net Interactive',
-        'Redkiwi', 'Kaliber', 'Netvlies', 'freshheads', 'Burst', 'Jungle Minds',
-        'Grrr', 'Snakeware', 'Label A', 'AlienTrick', 'Limesquare', 'Greenberry',
-        'Finalist', 'Digitas', 'BLIS Digital', 'TRES', 'Magneds', 'Gracious',
-        'WebNL', 'Lukkien', 'DotControl', 'IN10', 'iWink', 'Hoppinger',
-        'Elevate Digital', '050media', 'PUURPXL', 'Webton', 'Elephant', 'Axendo',
-        'Goeiezaak.com', 'Digital Natives', 'Cube', 'Maatwerk Online', '/CMCG',
-        'Zicht Online', 'Scherp Online', 'Pünktlich', 'Chunk Creative Agency',
-        'Havana Harbor', 'Energize', 'Isobar', 'ZIGT', 'ACHTUNG!', 'Born05',
-        'CODE D\'AZUR', 'DDB Unlimited', 'Havas Lemz', 'RLVNT', 'Viduate',
-        'CLEVER°FRANKE', 'Bikkelhart', 'Conversed', 'Concept7', 'Hike One',
-        'Valsplat', 'Entopic'
-    ],
-    'seo_sea_agencies': [
-        'Searchresult', 'Yonego', 'SDIM', 'Yourzine', 'Storm Digital', 'Reprise',
-        'Netprofiler', 'Artefact', 'Happy Idiots', 'DTG', 'Traffic Builders',
-        'iClicks', 'OrangeValley', 'Dept', 'iProspect', 'Maxlead', 'Greenhouse Group'
-    ],
-    'performance_marketing': [
-        'Gradient', 'Harvest Digital', 'Pink Marketing', 'Booming', 'Orangedotcom',
-        'Fingerspitz', 'Fosby', 'MvH Media', 'Happy Cactus', 'Traffic Today',
-        'Happy Leads', 'Make Marketing Magic', 'PauwR', 'daar-om.nl', 'Nochii',
-        'Brandfirm', 'AdResults', 'Tomorrowmen', 'Blauwe Monsters'
-    ],
-    'lead_generation': [
-        'Leadscope', 'Olifant Media', 'Semwerkt', 'RED Online Marketing',
-        'DEA.Amsterdam', 'Crowdmedia', 'Bambuu', 'Increase', 'BlooSEM',
-        'Hide and Seek', 'Leadrs', 'Conversive', 'DBOM', 'Best4u Internet Marketing'
-    ],
-    'ai_agencies': [
-        'Aidence', 'Dashmote', 'Effect.AI', 'Building Blocks'
-    ],
-    'email_marketing': [
-        'Ematters', 'Yourzine', 'Measuremail', '100%EMAIL', 'e-Village'
-    ],
-    'ecommerce': [
-        'Bluebird Day', 'Evoworks', 'XSARUS', 'Wunderman Thompson Commerce',
-        'Experius', 'We Provide', 'ShopWorks', 'Evident', 'Yellowgrape', 'MediaCT',
-        'Zeo', 'De Nieuwe Zaak', 'Yellowlab', 'ISM eCompany', 'Kega', 'Guapa'
-    ]
-}
-
-
-def filter_agency_positions(input_filepath, output_filepath):
+from distribution_report import Dimension, DistributionReport, print_or_save
+from excel_export import export_agency_workbook
+from taxonomy import load_taxonomy
+from text_store import read_vacancies
+from vacancy_db import VacancyDatabase, in_clause
+
+# Agencies per category, from the versioned taxonomy file taxonomy/agencies.json
+DIGITAL_AGENCIES = load_taxonomy('agencies')['digital_agencies']
+
+
+def all_agencies():
+    """List of all agencies over all categories"""
+    agencies = []
+    for category, category_agencies in DIGITAL_AGENCIES.items():
+        agencies.extend(category_agencies)
+    return agencies
+
+
+def agency_mask(df):
+    """Boolean mask of the rows posted by one of the digital agencies"""
+    return df['organizationname'].isin(all_agencies())
+
+
+def filter_agency_positions(input_filepath, output_filepath, db=None, excel_path=None):
     """
     Filter positions from specific digital agencies
+
+    input_filepath can be the CSV or a text store directory (see text_store), in
+    which case only the metadata is loaded and the output has no HTML column.
+    With a VacancyDatabase the filter runs as an indexed SQL query instead of loading the CSV.
+    With excel_path the positions and per-agency / per-category summaries are
+    also exported to Excel (see excel_export.export_agency_workbook).
     """
     try:
-        print("Loading dataset...")
-        df = pd.read_csv(input_filepath)
-
-        # Original size
-        original_size = len(df)
-        print(f"\nOriginal dataset size: {original_size:,} rows")
-
-        # Create list of all agencies
-        all_agencies = []
-        for category, agencies in DIGITAL_AGENCIES.items():
-            all_agencies.extend(agencies)
-
-        # Filter for agencies
-        print("\nFiltering positions from digital agencies...")
-        agency_mask = df['organizationname'].isin(all_agencies)
-        filtered_df = df[agency_mask]
+        if db is not None:
+            print("Querying digital agency positions from the database...")
+            original_size = db.count()
+            print(f"\nOriginal dataset size: {original_size:,} rows")
+            filtered_df = db.select(*in_clause('organizationname', all_agencies()))
+        else:
+            print("Loading dataset...")
+            df = read_vacancies(input_filepath)
+
+            # Original size
+            original_size = len(df)
+            print(f"\nOriginal dataset size: {original_size:,} rows")
+
+            # Filter for agencies
+            print("\nFiltering positions from digital agencies...")
+            filtered_df = df[agency_mask(df)]
 
         # Get statistics
         filtered_size = len(filtered_df)
@@ -102,6 +81,8 @@ def filter_agency_positions(input_filepath, output_filepath):
         # Save filtered dataset
         print(f"\nSaving filtered dataset to {output_filepath}")
         filtered_df.to_csv(output_filepath, index=False)
+        if excel_path is not None:
+            export_agency_workbook(filtered_df, excel_path)
 
         return filtered_df
 
@@ -112,54 +93,48 @@ def filter_agency_positions(input_filepath, output_filepath):
         return None
 
 
-def analyze_agency_positions(df):
+def agency_report():
+    """Distributions and cross-tabs of the agency positions analysis"""
+    year = Dimension('Positions over time', 'datefound', by_year=True)
+    education = Dimension('Education requirements', 'educationdegree')
+    province = Dimension('Geographical distribution', 'physicallocationprovince')
+    return DistributionReport('Agency Positions Analysis', [
+        year,
+        education,
+        province,
+        Dimension('Top 20 generalized position types', 'positiontitlegeneralized', top=20),
+    ], crosstabs=[(year, province), (year, education)])
+
+
+def analyze_agency_positions(df, db=None, output_path=None, chunksize=100000):
     """
     Analyze the agency positions in detail
+
+    All distributions are computed in one pass (see distribution_report) and
+    saved to output_path (.json, .md or .html) or printed as Markdown. With a
+    VacancyDatabase the distributions are counted in SQL and df may be None.
     """
-    if df is not None and not df.empty:
-        print("\n=== Agency Positions Analysis ===")
-
-        # Analyze positions over time
-        if 'datefound' in df.columns:
-            print("\nPositions over time:")
-            df['datefound'] = pd.to_datetime(df['datefound'], errors='coerce')
-            year_counts = df['datefound'].dt.year.value_counts().sort_index()
-            for year, count in year_counts.items():
-                if not pd.isna(year):
-                    print(f"Year {int(year)}: {count:,} positions")
-
-        # Analyze education requirements
-        if 'educationdegree' in df.columns:
-            print("\nEducation requirements:")
-            edu_counts = df['educationdegree'].value_counts()
-            for edu, count in edu_counts.items():
-                if pd.notna(edu):
-                    print(f"{edu}: {count:,} positions")
-
-        # Analyze geographical distribution
-        if 'physicallocationprovince' in df.columns:
-            print("\nGeographical distribution:")
-            location_counts = df['physicallocationprovince'].value_counts()
-            for location, count in location_counts.items():
-                if pd.notna(location):
-                    print(f"{location}: {count:,} positions")
-
-        # Analyze position types
-        if 'positiontitlegeneralized' in df.columns:
-            print("\nTop 20 generalized position types:")
-            position_counts = df['positiontitlegeneralized'].value_counts().head(20)
-            for position, count in position_counts.items():
-                print(f"- {position}: {count:,} positions")
+    source = db.subset(*in_clause('organizationname', all_agencies())) if db is not None else df
+    if source is None:
+        return None
+    report = agency_report().run(source, chunksize=chunksize)
+    return print_or_save(report, output_path)
 
 
 if __name__ == "__main__":
     # File paths
     input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_2017_2021.csv"
     output_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions.csv"
+    report_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions_report.md"
+    excel_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions.xlsx"
+    db_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_2017_2021.sqlite"
+
+    # Use the embedded database when it has been built (vacancy_db.ingest_csv)
+    db = VacancyDatabase(db_file) if os.path.exists(db_file) else None
 
     # Filter the data
-    filtered_df = filter_agency_positions(input_file, output_file)
+    filtered_df = filter_agency_positions(input_file, output_file, db=db, excel_path=excel_file)
 
     # Analyze the filtered data
     if filtered_df is not None:
-        analyze_agency_positions(filtered_df)
\ No newline at end of file
+        analyze_agency_positions(filtered_df, db=db, output_path=report_file)
\ No newline at end of file
@@ -0,0 +1,175 @@
+import json
+import sqlite3
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from competency_registry import check_registry, registry_state
+from csv_loader import iter_vacancy_csv
+from dataset import marketing_mask
+from dataset_marketing_agencies import agency_mask
+from vacancy_columns import DATE_COLUMN, TEXT_COLUMN, posting_ids
+
+FILTERS = {
+    'agency': agency_mask,
+    'marketing': marketing_mask,
+}
+
+
+class DeltaIngestor:
+    """
+    Incremental ingestion of new vacancy dumps into persisted aggregates
+
+    Only rows whose (posting id, datefound) pair has not been seen before are
+    processed, so a posting that is found again on a later date counts again.
+    They go through the selected filters and the competency extractor, and their
+    counts are added to the stored tallies. All tallies are sums over postings, so the
+    result after any sequence of deltas equals a full rebuild over the same rows.
+    The competency tallies are keyed by registry id, so the state records which
+    registry it was built with and refuses to merge into it after the
+    competencies were renamed, removed or re-numbered.
+
+    Parameters:
+    state_path (str): SQLite file holding the seen postings and the tallies
+    extractor (CompetencyExtractor): Extractor used for new postings
+    filters (tuple): Names of the filters to apply ('agency', 'marketing')
+    start_date (str): Only keep postings with datefound >= start_date (None keeps all)
+    """
+
+    def __init__(self, state_path, extractor, filters=('agency',), start_date='2020-01-01'):
+        self.extractor = extractor
+        self.filters = [FILTERS[name] for name in filters]
+        self.start_date = pd.Timestamp(start_date) if start_date is not None else None
+
+        self.conn = sqlite3.connect(state_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen (posting_id TEXT, datefound TEXT, PRIMARY KEY (posting_id, datefound))")
+        self._migrate_seen()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tallies (dimension TEXT, key TEXT, count INTEGER, "
+            "PRIMARY KEY (dimension, key))")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._check_registry()
+
+    def _check_registry(self):
+        """Record the registry of a new state, or check that an existing state was built with this registry"""
+        registry = self.extractor.registry
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'registry'").fetchone()
+        if row is not None:
+            check_registry(json.loads(row[0]), registry, 'aggregate state')
+        elif self.conn.execute("SELECT 1 FROM tallies LIMIT 1").fetchone() is not None:
+            raise ValueError("The aggregate state does not record its competency registry; rebuild it")
+        # Competencies appended since the last run are allowed; from now on they are part of the check
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('registry', ?)",
+                              (json.dumps(registry_state(registry)),))
+
+    def _migrate_seen(self):
+        """Re-key a seen table of an older state (posting id only) on (posting id, datefound)"""
+        key_columns = [row[1] for row in self.conn.execute("PRAGMA table_info(seen)") if row[5] > 0]
+        if key_columns != ['posting_id']:
+            return
+        with self.conn:
+            self.conn.execute("ALTER TABLE seen RENAME TO seen_old")
+            self.conn.execute(
+                "CREATE TABLE seen (posting_id TEXT, datefound TEXT, PRIMARY KEY (posting_id, datefound))")
+            self.conn.execute("INSERT INTO seen (posting_id, datefound) SELECT posting_id, datefound FROM seen_old")
+            self.conn.execute("DROP TABLE seen_old")
+
+    def _unseen(self, df):
+        """Rows of df whose (posting id, datefound) pair is new (duplicates within df keep the first row)"""
+        keys = pd.Series(list(zip(posting_ids(df).astype(str), df[DATE_COLUMN].astype(str))))
+        first = ~keys.duplicated().to_numpy()
+
+        seen = set()
+        unique_ids = list(dict.fromkeys(posting_id for posting_id, _ in keys[first]))
+        for start in range(0, len(unique_ids), 900):
+            batch = unique_ids[start:start + 900]
+            placeholders = ', '.join('?' * len(batch))
+            seen.update(self.conn.execute(
+                f"SELECT posting_id, datefound FROM seen WHERE posting_id IN ({placeholders})", batch))
+        new = first & np.array([key not in seen for key in keys], dtype=bool)
+        return df[new].reset_index(drop=True)
+
+    def ingest(self, df):
+        """Process the new rows of a batch and merge their contributions; returns the tallies added"""
+        new_df = self._unseen(df)
+        dates = pd.to_datetime(new_df[DATE_COLUMN], errors='coerce')
+
+        # Filters
+        keep = pd.Series(True, index=new_df.index)
+        for mask in self.filters:
+            keep &= mask(new_df)
+        if self.start_date is not None:
+            keep &= dates >= self.start_date
+        selected = new_df[keep]
+
+        # Extraction and tallies
+        tallies = Counter()
+        for html_text, year, province in zip(selected[TEXT_COLUMN], dates[keep], selected['physicallocationprovince']):
+            tallies[('postings', 'all')] += 1
+            year_key = str(int(year.year)) if pd.notna(year) else 'unknown'
+            tallies[('year', year_key)] += 1
+            tallies[('province', province if pd.notna(province) else 'unknown')] += 1
+            competency_ids, language = self.extractor.extract_with_language(html_text)
+            tallies[('language', language)] += 1
+            for competency_id in competency_ids:
+                tallies[('competency', str(competency_id))] += 1
+                tallies[('category', self.extractor.registry.category(competency_id))] += 1
+                tallies[('competency_year', f"{competency_id}|{year_key}")] += 1
+
+        # Merge in one transaction: every new row is marked as seen, also the filtered-out ones
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO seen (posting_id, datefound) VALUES (?, ?)",
+                zip(posting_ids(new_df).astype(str), new_df[DATE_COLUMN].astype(str)))
+            self.conn.executemany(
+                "INSERT INTO tallies (dimension, key, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (dimension, key) DO UPDATE SET count = count + excluded.count",
+                [(dimension, key, count) for (dimension, key), count in tallies.items()])
+
+        print(f"Delta: {len(df):,} rows offered, {len(new_df):,} new, {len(selected):,} passed the filters")
+        return tallies
+
+    def ingest_csv(self, input_filepath, chunksize=50000):
+        """Ingest a new export file in chunks"""
+        for chunk in iter_vacancy_csv(input_filepath, chunksize=chunksize):
+            self.ingest(chunk)
+
+    def tally(self, dimension):
+        """Stored counts of one dimension ('competency', 'category', 'year', 'province', 'language', ...)"""
+        rows = self.conn.execute(
+            "SELECT key, count FROM tallies WHERE dimension = ? ORDER BY count DESC, key", (dimension,)).fetchall()
+        return pd.Series(dict(rows), name=dimension, dtype='int64')
+
+    def competency_counts(self):
+        """Postings per competency with readable names"""
+        counts = self.tally('competency')
+        registry = self.extractor.registry
+        return pd.DataFrame({
+            'competency_id': counts.index.astype(int),
+            'competency': [registry.name(int(i)) for i in counts.index],
+            'category': [registry.category(int(i)) for i in counts.index],
+            'postings': counts.to_numpy(),
+        })
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    from competency_analysis import CompetencyExtractor
+
+    # File paths
+    new_export = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_new_export.csv"
+    state_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/competency_aggregates.sqlite"
+
+    ingestor = DeltaIngestor(state_file, CompetencyExtractor(), filters=('agency',))
+    ingestor.ingest_csv(new_export)
+
+    total = ingestor.tally('postings').get('all', 0)
+    print(f"\nPostings in aggregates: {total:,}")
+    print("\nTop 20 competencies:")
+    for _, row in ingestor.competency_counts().head(20).iterrows():
+        print(f"{row['competency']}: {row['postings']:,} postings ({row['postings'] / max(total, 1) * 100:.1f}%)")
@@ -0,0 +1,312 @@
+import html
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from csv_loader import iter_vacancy_csv
+
+
+class Dimension:
+    """
+    One distribution in a report
+
+    Parameters:
+    title (str): Heading of the distribution
+    column (str): Source column
+    by_year (bool): Count per year of a date column instead of per value
+    top (int): Number of entries to render (None renders all; all are counted)
+    source_column (str): Stored column a derived column is computed from (database path)
+    derive (callable): Maps a Series of distinct source_column values to their keys
+    """
+
+    def __init__(self, title, column, by_year=False, top=None, source_column=None, derive=None):
+        self.title = title
+        self.column = column
+        self.by_year = by_year
+        self.top = top
+        self.source_column = source_column
+        self.derive = derive
+
+    def keys(self, chunk):
+        """Key per row of a chunk (NaN where the row has no value)"""
+        if self.by_year:
+            return pd.to_datetime(chunk[self.column], errors='coerce').dt.year
+        return chunk[self.column]
+
+
+def _plain(key):
+    """numpy scalars as plain Python values (years as int) so keys serialize to JSON"""
+    if isinstance(key, (np.integer, np.floating)):
+        return int(key) if float(key).is_integer() else float(key)
+    return key
+
+
+def _derived(dimension, values):
+    """Keys of a derived dimension for an array of source values"""
+    values = pd.Series(values, dtype=object)
+    return np.asarray(dimension.derive(values), dtype=object)
+
+
+def _add_counts(counts, keys):
+    """Add the counts of a key array to a dict, keeping the order of first appearance"""
+    codes, uniques = pd.factorize(keys)
+    tally = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    for key, count in zip(uniques, tally):
+        key = _plain(key)
+        counts[key] = counts.get(key, 0) + int(count)
+
+
+def _add_weighted_counts(counts, keys, weights):
+    """Add counts that were already grouped (e.g. by SQL); keys that are or contain NaN are skipped"""
+    for key, count in zip(keys, weights):
+        parts = key if isinstance(key, tuple) else (key,)
+        if any(pd.isna(part) for part in parts):
+            continue
+        key = tuple(_plain(part) for part in parts) if isinstance(key, tuple) else _plain(key)
+        counts[key] = counts.get(key, 0) + int(count)
+
+
+def _add_pair_counts(counts, row_keys, col_keys):
+    """Add the counts of (row, column) key pairs; rows missing either key are skipped"""
+    row_codes, row_uniques = pd.factorize(row_keys)
+    col_codes, col_uniques = pd.factorize(col_keys)
+    valid = (row_codes >= 0) & (col_codes >= 0)
+    pair_codes = row_codes[valid].astype(np.int64) * len(col_uniques) + col_codes[valid]
+    codes, first, tally = np.unique(pair_codes, return_index=True, return_counts=True)
+    for position in np.argsort(first, kind='stable'):
+        row_code, col_code = divmod(int(codes[position]), len(col_uniques))
+        key = (_plain(row_uniques[row_code]), _plain(col_uniques[col_code]))
+        counts[key] = counts.get(key, 0) + int(tally[position])
+
+
+class DistributionReport:
+    """
+    All distributions and cross-tabs of a report, computed in one pass
+
+    Every chunk of rows is offered once to update(); each dimension and cross-tab
+    adds its counts, so large inputs can be streamed from a CSV. A VacancySubset
+    is not streamed: every distribution and cross-tab is one GROUP BY query, and
+    columns the database does not store are derived from the grouped counts of
+    their source_column (e.g. the marketing sub-role from positiontitle).
+    Dimensions whose column is missing from the data are skipped.
+    Counts are ordered like Series.value_counts() (year distributions by year)
+    and can be rendered as JSON, Markdown or HTML.
+
+    Parameters:
+    title (str): Report title
+    dimensions (list): Dimension objects
+    crosstabs (list): (row Dimension, column Dimension) pairs
+    """
+
+    def __init__(self, title, dimensions, crosstabs=()):
+        self.title = title
+        self.dimensions = list(dimensions)
+        self.crosstabs = list(crosstabs)
+        self.rows = 0
+        self.counts = [{} for _ in self.dimensions]
+        self.crosstab_counts = [{} for _ in self.crosstabs]
+        self.present = None
+
+    def columns(self):
+        """Source columns the report needs"""
+        columns = [d.column for d in self.dimensions]
+        columns += [d.column for pair in self.crosstabs for d in pair]
+        return list(dict.fromkeys(columns))
+
+    def update(self, chunk):
+        """Add the counts of one chunk of rows"""
+        if self.present is None:
+            self.present = set(chunk.columns)
+        self.rows += len(chunk)
+
+        keys = {}
+        for dimension in self.dimensions + [d for pair in self.crosstabs for d in pair]:
+            if dimension.column in self.present and (dimension.column, dimension.by_year) not in keys:
+                keys[(dimension.column, dimension.by_year)] = dimension.keys(chunk)
+
+        for dimension, counts in zip(self.dimensions, self.counts):
+            if dimension.column in self.present:
+                _add_counts(counts, keys[(dimension.column, dimension.by_year)])
+
+        for (row_dim, col_dim), counts in zip(self.crosstabs, self.crosstab_counts):
+            if row_dim.column in self.present and col_dim.column in self.present:
+                _add_pair_counts(counts, keys[(row_dim.column, row_dim.by_year)],
+                                 keys[(col_dim.column, col_dim.by_year)])
+        return self
+
+    def run(self, source, chunksize=100000):
+        """
+        Compute the report over a DataFrame, a CSV path or a VacancySubset
+
+        Only the columns the report needs are read from a CSV; a VacancySubset is
+        counted in SQL (see aggregate).
+        """
+        if isinstance(source, pd.DataFrame):
+            chunks = (source.iloc[start:start + chunksize] for start in range(0, len(source), chunksize))
+        elif isinstance(source, str):
+            needed = set(self.columns())
+            chunks = iter_vacancy_csv(source, chunksize=chunksize, usecols=lambda column: column in needed)
+        else:
+            return self.aggregate(source)
+
+        for chunk in chunks:
+            self.update(chunk)
+        if self.present is None:
+            self.present = set()
+        return self
+
+    def _stored(self, dimension, source):
+        """Stored column to group on for a dimension, or None when the database cannot provide it"""
+        if dimension.column in source.columns:
+            return dimension.column
+        if dimension.derive is not None and dimension.source_column in source.columns:
+            if dimension.by_year:
+                raise ValueError(f"Derived column {dimension.column} cannot be counted per year")
+            return dimension.source_column
+        return None
+
+    def aggregate(self, source):
+        """
+        Compute the report with GROUP BY queries on a VacancySubset
+
+        Gives the same counts as streaming the rows through update().
+        """
+        self.rows = len(source)
+        dimensions = self.dimensions + [d for pair in self.crosstabs for d in pair]
+        self.present = {d.column for d in dimensions if self._stored(d, source) is not None}
+
+        for dimension, counts in zip(self.dimensions, self.counts):
+            column = self._stored(dimension, source)
+            if column is None:
+                continue
+            grouped = source.year_counts(column) if dimension.by_year else source.value_counts(column)
+            keys = grouped.index.to_numpy(dtype=object)
+            if column != dimension.column:
+                keys = _derived(dimension, keys)
+            _add_weighted_counts(counts, keys, grouped.to_numpy())
+
+        for (row_dim, col_dim), counts in zip(self.crosstabs, self.crosstab_counts):
+            row_column, col_column = self._stored(row_dim, source), self._stored(col_dim, source)
+            if row_column is None or col_column is None:
+                continue
+            pairs = source.pair_counts(row_column, col_column, row_dim.by_year, col_dim.by_year)
+            rows, columns = pairs['row'].to_numpy(dtype=object), pairs['column'].to_numpy(dtype=object)
+            if row_column != row_dim.column:
+                rows = _derived(row_dim, rows)
+            if col_column != col_dim.column:
+                columns = _derived(col_dim, columns)
+            _add_weighted_counts(counts, list(zip(rows, columns)), pairs['count'].to_numpy())
+        return self
+
+    def _sorted(self, dimension, counts):
+        if dimension.by_year:
+            items = sorted(counts.items())
+        else:
+            items = sorted(counts.items(), key=lambda item: -item[1])
+        return items[:dimension.top] if dimension.top else items
+
+    def to_dict(self):
+        """Report as a JSON-serializable dict"""
+        distributions = []
+        for dimension, counts in zip(self.dimensions, self.counts):
+            if dimension.column not in (self.present or ()):
+                continue
+            distributions.append({
+                'title': dimension.title,
+                'column': dimension.column,
+                'by_year': dimension.by_year,
+                'total': sum(counts.values()),
+                'counts': [[key, count] for key, count in self._sorted(dimension, counts)],
+            })
+
+        crosstabs = []
+        for (row_dim, col_dim), counts in zip(self.crosstabs, self.crosstab_counts):
+            if row_dim.column not in (self.present or ()) or col_dim.column not in (self.present or ()):
+                continue
+            crosstabs.append({
+                'title': f"{row_dim.title} x {col_dim.title}",
+                'rows': row_dim.column,
+                'columns': col_dim.column,
+                'counts': [[row, column, count] for (row, column), count in counts.items()],
+            })
+        return {'title': self.title, 'rows': self.rows, 'distributions': distributions, 'crosstabs': crosstabs}
+
+    def crosstab(self, index):
+        """
+        Cross-tab number index as a DataFrame (rows x columns)
+
+        A dimension with top keeps only its top largest values on its axis.
+        """
+        counts = self.crosstab_counts[index]
+        if not counts:
+            return pd.DataFrame()
+        series = pd.Series(counts.values(), index=pd.MultiIndex.from_tuples(counts.keys()))
+        table = series.unstack(fill_value=0)
+        row_dim, col_dim = self.crosstabs[index]
+        if row_dim.top is not None:
+            table = table.loc[table.sum(axis=1).sort_values(ascending=False, kind='stable').index[:row_dim.top]]
+        if col_dim.top is not None:
+            table = table[table.sum(axis=0).sort_values(ascending=False, kind='stable').index[:col_dim.top]]
+        return table.sort_index().sort_index(axis=1)
+
+    def _crosstab_frames(self):
+        for index, (row_dim, col_dim) in enumerate(self.crosstabs):
+            if row_dim.column in (self.present or ()) and col_dim.column in (self.present or ()):
+                yield f"{row_dim.title} x {col_dim.title}", self.crosstab(index)
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
+
+    def to_markdown(self):
+        report = self.to_dict()
+        lines = [f"# {report['title']}", "", f"Rows: {report['rows']:,}"]
+        for distribution in report['distributions']:
+            lines += ["", f"## {distribution['title']}", "", "| Value | Positions |", "| --- | ---: |"]
+            lines += [f"| {key} | {count:,} |" for key, count in distribution['counts']]
+        for title, table in self._crosstab_frames():
+            lines += ["", f"## {title}", ""]
+            lines.append("| | " + " | ".join(str(c) for c in table.columns) + " |")
+            lines.append("| --- |" + " ---: |" * len(table.columns))
+            for row, values in table.iterrows():
+                lines.append(f"| {row} | " + " | ".join(f"{v:,}" for v in values) + " |")
+        return "\n".join(lines) + "\n"
+
+    def to_html(self):
+        report = self.to_dict()
+        parts = [f"<h1>{html.escape(report['title'])}</h1>", f"<p>Rows: {report['rows']:,}</p>"]
+        for distribution in report['distributions']:
+            parts.append(f"<h2>{html.escape(distribution['title'])}</h2>")
+            parts.append("<table><tr><th>Value</th><th>Positions</th></tr>")
+            parts += [f"<tr><td>{html.escape(str(key))}</td><td>{count:,}</td></tr>"
+                      for key, count in distribution['counts']]
+            parts.append("</table>")
+        for title, table in self._crosstab_frames():
+            parts.append(f"<h2>{html.escape(title)}</h2>")
+            parts.append(table.to_html())
+        return "\n".join(parts) + "\n"
+
+    def render(self, fmt='markdown'):
+        """Render as 'json', 'markdown' or 'html'"""
+        renderers = {'json': self.to_json, 'markdown': self.to_markdown, 'html': self.to_html}
+        if fmt not in renderers:
+            raise ValueError(f"Unknown report format {fmt!r} (use 'json', 'markdown' or 'html')")
+        return renderers[fmt]()
+
+    def save(self, output_path):
+        """Write the report; the format follows the extension (.json, .md, .html)"""
+        extension = os.path.splitext(output_path)[1].lower()
+        fmt = {'.json': 'json', '.md': 'markdown', '.html': 'html', '.htm': 'html'}.get(extension, 'markdown')
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(self.render(fmt))
+        print(f"Report saved to {output_path}")
+
+
+def print_or_save(report, output_path=None):
+    """Save the report when a path is given, otherwise print it as Markdown"""
+    if output_path:
+        report.save(output_path)
+    else:
+        print(report.to_markdown())
+    return report
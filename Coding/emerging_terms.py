@@ -0,0 +1,245 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from csv_loader import iter_vacancy_csv
+from language_detection import DUTCH_STOPWORDS, ENGLISH_STOPWORDS
+from text_cleaning import clean_html
+from token_corpus import tokenize
+from vacancy_columns import DATE_COLUMN, TEXT_COLUMN
+
+# Short words shared by Dutch and English are left out of language detection, but are no phrase edges either
+STOPWORDS = DUTCH_STOPWORDS | ENGLISH_STOPWORDS | {'in', 'is', 'on', 'we', 'u', 'i', 'bv', 'etc'}
+
+# Multiply-shift hash constants, one row of the sketch each
+_HASH_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+                              0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9],
+                             dtype=np.uint64)
+
+
+class CountMinSketch:
+    """
+    Fixed-size frequency table for hashed keys
+
+    Estimates never undercount; they overcount by at most about
+    total / width with high probability. Memory is depth x width counters,
+    independent of the number of distinct keys.
+    """
+
+    def __init__(self, width=1 << 18, depth=4):
+        if depth > len(_HASH_MULTIPLIERS):
+            raise ValueError(f"depth can be at most {len(_HASH_MULTIPLIERS)}")
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int32)
+        self.total = 0
+
+    def _columns(self, hashes):
+        keys = np.asarray(hashes, dtype=np.int64).view(np.uint64)
+        with np.errstate(over='ignore'):
+            mixed = _HASH_MULTIPLIERS[:self.depth, None] * keys[None, :]
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.int64)
+
+    def add(self, hashes, counts=1):
+        """Add counts (scalar or per key) for an array of key hashes"""
+        columns = self._columns(hashes)
+        counts = np.broadcast_to(np.asarray(counts, dtype=np.int32), columns.shape[1:])
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, hashes):
+        columns = self._columns(hashes)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+
+def posting_ngrams(text, ngram_range=(1, 3)):
+    """
+    Distinct word n-grams of a cleaned text
+
+    N-grams starting or ending with a stopword, and tokens that are numbers or
+    a single character, are left out.
+    """
+    tokens = tokenize(text)
+    useful = [len(token) > 1 and not token.isdigit() for token in tokens]
+    edge = [useful[i] and token not in STOPWORDS for i, token in enumerate(tokens)]
+    grams = set()
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        for start in range(len(tokens) - n + 1):
+            end = start + n - 1
+            if edge[start] and edge[end] and all(useful[start:end + 1]):
+                grams.add(' '.join(tokens[start:end + 1]))
+    return grams
+
+
+def known_phrases(registry):
+    """Registry aliases (all taxonomies) and every word sequence inside them"""
+    known = set()
+    for aliases in registry.aliases:
+        for alias in aliases:
+            tokens = tokenize(alias)
+            for n in range(1, len(tokens) + 1):
+                for start in range(len(tokens) - n + 1):
+                    known.add(' '.join(tokens[start:start + n]))
+    return known
+
+
+class EmergingTermDetector:
+    """
+    Streaming detection of phrases that rise sharply between time buckets
+
+    Every posting adds its distinct word n-grams to the count-min sketch of its
+    bucket (quarter by default), so counts are postings containing the n-gram.
+    Per bucket a top-k candidate set keeps the most frequent n-grams; it is
+    pruned back to k with a heap whenever it reaches 2k. Postings are buffered
+    per bucket and added in batches. Memory is bounded by the number of
+    buckets, not by the corpus size.
+
+    Parameters:
+    known_terms (set): Phrases that are never flagged (see known_phrases)
+    freq (str): Pandas period frequency of the buckets ('Q', 'M', 'Y')
+    ngram_range (tuple): Smallest and largest n-gram length
+    top_k (int): Candidate n-grams kept per bucket
+    width (int): Counters per sketch row
+    depth (int): Sketch rows
+    batch_size (int): Postings buffered per bucket before they are added
+    """
+
+    def __init__(self, known_terms=(), freq='Q', ngram_range=(1, 3), top_k=500, width=1 << 18, depth=4,
+                 batch_size=500):
+        self.known_terms = set(known_terms)
+        self.freq = freq
+        self.ngram_range = ngram_range
+        self.top_k = top_k
+        self.width = width
+        self.depth = depth
+        self.batch_size = batch_size
+        self.sketches = {}
+        self.candidates = {}
+        self.postings = {}
+        self._buffers = {}
+
+    def add(self, text, date):
+        """Count the n-grams of one cleaned posting text; postings without a valid date are skipped"""
+        date = pd.to_datetime(date, errors='coerce')
+        if pd.isna(date):
+            return
+        bucket = str(date.to_period(self.freq))
+        if bucket not in self.sketches:
+            self.sketches[bucket] = CountMinSketch(self.width, self.depth)
+            self.candidates[bucket] = {}
+            self.postings[bucket] = 0
+            self._buffers[bucket] = []
+        self.postings[bucket] += 1
+        buffer = self._buffers[bucket]
+        buffer.append(posting_ngrams(text, self.ngram_range))
+        if len(buffer) >= self.batch_size:
+            self._flush(bucket)
+
+    def add_html(self, html_text, date):
+        self.add(clean_html(html_text, ' '), date)
+
+    def _flush(self, bucket):
+        buffer = self._buffers[bucket]
+        if not buffer:
+            return
+        grams = {}
+        for posting_grams in buffer:
+            for gram in posting_grams:
+                grams[gram] = grams.get(gram, 0) + 1
+        self._buffers[bucket] = []
+
+        names = list(grams)
+        hashes = np.fromiter((hash(gram) for gram in names), dtype=np.int64, count=len(names))
+        sketch = self.sketches[bucket]
+        sketch.add(hashes, np.fromiter(grams.values(), dtype=np.int32, count=len(names)))
+
+        # Only n-grams that can beat the weakest candidate are looked at
+        candidates = self.candidates[bucket]
+        estimates = sketch.estimate(hashes)
+        threshold = min(candidates.values()) if len(candidates) >= self.top_k else 0
+        for i in np.flatnonzero(estimates > threshold):
+            candidates[names[i]] = int(estimates[i])
+        if len(candidates) >= 2 * self.top_k:
+            kept = heapq.nlargest(self.top_k, candidates.items(), key=lambda item: item[1])
+            self.candidates[bucket] = dict(kept)
+
+    def flush(self):
+        """Add all buffered postings"""
+        for bucket in self._buffers:
+            self._flush(bucket)
+
+    def top_terms(self, bucket, n=20):
+        """Most frequent candidate n-grams of one bucket as (ngram, postings)"""
+        self.flush()
+        return heapq.nlargest(n, self.candidates[bucket].items(), key=lambda item: item[1])
+
+    def emerging(self, min_postings=20, min_growth=3.0):
+        """
+        N-grams whose share of postings grew at least min_growth times since the previous bucket
+
+        Known phrases are skipped. The previous share is smoothed with one
+        posting, so n-grams that are new in a bucket get a finite growth.
+        """
+        self.flush()
+        buckets = sorted(self.sketches, key=pd.Period)
+        rows = []
+        for previous, bucket in zip(buckets, buckets[1:]):
+            names = [gram for gram, count in self.candidates[bucket].items()
+                     if count >= min_postings and gram not in self.known_terms]
+            if not names:
+                continue
+            hashes = np.fromiter((hash(gram) for gram in names), dtype=np.int64, count=len(names))
+            current = self.sketches[bucket].estimate(hashes)
+            before = self.sketches[previous].estimate(hashes)
+            share = current / self.postings[bucket]
+            previous_share = (before + 1) / (self.postings[previous] + 1)
+            for gram, count, count_before, growth in zip(names, current, before, share / previous_share):
+                if growth >= min_growth:
+                    rows.append({
+                        'bucket': bucket, 'previous_bucket': previous, 'ngram': gram,
+                        'postings': int(count), 'share': count / self.postings[bucket],
+                        'previous_postings': int(count_before),
+                        'previous_share': count_before / self.postings[previous], 'growth': growth,
+                    })
+        columns = ['bucket', 'previous_bucket', 'ngram', 'postings', 'share', 'previous_postings',
+                   'previous_share', 'growth']
+        result = pd.DataFrame(rows, columns=columns)
+        return result.sort_values(['bucket', 'growth'], ascending=[True, False], kind='stable').reset_index(drop=True)
+
+
+def print_emerging_terms(emerging_df, per_bucket=10):
+    """Print the fastest rising n-grams per bucket"""
+    print("\n=== Emerging Terms ===")
+    if emerging_df.empty:
+        print("No emerging terms found")
+        return
+    for bucket, group in emerging_df.groupby('bucket', sort=False):
+        print(f"\n{bucket} (vs {group['previous_bucket'].iloc[0]}):")
+        for row in group.head(per_bucket).itertuples(index=False):
+            print(f"{row.ngram}: {row.postings:,} postings ({row.share * 100:.1f}%, "
+                  f"was {row.previous_share * 100:.1f}%, x{row.growth:.1f})")
+
+
+def scan_csv(input_filepath, detector, chunksize=50000):
+    """Feed every posting of a vacancy CSV to a detector, chunk by chunk"""
+    total_rows = 0
+    for chunk in iter_vacancy_csv(input_filepath, chunksize=chunksize, usecols=[TEXT_COLUMN, DATE_COLUMN]):
+        for html_text, date in zip(chunk[TEXT_COLUMN], chunk[DATE_COLUMN]):
+            detector.add_html(html_text, date)
+        total_rows += len(chunk)
+        print(f"Scanned {total_rows:,} postings for emerging terms...")
+    detector.flush()
+    return detector
+
+
+if __name__ == "__main__":
+    from competency_registry import REGISTRY
+
+    # File paths
+    input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions.csv"
+
+    # Quarterly sketches over the full file; known competencies and trends are not flagged
+    detector = scan_csv(input_file, EmergingTermDetector(known_phrases(REGISTRY)))
+    print_emerging_terms(detector.emerging())
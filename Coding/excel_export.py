@@ -0,0 +1,452 @@
+import datetime
+import math
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+from competency_registry import REGISTRY
+from confidence_intervals import wilson_interval
+from taxonomy import load_taxonomy
+from vacancy_columns import DATE_COLUMN, TEXT_COLUMN, posting_ids
+
+# Excel limits: rows per sheet (including the header), characters per cell and per sheet name
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_CELL_LENGTH = 32767
+EXCEL_MAX_SHEET_NAME = 31
+EXCEL_MAX_COLUMN_WIDTH = 255
+
+# Strings are written as they are: no formulas, URLs or numbers guessed from text
+WORKBOOK_OPTIONS = {
+    'constant_memory': True,
+    'strings_to_formulas': False,
+    'strings_to_urls': False,
+    'strings_to_numbers': False,
+    'use_zip64': True,
+}
+
+
+def excel_value(value):
+    """
+    Convert a value to something Excel can store
+
+    Missing values (None, NaN, NaT, pd.NA) and infinities become empty cells,
+    lists and sets are joined with '; ', numpy scalars become Python scalars and
+    texts are cut at the Excel cell limit.
+    """
+    if isinstance(value, (list, tuple, set, frozenset, np.ndarray)):
+        value = '; '.join(str(item) for item in value)
+    elif isinstance(value, np.generic):
+        value = value.item()
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, str):
+        return value[:EXCEL_MAX_CELL_LENGTH]
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime().replace(tzinfo=None)
+    return value
+
+
+class StyledSheetWriter:
+    """
+    Write a formatted Excel sheet in a single streaming pass
+
+    Rows are flushed to disk as they are written (xlsxwriter constant_memory mode),
+    so memory use does not grow with the number of rows. Column widths are tracked
+    while writing and applied when the workbook is closed.
+
+    Parameters:
+    output_path (str): Path of the .xlsx file to create
+    columns (list): Header names
+    fill_column (str): Column whose value selects the row fill colour
+    fills (dict): Mapping of fill_column value -> hex colour (e.g. 'ADD8E6')
+    default_fill (str): Colour for rows whose value is not in fills
+    sheet_name (str): Name of the worksheet
+    width_padding (int): Extra characters added to the widest value of each column
+    max_width (int): Upper bound of the column widths
+    workbook (xlsxwriter.Workbook): Add the sheet to this open workbook instead of
+        creating one at output_path; the workbook is then left open on close
+    """
+
+    def __init__(self, output_path, columns, fill_column=None, fills=None, default_fill=None,
+                 sheet_name='Sheet1', width_padding=5, max_width=EXCEL_MAX_COLUMN_WIDTH, workbook=None):
+        self.output_path = output_path
+        self.columns = list(columns)
+        self.width_padding = width_padding
+        self.max_width = max_width
+        self.rows_written = 0
+
+        self.owns_workbook = workbook is None
+        self.workbook = xlsxwriter.Workbook(output_path, WORKBOOK_OPTIONS) if workbook is None else workbook
+        self.worksheet = self.workbook.add_worksheet(sheet_name)
+
+        # Formats are created once and shared by every cell that uses them
+        self.header_format = self.workbook.add_format({'bold': True, 'align': 'center'})
+        self.date_format = self.workbook.add_format({'num_format': 'yyyy-mm-dd'})
+        self.fill_index = self.columns.index(fill_column) if fill_column is not None else None
+        self.fill_formats = {
+            value: self._fill_format(color) for value, color in (fills or {}).items()
+        }
+        self.default_format = self._fill_format(default_fill) if default_fill else None
+
+        # Header row
+        self.widths = [len(str(name)) for name in self.columns]
+        self.worksheet.write_row(0, 0, self.columns, self.header_format)
+
+    def _fill_format(self, color):
+        return self.workbook.add_format({'bg_color': f'#{color}', 'pattern': 1})
+
+    def write_row(self, values):
+        """Write one data row and update the tracked column widths"""
+        values = list(values)
+        cell_format = self.default_format
+        if self.fill_index is not None:
+            cell_format = self.fill_formats.get(values[self.fill_index], self.default_format)
+
+        self.rows_written += 1
+        row = self.rows_written
+        for col, value in enumerate(values):
+            value = excel_value(value)
+            if value is None:
+                self.worksheet.write_blank(row, col, None, cell_format)
+                continue
+            self.widths[col] = max(self.widths[col], len(str(value)))
+            if isinstance(value, str):
+                self.worksheet.write_string(row, col, value, cell_format)
+            elif isinstance(value, (bool, np.bool_)):
+                self.worksheet.write_boolean(row, col, value, cell_format)
+            elif isinstance(value, (int, float)):
+                self.worksheet.write_number(row, col, value, cell_format)
+            elif isinstance(value, (datetime.datetime, datetime.date)):
+                self.worksheet.write_datetime(row, col, value, cell_format or self.date_format)
+                self.widths[col] = max(self.widths[col], 10)
+            else:
+                self.worksheet.write_string(row, col, str(value)[:EXCEL_MAX_CELL_LENGTH], cell_format)
+
+    def write_rows(self, rows):
+        """Write an iterable of rows"""
+        for values in rows:
+            self.write_row(values)
+
+    def close(self):
+        """Apply the tracked column widths and finish the workbook"""
+        for col, width in enumerate(self.widths):
+            self.worksheet.set_column(col, col, min(width + self.width_padding, self.max_width))
+        if self.owns_workbook:
+            self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def write_styled_sheet(rows, output_path, columns, fill_column=None, fills=None, default_fill=None):
+    """
+    Write rows to a formatted Excel sheet in one pass and return the number of rows written
+    """
+    with StyledSheetWriter(output_path, columns, fill_column=fill_column, fills=fills,
+                           default_fill=default_fill) as writer:
+        writer.write_rows(rows)
+        return writer.rows_written
+
+
+def sheet_title(name, part=1):
+    """Excel-safe sheet name; every part after the first gets a ' (n)' suffix"""
+    name = str(name)
+    for character in '[]:*?/\\':
+        name = name.replace(character, ' ')
+    suffix = f" ({part})" if part > 1 else ''
+    return name.strip("'")[:EXCEL_MAX_SHEET_NAME - len(suffix)] + suffix
+
+
+class SplitSheetWriter:
+    """
+    Stream rows into a sheet that continues on a new sheet at the Excel row limit
+
+    The parts are named 'name', 'name (2)', 'name (3)', ... and each repeats the header.
+
+    Parameters:
+    workbook (xlsxwriter.Workbook): Open workbook
+    name (str): Name of the first part
+    columns (list): Header names
+    max_rows (int): Rows per sheet including the header
+    style: Further StyledSheetWriter arguments (fills, widths)
+    """
+
+    def __init__(self, workbook, name, columns, max_rows=EXCEL_MAX_ROWS, **style):
+        self.workbook = workbook
+        self.name = name
+        self.columns = list(columns)
+        self.max_rows = max_rows
+        self.style = style
+        self.parts = []
+        self._next_part()
+
+    def _next_part(self):
+        self.current = StyledSheetWriter(None, self.columns, workbook=self.workbook,
+                                         sheet_name=sheet_title(self.name, len(self.parts) + 1), **self.style)
+        self.parts.append(self.current)
+
+    @property
+    def rows_written(self):
+        return sum(part.rows_written for part in self.parts)
+
+    @property
+    def sheet_names(self):
+        return [part.worksheet.name for part in self.parts]
+
+    def write_row(self, values):
+        if self.current.rows_written >= self.max_rows - 1:
+            self._next_part()
+        self.current.write_row(values)
+
+    def write_rows(self, rows):
+        for values in rows:
+            self.write_row(values)
+
+    def close(self):
+        for part in self.parts:
+            part.close()
+
+
+class WorkbookWriter:
+    """
+    Write-only workbook with any number of row-limited sheets
+
+    All sheets stream their rows to disk (constant_memory), so a sheet can be
+    created first and filled last, e.g. a summary sheet that is only known once
+    every row has been written.
+
+    Parameters:
+    output_path (str): Path of the .xlsx file to create
+    max_rows (int): Rows per sheet including the header
+    max_width (int): Upper bound of the column widths
+    """
+
+    def __init__(self, output_path, max_rows=EXCEL_MAX_ROWS, max_width=80):
+        self.output_path = output_path
+        self.max_rows = max_rows
+        self.max_width = max_width
+        self.workbook = xlsxwriter.Workbook(output_path, WORKBOOK_OPTIONS)
+        self.sheets = []
+
+    def add_sheet(self, name, columns, **style):
+        """Add a sheet (continued on new sheets at the row limit) and return its writer"""
+        style.setdefault('max_width', self.max_width)
+        sheet = SplitSheetWriter(self.workbook, name, columns, max_rows=self.max_rows, **style)
+        self.sheets.append(sheet)
+        return sheet
+
+    def write_frame(self, name, df, **style):
+        """Write a (small) DataFrame to a new sheet and return the number of rows written"""
+        sheet = self.add_sheet(name, df.columns, **style)
+        sheet.write_rows(df.itertuples(index=False, name=None))
+        return sheet.rows_written
+
+    def close(self):
+        for sheet in self.sheets:
+            sheet.close()
+        self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def iter_frames(source, chunksize=100000):
+    """
+    DataFrame chunks of a source
+
+    source can be a DataFrame, a .csv or .parquet path (read chunk by chunk) or
+    an iterable of DataFrames, e.g. csv_loader.iter_vacancy_csv.
+    """
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    elif isinstance(source, str) and source.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif isinstance(source, str):
+        from csv_loader import iter_vacancy_csv
+
+        yield from iter_vacancy_csv(source, chunksize=chunksize)
+    else:
+        yield from source
+
+
+def _peek(chunks):
+    """First chunk and an iterator over all chunks (including the first)"""
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return None, iter(())
+    return first, (chunk for part in ([first], chunks) for chunk in part)
+
+
+def _rows_per_sheet(workbook):
+    return {part.worksheet.name: part.rows_written for sheet in workbook.sheets for part in sheet.parts}
+
+
+def _posting_columns(df, exclude):
+    return [column for column in df.columns if column not in exclude]
+
+
+def export_competency_workbook(source, output_path, registry=REGISTRY, share_table=None,
+                               competency_column='competencies', sections_column='competency_sections',
+                               confidence=0.95, chunksize=100000, max_rows=EXCEL_MAX_ROWS):
+    """
+    Export analyze_descriptions output to Excel in one streaming pass
+
+    Sheets:
+    - Top competencies: share of postings per competency with Wilson intervals
+      (the extractor's share_table when given, which may add bootstrap intervals)
+    - Per category: competencies, hits and postings per category
+    - Postings: one row per posting (without the HTML), with the competency names
+    - Competencies: one row per (posting, competency), the long format of write_results
+
+    The posting and competency sheets continue on new sheets at the Excel row
+    limit. source can be anything iter_frames accepts, so memory use only
+    depends on chunksize. Returns {sheet: rows written}.
+    """
+    first, chunks = _peek(iter_frames(source, chunksize))
+    if first is None:
+        raise ValueError("No postings to export")
+    columns = _posting_columns(first, {TEXT_COLUMN, competency_column, sections_column, 'id', 'posting_id'})
+    names = np.asarray(registry.names, dtype=object)
+
+    counts = np.zeros(len(registry), dtype=np.int64)
+    category_postings = Counter()
+    n_postings = 0
+    with WorkbookWriter(output_path, max_rows=max_rows) as workbook:
+        top_sheet = workbook.add_sheet('Top competencies', [
+            'competency_id', 'competency', 'category', 'postings', 'share', 'wilson_low', 'wilson_high']
+            if share_table is None else share_table.columns)
+        category_sheet = workbook.add_sheet('Per category', [
+            'category', 'competencies', 'hits', 'postings', 'share', 'wilson_low', 'wilson_high'])
+        postings_sheet = workbook.add_sheet(
+            'Postings', ['posting_id', *columns, 'n_competencies', 'competencies'])
+        hits_sheet = workbook.add_sheet(
+            'Competencies', ['posting_id', 'competency_id', 'competency', 'category', 'section'])
+
+        for chunk in chunks:
+            sections = chunk[sections_column] if sections_column in chunk.columns else [None] * len(chunk)
+            rows = zip(posting_ids(chunk).astype(str), chunk[competency_column], sections,
+                       chunk[columns].itertuples(index=False, name=None))
+            for posting_id, competency_ids, hit_sections, values in rows:
+                if not isinstance(competency_ids, (list, tuple, set, np.ndarray)):
+                    competency_ids = []
+                competency_ids = [int(c) for c in competency_ids]
+                postings_sheet.write_row([posting_id, *values, len(competency_ids), names[competency_ids]])
+                if hit_sections is None:
+                    hit_sections = [None] * len(competency_ids)
+                for competency_id, section in zip(competency_ids, hit_sections):
+                    hits_sheet.write_row([posting_id, competency_id, names[competency_id],
+                                          registry.category(competency_id), section])
+                counts[competency_ids] += 1
+                category_postings.update({registry.category(c) for c in competency_ids})
+            n_postings += len(chunk)
+
+        if share_table is None:
+            low, high = wilson_interval(counts, n_postings, confidence)
+            found = np.flatnonzero(counts)
+            found = found[np.argsort(-counts[found], kind='stable')]
+            top_sheet.write_rows(
+                (i, names[i], registry.category(i), counts[i], counts[i] / n_postings, low[i], high[i])
+                for i in found)
+        else:
+            top_sheet.write_rows(share_table.itertuples(index=False, name=None))
+
+        categories = pd.DataFrame({'category': registry.categories, 'hits': counts})
+        categories = categories[categories['hits'] > 0].groupby('category', sort=False)['hits'].agg(['size', 'sum'])
+        categories['postings'] = [category_postings[category] for category in categories.index]
+        categories = categories.sort_values('postings', ascending=False, kind='stable')
+        low, high = wilson_interval(categories['postings'].to_numpy(), n_postings, confidence)
+        category_sheet.write_rows(zip(
+            categories.index, categories['size'], categories['sum'], categories['postings'],
+            categories['postings'] / n_postings, low, high))
+
+    written = _rows_per_sheet(workbook)
+    print(f"Saved {n_postings:,} postings and {int(counts.sum()):,} competency hits to {output_path} "
+          f"({len(written)} sheets)")
+    return written
+
+
+def agency_categories():
+    """{agency: category} for the digital agencies; an agency listed twice keeps its first category"""
+    categories = {}
+    for category, agencies in load_taxonomy('agencies')['digital_agencies'].items():
+        for agency in agencies:
+            categories.setdefault(agency, category)
+    return categories
+
+
+def export_agency_workbook(source, output_path, chunksize=100000, max_rows=EXCEL_MAX_ROWS):
+    """
+    Export filter_agency_positions output to Excel in one streaming pass
+
+    Sheets:
+    - Per category: agencies with positions, positions and share per agency category
+    - Per agency: positions and first / last datefound per agency
+    - Positions: one row per position (without the HTML) with its agency category
+
+    The positions sheet continues on new sheets at the Excel row limit; the
+    summaries only keep one counter per agency. Returns {sheet: rows written}.
+    """
+    first, chunks = _peek(iter_frames(source, chunksize))
+    if first is None:
+        raise ValueError("No positions to export")
+    columns = _posting_columns(first, {TEXT_COLUMN})
+    categories = agency_categories()
+
+    positions = Counter()
+    first_seen, last_seen = {}, {}
+    n_positions = 0
+    with WorkbookWriter(output_path, max_rows=max_rows) as workbook:
+        category_sheet = workbook.add_sheet('Per category', ['category', 'agencies', 'positions', 'share'])
+        agency_sheet = workbook.add_sheet(
+            'Per agency', ['category', 'agency', 'positions', 'share', 'first_datefound', 'last_datefound'])
+        positions_sheet = workbook.add_sheet('Positions', ['agency_category', *columns])
+
+        for chunk in chunks:
+            organizations = chunk['organizationname']
+            chunk_categories = organizations.map(categories)
+            positions_sheet.write_rows(
+                (category, *values) for category, values in
+                zip(chunk_categories, chunk[columns].itertuples(index=False, name=None)))
+
+            positions.update(organizations.dropna())
+            if DATE_COLUMN in chunk.columns:
+                dates = pd.to_datetime(chunk[DATE_COLUMN], errors='coerce')
+                for agency, low in dates.groupby(organizations).min().dropna().items():
+                    first_seen[agency] = min(first_seen.get(agency, low), low)
+                for agency, high in dates.groupby(organizations).max().dropna().items():
+                    last_seen[agency] = max(last_seen.get(agency, high), high)
+            n_positions += len(chunk)
+
+        agencies = pd.DataFrame({'agency': list(positions), 'positions': list(positions.values())})
+        agencies['category'] = agencies['agency'].map(categories)
+        agencies = agencies.sort_values(['positions', 'agency'], ascending=[False, True], kind='stable')
+        agency_sheet.write_rows(
+            (row.category, row.agency, row.positions, row.positions / n_positions,
+             first_seen.get(row.agency), last_seen.get(row.agency))
+            for row in agencies.itertuples(index=False))
+
+        per_category = agencies.groupby('category', sort=False)['positions'].agg(['size', 'sum'])
+        per_category = per_category.sort_values('sum', ascending=False, kind='stable')
+        category_sheet.write_rows((category, row['size'], row['sum'], row['sum'] / n_positions)
+                                  for category, row in per_category.iterrows())
+
+    written = _rows_per_sheet(workbook)
+    print(f"Saved {n_positions:,} positions of {len(agencies):,} agencies to {output_path} ({len(written)} sheets)")
+    return written
@@ -0,0 +1,357 @@
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from http import HTTPStatus
+
+import numpy as np
+
+MAX_BODY_BYTES = 64 << 20
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent extraction requests into batches
+
+    Requests wait in a queue; the worker takes the first one, then keeps
+    collecting until max_batch_size postings are waiting or max_wait seconds
+    have passed, and extracts the whole batch in one call in a worker thread
+    (the event loop keeps accepting requests meanwhile).
+
+    Parameters:
+    extract_batch (callable): Function from a list of texts to a list of results
+    max_batch_size (int): Largest number of postings per batch
+    max_wait (float): Longest time in seconds a posting waits for others to join its batch
+    """
+
+    def __init__(self, extract_batch, max_batch_size=32, max_wait=0.005):
+        self.extract_batch = extract_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.batch_sizes = deque(maxlen=10000)
+        self.batch_seconds = deque(maxlen=10000)
+        self._worker = None
+
+    def start(self):
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def extract(self, texts):
+        """Results for a list of texts, extracted together with other waiting requests"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self.queue.put_nowait((text, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                # Take what is already queued without waiting, then wait up to the deadline
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(None, self.extract_batch, [text for text, _ in batch])
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            self.batch_sizes.append(len(batch))
+            self.batch_seconds.append(time.perf_counter() - started)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class ServiceMetrics:
+    """Request counters and recent latencies of the extraction service"""
+
+    def __init__(self, window=10000):
+        self.started = time.time()
+        self.requests = 0
+        self.postings = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+        self.completed = deque(maxlen=window)
+
+    def record(self, postings, seconds):
+        self.requests += 1
+        self.postings += postings
+        self.latencies.append(seconds)
+        self.completed.append((time.time(), postings))
+
+    def snapshot(self, batcher):
+        now = time.time()
+        recent = [(moment, postings) for moment, postings in self.completed if now - moment <= 60]
+        window = min(60.0, now - self.started) or 1.0
+        latencies = np.asarray(self.latencies, dtype=np.float64) * 1000
+        percentiles = np.percentile(latencies, [50, 95, 99]) if len(latencies) else [None] * 3
+        batch_sizes = np.asarray(batcher.batch_sizes, dtype=np.float64)
+        return {
+            'uptime_seconds': round(now - self.started, 1),
+            'requests': self.requests,
+            'postings': self.postings,
+            'errors': self.errors,
+            'queue_depth': batcher.queue.qsize(),
+            'batches': len(batch_sizes),
+            'mean_batch_size': round(float(batch_sizes.mean()), 2) if len(batch_sizes) else None,
+            'mean_batch_ms': round(float(np.mean(batcher.batch_seconds)) * 1000, 2) if batcher.batch_seconds else None,
+            'latency_ms': {name: (round(float(value), 2) if value is not None else None)
+                           for name, value in zip(('p50', 'p95', 'p99'), percentiles)},
+            'postings_per_second_last_minute': round(sum(postings for _, postings in recent) / window, 1),
+        }
+
+
+class ExtractionService:
+    """
+    Local HTTP service around a warm CompetencyExtractor
+
+    Endpoints:
+    - POST /extract with {"text": "..."} returns {"competencies": [...], "language": "..."}
+    - POST /extract with {"postings": [{"id": ..., "text": "..."}, ...]} (or {"texts": [...]})
+      returns {"results": [{"id": ..., "competencies": [...], "language": "..."}, ...]}
+    - GET /metrics returns latency and throughput figures, GET /health returns {"status": "ok"}
+
+    Competencies are the records of CompetencyExtractor.competency_records.
+    Only the standard library is used (asyncio streams, HTTP/1.1 with keep-alive).
+
+    Parameters:
+    extractor (CompetencyExtractor): Extractor kept in memory
+    host (str): Interface to listen on (localhost by default)
+    port (int): Port to listen on
+    max_batch_size (int): Largest micro-batch
+    max_wait (float): Longest wait in seconds for a micro-batch to fill
+    """
+
+    def __init__(self, extractor, host='127.0.0.1', port=8765, max_batch_size=32, max_wait=0.005):
+        self.extractor = extractor
+        self.host = host
+        self.port = port
+        self.batcher = MicroBatcher(self._extract_batch, max_batch_size=max_batch_size, max_wait=max_wait)
+        self.metrics = ServiceMetrics()
+        self.server = None
+
+    def _extract_batch(self, texts):
+        return [
+            {'competencies': self.extractor.competency_records(ids), 'language': language}
+            for ids, language in self.extractor.extract_batch(texts)
+        ]
+
+    async def start(self):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        print(f"Extraction service listening on http://{self.host}:{self.port}")
+        return self
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._route(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as error:
+            _write_response(writer, HTTPStatus.BAD_REQUEST, {'error': str(error)}, keep_alive=False)
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        path = path.split('?', 1)[0]
+        if path == '/health' and method == 'GET':
+            return HTTPStatus.OK, {'status': 'ok'}
+        if path == '/metrics' and method == 'GET':
+            return HTTPStatus.OK, self.metrics.snapshot(self.batcher)
+        if path != '/extract':
+            return HTTPStatus.NOT_FOUND, {'error': f"Unknown path {path}"}
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Use POST /extract'}
+
+        started = time.perf_counter()
+        try:
+            request = json.loads(body or b'{}')
+            single = 'text' in request
+            if single:
+                postings = [{'text': request['text']}]
+            elif 'postings' in request:
+                postings = list(request['postings'])
+            elif 'texts' in request:
+                postings = [{'text': text} for text in request['texts']]
+            else:
+                raise ValueError("Expected 'text', 'texts' or 'postings'")
+            texts = [posting.get('text') for posting in postings]
+            if not all(text is None or isinstance(text, str) for text in texts):
+                raise ValueError("Posting texts must be strings")
+        except (ValueError, TypeError, AttributeError) as error:
+            self.metrics.errors += 1
+            return HTTPStatus.BAD_REQUEST, {'error': str(error)}
+
+        try:
+            results = await self.batcher.extract(texts)
+        except Exception as error:
+            self.metrics.errors += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(error)}
+        self.metrics.record(len(texts), time.perf_counter() - started)
+
+        if single:
+            return HTTPStatus.OK, results[0]
+        return HTTPStatus.OK, {'results': [
+            {'id': posting.get('id'), **result} for posting, result in zip(postings, results)]}
+
+
+async def _read_request(reader):
+    """(method, path, headers, body) of the next request, or None when the client closed the connection"""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise ValueError("Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_BYTES:
+        raise ValueError(f"Request body larger than {MAX_BODY_BYTES:,} bytes")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path, headers, body
+
+
+def _write_response(writer, status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + body)
+
+
+async def _post(reader, writer, host, path, payload):
+    body = json.dumps(payload).encode('utf-8')
+    writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                  f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+    await writer.drain()
+    status_line = await reader.readline()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    response = await reader.readexactly(int(headers.get('content-length', 0)))
+    return int(status_line.split()[1]), json.loads(response)
+
+
+async def load_test(texts, host='127.0.0.1', port=8765, requests=1000, concurrency=32, batch_size=1):
+    """
+    Send requests from concurrency keep-alive clients and report throughput and latency
+
+    Every request carries batch_size texts, cycling through texts.
+    """
+    latencies = []
+    counter = iter(range(requests))
+    failures = 0
+
+    async def client():
+        nonlocal failures
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for number in counter:
+                start = number * batch_size
+                batch = [texts[(start + i) % len(texts)] for i in range(batch_size)]
+                payload = {'text': batch[0]} if batch_size == 1 else {'texts': batch}
+                started = time.perf_counter()
+                status, _ = await _post(reader, writer, host, '/extract', payload)
+                latencies.append(time.perf_counter() - started)
+                failures += status != 200
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.asarray(latencies) * 1000
+    print(f"\n=== Load test: {requests:,} requests x {batch_size} postings, {concurrency} clients ===")
+    print(f"Elapsed: {elapsed:.2f}s, failures: {failures}")
+    print(f"Throughput: {requests / elapsed:,.1f} requests/s, {requests * batch_size / elapsed:,.1f} postings/s")
+    print("Latency p50 {:.1f} ms, p95 {:.1f} ms, p99 {:.1f} ms".format(*np.percentile(latencies_ms, [50, 95, 99])))
+    return {'elapsed': elapsed, 'failures': failures, 'latencies_ms': latencies_ms}
+
+
+async def run_load_test(extractor, texts, max_batch_size=32, max_wait=0.005, **kwargs):
+    """Start a service on a free local port, load test it and print its metrics"""
+    service = await ExtractionService(extractor, port=0, max_batch_size=max_batch_size, max_wait=max_wait).start()
+    try:
+        result = await load_test(texts, port=service.port, **kwargs)
+        print(f"Service metrics: {json.dumps(service.metrics.snapshot(service.batcher))}")
+        return result
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    from competency_analysis import CompetencyExtractor
+
+    # Load the models once; other tools post to http://127.0.0.1:8765/extract
+    extractor = CompetencyExtractor()
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'loadtest':
+        # File path
+        from csv_loader import read_vacancy_csv
+        from vacancy_columns import TEXT_COLUMN
+        input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions.csv"
+        sample_texts = read_vacancy_csv(input_file, usecols=[TEXT_COLUMN])[TEXT_COLUMN].dropna().head(2000).tolist()
+        asyncio.run(run_load_test(extractor, sample_texts, requests=2000, concurrency=32))
+    else:
+        asyncio.run(ExtractionService(extractor).serve_forever())
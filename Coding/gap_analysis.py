@@ -0,0 +1,274 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from competency_registry import REGISTRY, check_registry, registry_state
+
+
+class CompetencyGapAnalyzer:
+    """
+    Compare market demand (job postings) with curriculum coverage (HU programmes)
+
+    Both sides are mapped onto the shared id space of the competency registry.
+    Market data is kept as a year x competency matrix of posting counts, curriculum
+    data as a programme x competency matrix of item counts. New data drops are
+    added on top of the stored counts, so recomputing the gap table never
+    reprocesses earlier postings. Named market sources are remembered, so adding
+    the same file again is skipped instead of counted twice.
+    """
+
+    def __init__(self, registry=REGISTRY):
+        self.registry = registry
+        n_terms = len(registry)
+        self.in_market = np.zeros(n_terms, dtype=bool)
+        self.in_market[registry.ids_for('market', 'trends')] = True
+        self.in_curriculum = np.zeros(n_terms, dtype=bool)
+        self.in_curriculum[registry.ids_for('hu_soft_skills', 'hu_competencies')] = True
+
+        self.categories = sorted({c for c in registry.categories if c is not None})
+        category_index = {c: i for i, c in enumerate(self.categories)}
+        self.term_category = np.asarray([category_index[c] for c in registry.categories], dtype=np.int64)
+
+        self.market_sources = []
+        self.years = []
+        self.market_postings = np.zeros(0, dtype=np.int64)
+        self.market_hits = np.zeros((0, n_terms), dtype=np.int64)
+        self.market_category_hits = np.zeros((0, len(self.categories)), dtype=np.int64)
+        # Same, counting only the competencies both taxonomies look for (gap_table(shared_only=True))
+        self.market_shared_category_hits = np.zeros((0, len(self.categories)), dtype=np.int64)
+
+        self.programmes = []
+        self.curriculum_items = np.zeros(0, dtype=np.int64)
+        self.curriculum_hits = np.zeros((0, n_terms), dtype=np.int64)
+
+    def _year_rows(self, years):
+        """Return the row of every year, adding unseen years"""
+        for year in sorted(set(years) - set(self.years)):
+            self.years.append(year)
+            self.market_postings = np.pad(self.market_postings, (0, 1))
+            self.market_hits = np.pad(self.market_hits, ((0, 1), (0, 0)))
+            self.market_category_hits = np.pad(self.market_category_hits, ((0, 1), (0, 0)))
+            self.market_shared_category_hits = np.pad(self.market_shared_category_hits, ((0, 1), (0, 0)))
+        year_index = {year: i for i, year in enumerate(self.years)}
+        return np.asarray([year_index[year] for year in years], dtype=np.int64)
+
+    def add_market(self, df, competency_column='competencies', date_column='datefound', source=None):
+        """
+        Add a batch of analysed job postings (output of CompetencyExtractor.analyze_descriptions)
+
+        source names the batch (e.g. its file path); a source that was already
+        added is skipped. Returns whether the batch was added.
+        """
+        if source is not None and source in self.market_sources:
+            print(f"Market source {source} was already added; skipped")
+            return False
+
+        years = pd.to_datetime(df[date_column], errors='coerce').dt.year
+        valid = years.notna().to_numpy()
+        comp_lists = df[competency_column].to_numpy()[valid]
+        year_rows = self._year_rows(years[valid].astype(int).tolist())
+
+        # Flatten to (posting, competency id) pairs
+        lengths = np.fromiter((len(c) for c in comp_lists), dtype=np.int64, count=len(comp_lists))
+        posting_idx = np.repeat(np.arange(len(comp_lists)), lengths)
+        ids = np.fromiter((c for comp_list in comp_lists for c in comp_list), dtype=np.int64,
+                          count=int(lengths.sum()))
+
+        np.add.at(self.market_postings, year_rows, 1)
+        np.add.at(self.market_hits, (year_rows[posting_idx], ids), 1)
+
+        # Category presence per posting (a posting counts once per category)
+        pairs = np.unique(np.stack([posting_idx, self.term_category[ids]]), axis=1)
+        np.add.at(self.market_category_hits, (year_rows[pairs[0]], pairs[1]), 1)
+        shared = (self.in_market & self.in_curriculum)[ids]
+        pairs = np.unique(np.stack([posting_idx[shared], self.term_category[ids[shared]]]), axis=1)
+        np.add.at(self.market_shared_category_hits, (year_rows[pairs[0]], pairs[1]), 1)
+        if source is not None:
+            self.market_sources.append(source)
+        print(f"Added {len(year_rows):,} postings to the market side ({len(self.years)} years)")
+        return True
+
+    def add_market_corpus(self, corpus):
+        """Add all postings of a TokenCorpus, matching the market terms directly on the token arrays"""
+        market = corpus.postings[['posting_id', 'datefound']].copy()
+        market['competencies'] = corpus.match_terms(self.registry.alias_pairs('market', 'trends'))
+        self.add_market(market)
+
+    def add_curriculum(self, programme, hu_df, id_column='Id', source_column='Bron', term_column='Naam'):
+        """
+        Add (or replace) one programme from the output of extract_hu_data
+
+        Sheets without an id column (written before the registry existed) are
+        mapped onto the registry through their term column; unknown terms are skipped.
+        """
+        if id_column not in hu_df.columns:
+            hu_df = hu_df.assign(**{id_column: hu_df[term_column].map(self.registry.lookup)})
+            unknown = hu_df[id_column].isna()
+            if unknown.any():
+                print(f"Skipped {unknown.sum():,} curriculum items with terms outside the registry")
+            hu_df = hu_df[~unknown]
+        hu_df = hu_df.drop_duplicates(subset=[id_column, source_column])
+
+        if programme not in self.programmes:
+            self.programmes.append(programme)
+            self.curriculum_items = np.pad(self.curriculum_items, (0, 1))
+            self.curriculum_hits = np.pad(self.curriculum_hits, ((0, 1), (0, 0)))
+        row = self.programmes.index(programme)
+
+        self.curriculum_hits[row] = 0
+        self.curriculum_items[row] = hu_df[source_column].nunique()
+        np.add.at(self.curriculum_hits[row], hu_df[id_column].to_numpy(dtype=np.int64), 1)
+        print(f"Added programme '{programme}' with {self.curriculum_items[row]:,} curriculum items")
+
+    def demand_share(self):
+        """Share of postings mentioning each competency, overall (terms,) and per year (years x terms)"""
+        per_year = self.market_hits / np.maximum(self.market_postings, 1)[:, None]
+        overall = self.market_hits.sum(axis=0) / max(self.market_postings.sum(), 1)
+        return overall, per_year
+
+    def coverage(self):
+        """Per-programme coverage (programmes x terms, 0/1) and share of programmes covering each competency"""
+        covered = (self.curriculum_hits > 0).astype(float)
+        share = covered.mean(axis=0) if len(self.programmes) else np.zeros(len(self.registry))
+        return covered, share
+
+    def gap_table(self, by='term', shared_only=True):
+        """
+        Build the ranked gap table
+
+        gap = market demand share - curriculum coverage share. A positive gap means
+        the market asks for a competency more often than the programmes cover it.
+
+        Parameters:
+        by (str): 'term' or 'category'
+        shared_only (bool): Only keep competencies that both taxonomies look for
+        """
+        overall, per_year = self.demand_share()
+        covered, coverage_share = self.coverage()
+
+        if by == 'category':
+            # Demand: share of postings mentioning any competency of the category.
+            # Coverage: share of programmes covering any competency of the category.
+            # With shared_only both only count the competencies of the term-level table.
+            onehot = np.eye(len(self.categories))[self.term_category]
+            category_hits = self.market_category_hits
+            if shared_only:
+                onehot *= (self.in_market & self.in_curriculum)[:, None]
+                category_hits = self.market_shared_category_hits
+            category_covered = (covered @ onehot) > 0
+            table = pd.DataFrame({
+                'category': self.categories,
+                'demand_share': category_hits.sum(axis=0) / max(self.market_postings.sum(), 1),
+                'coverage_share': category_covered.mean(axis=0) if len(self.programmes) else 0.0,
+            })
+            per_year = category_hits / np.maximum(self.market_postings, 1)[:, None]
+            for i, year in enumerate(self.years):
+                table[f'demand_{year}'] = per_year[i]
+            table = table[onehot.sum(axis=0) > 0]
+        else:
+            table = pd.DataFrame({
+                'id': np.arange(len(self.registry)),
+                'term': self.registry.names,
+                'category': self.registry.categories,
+                'demand_share': overall,
+                'coverage_share': coverage_share,
+            })
+            for i, year in enumerate(self.years):
+                table[f'demand_{year}'] = per_year[i]
+            for i, programme in enumerate(self.programmes):
+                table[f'covered_{programme}'] = covered[i]
+            if shared_only:
+                table = table[self.in_market & self.in_curriculum]
+
+        table['gap'] = table['demand_share'] - table['coverage_share']
+        return table.sort_values('gap', ascending=False).reset_index(drop=True)
+
+    def export_gap_table(self, output_filepath, by='term', shared_only=True):
+        """Save the ranked gap table to CSV"""
+        table = self.gap_table(by=by, shared_only=shared_only)
+        table.to_csv(output_filepath, index=False)
+        print(f"Gap table ({len(table):,} rows) saved to {output_filepath}")
+        return table
+
+    def save(self, state_dir):
+        """Persist the counts so the next data drop can be added incrementally"""
+        os.makedirs(state_dir, exist_ok=True)
+        np.savez_compressed(
+            os.path.join(state_dir, 'gap_counts.npz'),
+            market_postings=self.market_postings, market_hits=self.market_hits,
+            market_category_hits=self.market_category_hits,
+            market_shared_category_hits=self.market_shared_category_hits,
+            curriculum_items=self.curriculum_items, curriculum_hits=self.curriculum_hits,
+        )
+        with open(os.path.join(state_dir, 'gap_state.json'), 'w', encoding='utf-8') as f:
+            json.dump({'years': self.years, 'categories': self.categories, 'programmes': self.programmes,
+                       'market_sources': self.market_sources, **registry_state(self.registry)},
+                      f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, state_dir, registry=REGISTRY):
+        """
+        Load counts saved with save(); competencies added to the registry since then start at zero
+
+        Raises ValueError when competencies were renamed, removed or re-numbered
+        since the state was saved, because the counts would land on the wrong ids.
+        """
+        analyzer = cls(registry)
+        with open(os.path.join(state_dir, 'gap_state.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        n_competencies = check_registry(meta, registry, 'gap state')
+        if meta['categories'] != analyzer.categories:
+            raise ValueError("Saved gap state uses different competency categories; rebuild it")
+        analyzer.years = meta['years']
+        analyzer.programmes = meta['programmes']
+        analyzer.market_sources = meta['market_sources']
+
+        counts = np.load(os.path.join(state_dir, 'gap_counts.npz'))
+        new_terms = len(registry) - n_competencies
+        analyzer.market_postings = counts['market_postings']
+        analyzer.market_hits = np.pad(counts['market_hits'], ((0, 0), (0, new_terms)))
+        analyzer.market_category_hits = counts['market_category_hits']
+        if 'market_shared_category_hits' not in counts:
+            raise ValueError("Saved gap state has no shared-competency category counts; rebuild it")
+        analyzer.market_shared_category_hits = counts['market_shared_category_hits']
+        analyzer.curriculum_items = counts['curriculum_items']
+        analyzer.curriculum_hits = np.pad(counts['curriculum_hits'], ((0, 0), (0, new_terms)))
+        return analyzer
+
+
+if __name__ == "__main__":
+    import glob
+
+    from result_writer import read_competency_lists
+
+    # File paths
+    market_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/marketing_positions_2020_digital_agencies.parquet"
+    curriculum_dir = "Testing with code copies/Real testing/excel_files"
+    state_dir = "/Users/dennishagen/Desktop/Verzameldocumenten master/gap_state"
+    output_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/competency_gaps.csv"
+
+    if os.path.exists(state_dir):
+        analyzer = CompetencyGapAnalyzer.load(state_dir)
+    else:
+        analyzer = CompetencyGapAnalyzer()
+
+    # Market side: analysed postings; a file that is already in the saved state is not counted again
+    if market_file in analyzer.market_sources:
+        print(f"{market_file} is already in the gap state")
+    else:
+        market_df = read_competency_lists(market_file, columns=['posting_id', 'datefound'])
+        analyzer.add_market(market_df, source=market_file)
+
+    # Curriculum side: one Excel file per programme (replaces the earlier counts of that programme)
+    for path in glob.glob(os.path.join(curriculum_dir, '*.xlsx')):
+        programme = os.path.splitext(os.path.basename(path))[0]
+        analyzer.add_curriculum(programme, pd.read_excel(path))
+
+    analyzer.save(state_dir)
+    gaps = analyzer.export_gap_table(output_file)
+    print("\nTop 20 competency gaps:")
+    for _, row in gaps.head(20).iterrows():
+        print(f"{row['term']} ({row['category']}): demand {row['demand_share'] * 100:.1f}%, "
+              f"covered by {row['coverage_share'] * 100:.0f}% of programmes")
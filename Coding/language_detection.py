@@ -0,0 +1,50 @@
+import re
+
+WORD_PATTERN = re.compile(r'[a-zà-ÿ]+')
+
+# Frequent function words; words used in both languages ('in', 'is', 'we', ...) are left out
+DUTCH_STOPWORDS = frozenset("""
+    de het een en van op te dat die voor met zijn er aan als bij door om ook je jij jouw wij ons onze
+    naar niet maar dan wat worden heb hebt heeft hebben binnen uit zal zullen kunnen kun kan
+    wordt deze dit bent ben wil wilt graag jaar ervaring goede werk onder tot zoals hoe waar wie
+""".split())
+
+ENGLISH_STOPWORDS = frozenset("""
+    the a an and of to for with are be you your our will as at by from this that it or have has
+    who what which within about into can would should their they experience work
+    looking join strong good knowledge ability such how where
+""".split()) - DUTCH_STOPWORDS
+
+LANGUAGES = ('nl', 'en')
+
+
+def stopword_counts(text, max_chars=3000):
+    """Number of Dutch and English stopwords in the first max_chars characters of a cleaned text"""
+    dutch = english = 0
+    for word in WORD_PATTERN.findall(text[:max_chars]):
+        if word in DUTCH_STOPWORDS:
+            dutch += 1
+        elif word in ENGLISH_STOPWORDS:
+            english += 1
+    return dutch, english
+
+
+def detect_language(text, min_stopwords=5, dominance=0.75, max_chars=3000):
+    """
+    Cheap language identification of a cleaned (lowercase) posting text
+
+    Counts Dutch and English stopwords; a language wins when it has at least
+    `dominance` of the stopword hits. Returns 'nl', 'en', 'mixed' (no clear
+    winner) or 'unknown' (fewer than min_stopwords hits, e.g. empty postings).
+    """
+    if not text:
+        return 'unknown'
+    dutch, english = stopword_counts(text, max_chars)
+    total = dutch + english
+    if total < min_stopwords:
+        return 'unknown'
+    if dutch >= dominance * total:
+        return 'nl'
+    if english >= dominance * total:
+        return 'en'
+    return 'mixed'
@@ -0,0 +1,122 @@
+import glob
+import os
+import re
+import shutil
+
+import pandas as pd
+
+from csv_loader import iter_vacancy_csv
+from vacancy_columns import DATE_COLUMN
+
+PARTITION_PATTERN = re.compile(r'year=(\d{4})[\\/]month=(\d{2})$')
+
+
+def write_partitions(input_filepath, root, date_column=DATE_COLUMN, chunksize=100000, overwrite=False):
+    """
+    Split the vacancy dump into year/month partitions of datefound
+
+    Layout: root/year=YYYY/month=MM/part-NNNNN.parquet, plus root/undated/ for
+    rows without a valid date. The CSV is read in chunks and every chunk adds one
+    part file to each partition it touches. All columns except the date are
+    stored as strings so every part file has the same schema.
+    """
+    if os.path.isdir(root) and os.listdir(root):
+        if not overwrite:
+            raise FileExistsError(f"Partition root {root} is not empty (use overwrite=True)")
+        shutil.rmtree(root)
+
+    print(f"Partitioning {input_filepath} by {date_column} into {root}...")
+    total_rows = 0
+    partitions = set()
+    for part_number, chunk in enumerate(iter_vacancy_csv(input_filepath, chunksize=chunksize)):
+        chunk[date_column] = pd.to_datetime(chunk[date_column], errors='coerce')
+        dated = chunk[date_column].notna()
+
+        for (year, month), group in chunk[dated].groupby([chunk[date_column].dt.year, chunk[date_column].dt.month]):
+            partition = os.path.join(root, f"year={int(year):04d}", f"month={int(month):02d}")
+            os.makedirs(partition, exist_ok=True)
+            group.to_parquet(os.path.join(partition, f"part-{part_number:05d}.parquet"), index=False)
+            partitions.add(partition)
+
+        if not dated.all():
+            partition = os.path.join(root, 'undated')
+            os.makedirs(partition, exist_ok=True)
+            chunk[~dated].to_parquet(os.path.join(partition, f"part-{part_number:05d}.parquet"), index=False)
+
+        total_rows += len(chunk)
+        print(f"Processed {total_rows:,} rows...")
+
+    print(f"Wrote {total_rows:,} rows into {len(partitions):,} year/month partitions")
+
+
+def list_partitions(root):
+    """Return {(year, month): partition directory} for all dated partitions"""
+    partitions = {}
+    for path in glob.glob(os.path.join(root, 'year=*', 'month=*')):
+        match = PARTITION_PATTERN.search(path)
+        if match:
+            partitions[(int(match.group(1)), int(match.group(2)))] = path
+    return partitions
+
+
+def _empty_frame(root, columns, date_column):
+    """Return a frame without rows but with the columns and dtypes of the stored partitions"""
+    parts = sorted(glob.glob(os.path.join(root, 'year=*', 'month=*', '*.parquet')))
+    parts += sorted(glob.glob(os.path.join(root, 'undated', '*.parquet')))
+    if parts:
+        return pd.read_parquet(parts[0], columns=columns).iloc[:0]
+    # Nothing partitioned yet: keep at least the date column so callers can filter on it
+    names = columns if columns is not None else [date_column]
+    return pd.DataFrame({
+        name: pd.Series(dtype='datetime64[ns]' if name == date_column else 'object')
+        for name in names
+    })
+
+
+def load_partitions(root, start=None, end=None, columns=None, date_column=DATE_COLUMN):
+    """
+    Load the rows with start <= datefound < end, opening only the matching partitions
+
+    Parameters:
+    root (str): Partition root written by write_partitions
+    start, end (str or Timestamp): Date window; None means unbounded
+    columns (list): Columns to read (default: all)
+    """
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    if columns is not None and date_column not in columns:
+        columns = [date_column] + list(columns)
+
+    selected = []
+    for (year, month), path in sorted(list_partitions(root).items()):
+        month_start = pd.Timestamp(year=year, month=month, day=1)
+        month_end = month_start + pd.DateOffset(months=1)
+        if (start is None or month_end > start) and (end is None or month_start < end):
+            selected.append(path)
+
+    frames = [
+        pd.read_parquet(part, columns=columns)
+        for path in selected
+        for part in sorted(glob.glob(os.path.join(path, '*.parquet')))
+    ]
+    if not frames:
+        return _empty_frame(root, columns, date_column)
+    df = pd.concat(frames, ignore_index=True)
+
+    # Partitions at the edges of the window may contain rows outside it
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df[date_column] >= start
+    if end is not None:
+        mask &= df[date_column] < end
+    print(f"Loaded {mask.sum():,} rows from {len(selected):,} partitions")
+    return df[mask].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # File paths
+    input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions.csv"
+    partition_root = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions_by_month"
+
+    # Write the partitions once; later runs read only the months they need
+    write_partitions(input_file, partition_root)
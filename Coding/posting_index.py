@@ -0,0 +1,296 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from competency_registry import REGISTRY, check_registry, registry_state
+from skill_matcher import SkillMatcher
+from taxonomy import load_taxonomy
+from text_cleaning import clean_html
+from vacancy_columns import DATE_COLUMN, TEXT_COLUMN, posting_ids
+
+SPACES = ('text', 'competencies')
+META_FILE = 'index.json'
+FREQUENCIES_FILE = 'frequencies.npz'
+
+
+class PostingIndex:
+    """
+    Persisted similarity index over postings, with incremental additions
+
+    Every posting gets two sparse vectors: hashed word frequencies of its
+    cleaned text ('text') and the presence of registry competencies
+    ('competencies'). Following the lnc.ltc scheme, posting vectors are
+    log-tf and unit length without idf, and the idf is applied to the query
+    only, from the document frequencies of everything added so far. Adding
+    postings therefore never changes the stored vectors. Every addition is
+    written as a new segment.
+
+    Queries keep only the max_query_terms heaviest query terms and read just
+    their posting lists from a column-sorted copy of the vectors, so the work
+    depends on the lengths of those lists rather than on the index size.
+    Postings keep only their max_terms heaviest words, which keeps the lists of
+    common words short. A date or agency pre-filter is applied to the
+    candidates; when it leaves fewer postings than there are candidates, the
+    filtered postings are scored directly instead. The index records the
+    registry it was built with and refuses to open with a changed one.
+
+    Parameters:
+    index_dir (str): Directory of the index (created when missing)
+    registry (CompetencyRegistry): Registry of the competency ids
+    n_features (int): Hash buckets for the words
+    max_terms (int): Words kept per posting
+    """
+
+    def __init__(self, index_dir, registry=REGISTRY, n_features=1 << 20, max_terms=50):
+        self.index_dir = index_dir
+        self.registry = registry
+        os.makedirs(index_dir, exist_ok=True)
+
+        meta_path = os.path.join(index_dir, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {'n_features': n_features, 'max_terms': max_terms, **registry_state(registry),
+                         'segments': []}
+        # The competency vectors are indexed by registry id and have the width of the registry
+        if check_registry(self.meta, registry, 'posting index') != len(registry):
+            raise ValueError(f"Index built with {self.meta['n_competencies']} competencies, "
+                             f"registry has {len(registry)}; rebuild the index")
+        self.hasher = HashingVectorizer(n_features=self.meta['n_features'], alternate_sign=False, norm=None)
+        self.matcher = SkillMatcher.from_registry(registry, 'market', 'trends')
+        self.agencies = load_taxonomy('agencies')['digital_agencies']
+
+        widths = {'text': self.meta['n_features'], 'competencies': self.meta['n_competencies']}
+        self.document_frequency = {space: np.zeros(width, dtype=np.int64) for space, width in widths.items()}
+        frequencies_path = os.path.join(index_dir, FREQUENCIES_FILE)
+        if os.path.exists(frequencies_path):
+            with np.load(frequencies_path) as stored:
+                self.document_frequency = {space: stored[space] for space in SPACES}
+
+        vectors = {space: [sparse.csr_matrix((0, width), dtype=np.float32)] for space, width in widths.items()}
+        postings = []
+        for segment in self.meta['segments']:
+            for space in SPACES:
+                vectors[space].append(sparse.load_npz(os.path.join(index_dir, f"{segment}-{space}.npz")))
+            postings.append(pd.read_parquet(os.path.join(index_dir, f"{segment}-postings.parquet")))
+        self.vectors = {space: sparse.vstack(parts, format='csr') for space, parts in vectors.items()}
+        self._set_postings(pd.concat(postings, ignore_index=True) if postings else
+                           pd.DataFrame({'posting_id': pd.Series(dtype=str),
+                                         DATE_COLUMN: pd.Series(dtype='datetime64[ns]'),
+                                         'organizationname': pd.Series(dtype=object)}))
+
+    def __len__(self):
+        return len(self.postings)
+
+    def _set_postings(self, postings):
+        self.postings = postings
+        self.row_of = pd.Series(np.arange(len(postings)), index=postings['posting_id'].to_numpy())
+        self.dates = postings[DATE_COLUMN].to_numpy(dtype='datetime64[ns]')
+        self.organizations = postings['organizationname'].to_numpy(dtype=object)
+        self._columns = {}
+
+    def _column_index(self, space):
+        """Posting lists of a space: the vectors sorted by term"""
+        if space not in self._columns:
+            self._columns[space] = self.vectors[space].tocsc()
+        return self._columns[space]
+
+    def idf(self, space, terms=None):
+        """Smoothed idf of all terms of a space, or of the given term indices only"""
+        frequency = self.document_frequency[space] if terms is None else self.document_frequency[space][terms]
+        return (np.log((1 + len(self)) / (1 + frequency)) + 1).astype(np.float32)
+
+    def _text_vectors(self, clean_texts):
+        counts = self.hasher.transform(clean_texts).astype(np.float32).tocsr()
+        counts.data = 1 + np.log(counts.data)
+        return counts
+
+    def _competency_vectors(self, competency_lists):
+        lengths = np.fromiter((len(c) for c in competency_lists), dtype=np.int64, count=len(competency_lists))
+        columns = np.fromiter((c for comp_list in competency_lists for c in comp_list), dtype=np.int64,
+                              count=int(lengths.sum()))
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        return sparse.csr_matrix((np.ones(len(columns), dtype=np.float32), columns, indptr),
+                                 shape=(len(competency_lists), self.meta['n_competencies']))
+
+    def _prune(self, vectors, idf):
+        """Keep the max_terms heaviest words (by tf x idf) of every posting"""
+        max_terms = self.meta['max_terms']
+        keep = np.ones(vectors.nnz, dtype=bool)
+        for row in np.flatnonzero(np.diff(vectors.indptr) > max_terms):
+            start, end = vectors.indptr[row], vectors.indptr[row + 1]
+            weights = vectors.data[start:end] * idf[vectors.indices[start:end]]
+            keep[start + np.argsort(-weights, kind='stable')[max_terms:]] = False
+        rows = np.repeat(np.arange(vectors.shape[0]), np.diff(vectors.indptr))[keep]
+        return sparse.csr_matrix((vectors.data[keep], (rows, vectors.indices[keep])), shape=vectors.shape)
+
+    def add(self, df, competency_column='competencies', text_column=TEXT_COLUMN, text_store=None):
+        """
+        Add the postings of df that are not in the index yet; returns the number added
+
+        Competencies come from competency_column when df has it (e.g. the output
+        of analyze_descriptions), otherwise the text is matched here. Without a
+        text column the HTML is read from text_store.
+        """
+        ids = posting_ids(df).astype(str).to_numpy()
+        new = ~pd.Series(ids).duplicated().to_numpy() & ~np.isin(ids, self.row_of.index.to_numpy())
+        df, ids = df[new], ids[new]
+        if not len(df):
+            return 0
+
+        html_texts = df[text_column].tolist() if text_column in df.columns else text_store.get_many(ids)
+        clean_texts = [clean_html(html_text, ' ') for html_text in html_texts]
+        if competency_column in df.columns:
+            competency_lists = [sorted(c) for c in df[competency_column]]
+        else:
+            competency_lists = [sorted(ids_found) for ids_found in self.matcher.match_many(clean_texts)]
+
+        vectors = {'text': self._text_vectors(clean_texts), 'competencies': self._competency_vectors(competency_lists)}
+        for space, space_vectors in vectors.items():
+            self.document_frequency[space] += np.diff(space_vectors.tocsc().indptr)
+        postings = pd.DataFrame({
+            'posting_id': ids,
+            DATE_COLUMN: pd.to_datetime(df[DATE_COLUMN], errors='coerce').to_numpy()
+            if DATE_COLUMN in df.columns else pd.NaT,
+            'organizationname': df['organizationname'].to_numpy() if 'organizationname' in df.columns else None,
+        })
+        self._set_postings(pd.concat([self.postings, postings], ignore_index=True))
+        vectors['text'] = self._prune(vectors['text'], self.idf('text'))
+
+        segment = f"segment-{len(self.meta['segments']):05d}"
+        for space, space_vectors in vectors.items():
+            space_vectors = normalize(space_vectors).astype(np.float32)
+            sparse.save_npz(os.path.join(self.index_dir, f"{segment}-{space}.npz"), space_vectors)
+            self.vectors[space] = sparse.vstack([self.vectors[space], space_vectors], format='csr')
+        postings.to_parquet(os.path.join(self.index_dir, f"{segment}-postings.parquet"), index=False)
+        np.savez(os.path.join(self.index_dir, FREQUENCIES_FILE), **self.document_frequency)
+        self.meta['segments'].append(segment)
+        with open(os.path.join(self.index_dir, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=2)
+        return len(postings)
+
+    def _allowed(self, start=None, end=None, organizations=None, agency_category=None):
+        """Boolean mask of the postings passing the pre-filter, or None without a filter"""
+        mask = None
+        if start is not None or end is not None:
+            mask = np.ones(len(self), dtype=bool)
+            if start is not None:
+                mask &= self.dates >= np.datetime64(pd.Timestamp(start))
+            if end is not None:
+                mask &= self.dates < np.datetime64(pd.Timestamp(end))
+        if agency_category is not None:
+            organizations = list(organizations or []) + list(self.agencies[agency_category])
+        if organizations is not None:
+            in_organizations = np.isin(self.organizations, list(organizations))
+            mask = in_organizations if mask is None else mask & in_organizations
+        return mask
+
+    def _search(self, space, terms, weights, k, exclude=None, max_query_terms=20, **filters):
+        """Top-k postings for a query given as term indices and (tf) weights"""
+        weights = np.asarray(weights, dtype=np.float32) * self.idf(space, terms)
+        if len(terms) > max_query_terms:
+            heaviest = np.argpartition(-weights, max_query_terms)[:max_query_terms]
+            terms, weights = terms[heaviest], weights[heaviest]
+        norm = np.linalg.norm(weights)
+        if len(self) == 0 or norm == 0:
+            return self._results(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))
+        weights = weights / norm
+
+        allowed = self._allowed(**filters)
+        columns = self._column_index(space)
+        list_lengths = columns.indptr[terms + 1] - columns.indptr[terms]
+        if allowed is not None and allowed.sum() < list_lengths.sum():
+            # Few postings pass the filter: score them directly
+            candidates = np.flatnonzero(allowed)
+            scores = self.vectors[space][candidates][:, terms] @ weights
+        else:
+            # Accumulate the scores over the posting lists of the query terms only
+            rows = np.concatenate([columns.indices[columns.indptr[t]:columns.indptr[t + 1]] for t in terms])
+            values = np.concatenate([columns.data[columns.indptr[t]:columns.indptr[t + 1]] * w
+                                     for t, w in zip(terms, weights)])
+            candidates, inverse = np.unique(rows, return_inverse=True)
+            scores = np.bincount(inverse, weights=values, minlength=len(candidates))
+            if allowed is not None:
+                candidates, scores = candidates[allowed[candidates]], scores[allowed[candidates]]
+
+        keep = scores > 0
+        if exclude is not None:
+            keep &= candidates != exclude
+        candidates, scores = candidates[keep], scores[keep]
+        if len(candidates) > k:
+            best = np.argpartition(-scores, k)[:k]
+            candidates, scores = candidates[best], scores[best]
+        order = np.argsort(-scores, kind='stable')
+        return self._results(candidates[order], scores[order])
+
+    def _results(self, rows, scores):
+        results = self.postings.iloc[rows].reset_index(drop=True)
+        results['score'] = np.asarray(scores, dtype=np.float64)
+        return results
+
+    def similar_postings(self, posting_id, k=10, space='text', **filters):
+        """
+        Postings most similar to an indexed posting
+
+        filters: start / end (datefound window), organizations (names) and
+        agency_category (a category of taxonomy/agencies.json).
+        """
+        row = self.row_of.get(str(posting_id))
+        if row is None:
+            raise KeyError(f"Posting {posting_id} is not in the index")
+        vector = self.vectors[space][row]
+        return self._search(space, vector.indices.astype(np.int64), vector.data, k, exclude=row, **filters)
+
+    def search_text(self, text, k=10, space='text', **filters):
+        """Postings most similar to a free text or HTML, e.g. an HU programme description"""
+        clean_text = clean_html(text, ' ')
+        if space == 'competencies':
+            return self.search_competencies(self.matcher.match(clean_text), k, **filters)
+        vector = self._text_vectors([clean_text])
+        return self._search(space, vector.indices.astype(np.int64), vector.data, k, **filters)
+
+    def search_competencies(self, competency_ids, k=10, **filters):
+        """Postings that best match a set of competency ids, e.g. the Id column of extract_hu_data"""
+        terms = np.unique(np.asarray(list(competency_ids), dtype=np.int64))
+        return self._search('competencies', terms, np.ones(len(terms)), k, **filters)
+
+
+def build_posting_index(source, index_dir, chunksize=50000, **kwargs):
+    """Add every posting of a CSV file or DataFrame to the index in index_dir, chunk by chunk"""
+    from csv_loader import iter_vacancy_csv
+
+    index = PostingIndex(index_dir, **kwargs)
+    if isinstance(source, pd.DataFrame):
+        chunks = (source.iloc[start:start + chunksize] for start in range(0, len(source), chunksize))
+    else:
+        chunks = iter_vacancy_csv(source, chunksize=chunksize)
+    started = time.perf_counter()
+    for chunk in chunks:
+        added = index.add(chunk)
+        print(f"Indexed {added:,} new postings ({len(index):,} in index, {time.perf_counter() - started:.0f}s)...")
+    return index
+
+
+if __name__ == "__main__":
+    # File paths
+    input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions.csv"
+    index_dir = "/Users/dennishagen/Desktop/Verzameldocumenten master/posting_index"
+
+    # Postings already in the index are skipped, so rerunning with a new export only adds the new ones
+    index = build_posting_index(input_file, index_dir)
+
+    example_id = index.postings['posting_id'].iloc[0]
+    print(f"\nPostings most similar to {example_id}:")
+    print(index.similar_postings(example_id, k=10))
+
+    programme = "bedrijfskunde marketing data-analyse klantinzicht projectmanagement strategisch denken"
+    print("\nSEO/SEA agency vacancies since 2021 closest to the programme description:")
+    print(index.search_text(programme, k=10, space='competencies', start='2021-01-01',
+                            agency_category='seo_sea_agencies'))
@@ -1,4 +1,4 @@
-import pandas as pd
+from csv_loader import read_vacancy_csv
 
 
 def analyze_csv(filepath, preview_rows=5):
@@ -10,9 +10,9 @@ def analyze_csv(filepath, preview_rows=5):
     preview_rows (int): Number of rows to preview
     """
     try:
-        # Read the CSV file
+        # Read the CSV file; dtype=None keeps the inferred column types the statistics below are about
         print(f"Loading CSV file: {filepath}")
-        df = pd.read_csv(filepath)
+        df = read_vacancy_csv(filepath, dtype=None)
 
         # Basic information about the dataset
         print("\n=== Dataset Information ===")
@@ -0,0 +1,172 @@
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from competency_registry import REGISTRY
+from vacancy_columns import POSTING_ID_COLUMN, TEXT_COLUMN, posting_ids
+
+HIT_SCHEMA = pa.schema([
+    ('posting_id', pa.string()),
+    ('competency_id', pa.int32()),
+    ('category', pa.dictionary(pa.int8(), pa.string())),
+    ('method', pa.dictionary(pa.int8(), pa.string())),
+    ('section', pa.dictionary(pa.int8(), pa.string())),
+])
+
+
+def _format_for(output_path, fmt=None):
+    fmt = fmt or os.path.splitext(output_path)[1].lstrip('.').lower()
+    if fmt not in ('parquet', 'jsonl'):
+        raise ValueError(f"Unsupported result format '{fmt}' (use parquet or jsonl)")
+    return fmt
+
+
+class ResultWriter:
+    """
+    Stream competency results in long format
+
+    Writes one row per (posting id, competency id, category, method, section)
+    to Parquet or JSONL; section is empty unless section-aware extraction was
+    used. Rows are buffered and flushed every batch_size rows, so memory use
+    does not depend on the number of postings.
+
+    Parameters:
+    output_path (str): Path of the .parquet or .jsonl file
+    fmt (str): 'parquet' or 'jsonl' (default: taken from the file extension)
+    registry (CompetencyRegistry): Registry used to look up category and method
+    batch_size (int): Number of rows buffered before a flush
+    """
+
+    def __init__(self, output_path, fmt=None, registry=REGISTRY, batch_size=50000):
+        self.output_path = output_path
+        self.fmt = _format_for(output_path, fmt)
+        self.registry = registry
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._buffer = {name: [] for name in HIT_SCHEMA.names}
+
+        if self.fmt == 'parquet':
+            self._writer = pq.ParquetWriter(output_path, HIT_SCHEMA, compression='zstd')
+        else:
+            self._writer = open(output_path, 'w', encoding='utf-8')
+
+    def write(self, posting_id, competency_ids, method=None, sections=None):
+        """Add the competencies found in one posting (sections: posting section per competency)"""
+        posting_id = str(posting_id)
+        if sections is None:
+            sections = [None] * len(competency_ids)
+        for competency_id, section in zip(competency_ids, sections):
+            self._buffer['posting_id'].append(posting_id)
+            self._buffer['competency_id'].append(int(competency_id))
+            self._buffer['category'].append(self.registry.category(competency_id))
+            self._buffer['method'].append(method or self.registry.method(competency_id))
+            self._buffer['section'].append(section)
+
+        if len(self._buffer['posting_id']) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows"""
+        n_rows = len(self._buffer['posting_id'])
+        if n_rows == 0:
+            return
+
+        if self.fmt == 'parquet':
+            self._writer.write_table(pa.Table.from_pydict(self._buffer, schema=HIT_SCHEMA))
+        else:
+            lines = [
+                json.dumps(dict(zip(HIT_SCHEMA.names, values)), ensure_ascii=False)
+                for values in zip(*self._buffer.values())
+            ]
+            self._writer.write('\n'.join(lines) + '\n')
+
+        self.rows_written += n_rows
+        self._buffer = {name: [] for name in HIT_SCHEMA.names}
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def write_postings(df, output_path, fmt=None, slim=True, competency_column='competencies',
+                   sections_column='competency_sections'):
+    """
+    Write one row per posting (metadata only)
+
+    In slim mode the HTML text column is dropped; the competency and section list
+    columns are always dropped because the long-format hits file replaces them.
+    """
+    fmt = _format_for(output_path, fmt)
+    drop = [competency_column, sections_column, 'posting_id'] + ([TEXT_COLUMN] if slim else [])
+    postings = df.drop(columns=[c for c in drop if c in df.columns])
+    postings.insert(0, 'posting_id', posting_ids(df).astype(str).to_numpy())
+    if POSTING_ID_COLUMN in postings.columns:
+        postings = postings.drop(columns=POSTING_ID_COLUMN)
+
+    if fmt == 'parquet':
+        postings.to_parquet(output_path, index=False, compression='zstd')
+    else:
+        postings.to_json(output_path, orient='records', lines=True, date_format='iso', force_ascii=False)
+    return len(postings)
+
+
+def write_results(df, output_path, fmt=None, slim=True, competency_column='competencies', registry=REGISTRY):
+    """
+    Write analyze_descriptions output as a long-format hits file plus a postings file
+
+    The postings file is written next to the hits file as <name>_postings.<ext>.
+    A competency_sections column (section-aware extraction) fills the section column.
+    """
+    fmt = _format_for(output_path, fmt)
+    stem, ext = os.path.splitext(output_path)
+    postings_path = f"{stem}_postings{ext}"
+
+    sections = df['competency_sections'] if 'competency_sections' in df.columns else [None] * len(df)
+    with ResultWriter(output_path, fmt=fmt, registry=registry) as writer:
+        for posting_id, competency_ids, hit_sections in zip(posting_ids(df), df[competency_column], sections):
+            writer.write(posting_id, competency_ids, sections=hit_sections)
+    n_postings = write_postings(df, postings_path, fmt=fmt, slim=slim, competency_column=competency_column)
+
+    print(f"Saved {writer.rows_written:,} competency rows to {output_path}")
+    print(f"Saved {n_postings:,} postings to {postings_path}")
+    return output_path, postings_path
+
+
+def read_results(output_path, fmt=None):
+    """Read a hits file back into a DataFrame"""
+    if _format_for(output_path, fmt) == 'parquet':
+        return pd.read_parquet(output_path)
+    return pd.read_json(output_path, lines=True, dtype={'posting_id': str})
+
+
+def read_competency_lists(output_path, postings_path=None, fmt=None, columns=None):
+    """
+    Rebuild the per-posting competency id lists from a hits file and its postings file
+    """
+    fmt = _format_for(output_path, fmt)
+    if postings_path is None:
+        stem, ext = os.path.splitext(output_path)
+        postings_path = f"{stem}_postings{ext}"
+
+    if fmt == 'parquet':
+        postings = pd.read_parquet(postings_path, columns=columns)
+    else:
+        postings = pd.read_json(postings_path, lines=True, dtype={'posting_id': str})
+        if columns is not None:
+            postings = postings[columns]
+
+    comp_lists = read_results(output_path, fmt).groupby('posting_id')['competency_id'].agg(list)
+    postings['competencies'] = [
+        comp_lists.get(posting_id, []) for posting_id in postings['posting_id'].astype(str)
+    ]
+    return postings
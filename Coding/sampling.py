@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+from csv_loader import iter_vacancy_csv
+
+
+def stratum_labels(df, stratify_by):
+    """
+    Stratum label of every row
+
+    Date columns (datefound, startingdate) are stratified by year; other columns
+    by their value. Several columns can be combined by passing a list.
+    """
+    columns = [stratify_by] if isinstance(stratify_by, str) else list(stratify_by)
+    parts = []
+    for column in columns:
+        if column.endswith('date') or column == 'datefound':
+            years = pd.to_datetime(df[column], errors='coerce').dt.year
+            values = years.astype('Int64').astype(str).where(years.notna(), 'unknown')
+        else:
+            values = df[column].astype(str).where(df[column].notna(), 'unknown')
+        parts.append(values.to_numpy(dtype=object))
+    if len(parts) == 1:
+        return parts[0]
+    return np.array([' | '.join(values) for values in zip(*parts)], dtype=object)
+
+
+def _water_fill(counts, sample_size):
+    """
+    Largest per-stratum capacity c with sum(min(count, c)) <= sample_size
+
+    Strata smaller than c are kept completely and their unused share goes to the
+    larger strata. Because c can only shrink as more rows are seen, reservoirs
+    only ever have to be shrunk, never refilled.
+    """
+    counts = np.sort(np.asarray(counts))
+    remaining = sample_size
+    for i, count in enumerate(counts):
+        strata_left = len(counts) - i
+        if count * strata_left > remaining:
+            return remaining // strata_left
+        remaining -= count
+    return int(counts[-1]) if len(counts) else sample_size
+
+
+def _allocate(counts, sample_size):
+    """
+    Sample size per stratum, summing to min(sample_size, rows seen)
+
+    Every stratum gets min(count, c) rows (c from _water_fill); the rows that
+    the floor division leaves over go one each to the largest strata that have
+    rows left, so more strata than sample_size still give a full sample. Ties
+    are broken by the order of counts.
+
+    Parameters:
+    counts (pd.Series): Rows seen per stratum
+    sample_size (int): Total number of rows to sample
+    """
+    capacity = _water_fill(counts.to_numpy(), sample_size)
+    allocation = counts.clip(upper=capacity)
+    remainder = int(min(sample_size, counts.sum()) - allocation.sum())
+    if remainder > 0:
+        largest = counts[counts > capacity].sort_values(ascending=False, kind='stable').index[:remainder]
+        allocation[largest] += 1
+    return allocation
+
+
+class StratifiedReservoirSampler:
+    """
+    Stratified random sample drawn in one streaming pass
+
+    Every row gets a random key from a seeded generator; each stratum keeps the
+    rows with the smallest keys (a bottom-k reservoir, which is a uniform sample
+    of that stratum). Capacities are divided over the strata seen so far, so the
+    sample is balanced across strata instead of following their sizes. Every
+    reservoir keeps one row more than the balanced capacity, so that the rows
+    left over by dividing sample_size over the strata can be handed out when the
+    sample is taken; the reservoirs never hold more than sample_size rows plus
+    one per stratum.
+
+    Parameters:
+    sample_size (int): Total number of rows to sample
+    stratify_by (str or list): Column(s) defining the strata
+    seed (int): Seed for reproducible samples
+    """
+
+    def __init__(self, sample_size, stratify_by='datefound', seed=42):
+        self.sample_size = sample_size
+        self.stratify_by = stratify_by
+        self.rng = np.random.default_rng(seed)
+        self.seen = {}
+        self.reservoir = None
+
+    def update(self, chunk):
+        """Offer a chunk of rows to the reservoirs"""
+        chunk = chunk.copy()
+        chunk['_stratum'] = stratum_labels(chunk, self.stratify_by)
+        chunk['_key'] = self.rng.random(len(chunk))
+
+        for stratum, count in chunk['_stratum'].value_counts().items():
+            self.seen[stratum] = self.seen.get(stratum, 0) + count
+        capacity = _water_fill(list(self.seen.values()), self.sample_size) + 1
+
+        # Only rows that beat the current worst key of a full reservoir can enter
+        if self.reservoir is not None and len(self.reservoir):
+            worst = self.reservoir.groupby('_stratum')['_key'].max()
+            full = self.reservoir['_stratum'].value_counts() >= capacity
+            threshold = worst.where(full.reindex(worst.index, fill_value=False), np.inf)
+            limit = chunk['_stratum'].map(threshold).fillna(np.inf)
+            chunk = chunk[chunk['_key'] < limit]
+
+        combined = chunk if self.reservoir is None else pd.concat([self.reservoir, chunk])
+        self.reservoir = combined.sort_values('_key', kind='stable').groupby('_stratum').head(capacity)
+
+    def _sampled(self):
+        """The reservoirs cut to the final per-stratum sample sizes"""
+        ranked = self.reservoir.sort_values('_key', kind='stable')
+        # Strata in random order (by their smallest key), so equally large strata tie at random
+        seen = pd.Series(self.seen).reindex(ranked['_stratum'].unique())
+        allocation = _allocate(seen, self.sample_size)
+        rank = ranked.groupby('_stratum').cumcount()
+        return ranked[rank < ranked['_stratum'].map(allocation)]
+
+    def sample(self):
+        """Return the current sample (without the helper columns)"""
+        if self.reservoir is None:
+            return pd.DataFrame()
+        return self._sampled().sort_index().drop(columns=['_stratum', '_key'])
+
+    def stratum_sizes(self):
+        """Rows seen and rows sampled per stratum"""
+        sampled = self._sampled()['_stratum'].value_counts() if self.reservoir is not None else pd.Series(dtype=int)
+        return pd.DataFrame({'seen': pd.Series(self.seen), 'sampled': sampled}).fillna(0).astype(int)
+
+
+def stratified_sample(source, sample_size, stratify_by='datefound', seed=42, chunksize=100000, usecols=None):
+    """
+    Draw a stratified sample from a DataFrame or a CSV file in one pass
+
+    A CSV file is read in chunks, so only one chunk plus the sample is in memory.
+    """
+    sampler = StratifiedReservoirSampler(sample_size, stratify_by=stratify_by, seed=seed)
+    if isinstance(source, pd.DataFrame):
+        chunks = (source.iloc[start:start + chunksize] for start in range(0, len(source), chunksize))
+    else:
+        chunks = iter_vacancy_csv(source, chunksize=chunksize, usecols=usecols)
+
+    for chunk in chunks:
+        sampler.update(chunk)
+
+    sample_df = sampler.sample()
+    print(f"Stratified sample by {stratify_by}: {len(sample_df):,} rows from {sum(sampler.seen.values()):,}")
+    for stratum, row in sampler.stratum_sizes().iterrows():
+        print(f"- {stratum}: {row['sampled']:,} of {row['seen']:,}")
+    return sample_df
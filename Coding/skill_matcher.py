@@ -0,0 +1,111 @@
+import bisect
+import re
+
+from taxonomy import cached, content_hash
+
+
+def _trie_pattern(node):
+    """Turn a character trie into a regex with one branch per distinct next character"""
+    if not node:
+        return ''
+    ends = '' in node
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char != '']
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if ends:
+        body = '(?:' + body + ')?'
+    return body
+
+
+class SkillMatcher:
+    """
+    Compiled multi-term matcher shared by the vacancy and curriculum extractors
+
+    All aliases are compiled into one trie-shaped regex, so a text is scanned once
+    instead of once per term. At every position where an alias starts, the regex
+    returns the longest alias; every shorter alias contained in it is added from a
+    precomputed table. The result is the same as checking `alias in text` for
+    every alias, with each id reported at most once. With word_start=True an alias
+    only matches where a word starts ('communicatie' matches 'interne communicatie'
+    but not 'telecommunicatie').
+
+    Parameters:
+    alias_pairs (list): (alias, id) pairs, e.g. CompetencyRegistry.alias_pairs('market')
+    word_start (bool): Only match aliases at the start of a word
+    """
+
+    def __init__(self, alias_pairs, word_start=False):
+        self.alias_ids = {}
+        for alias, term_id in alias_pairs:
+            self.alias_ids.setdefault(alias, set()).add(term_id)
+
+        trie = {}
+        for alias in self.alias_ids:
+            node = trie
+            for char in alias:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        prefix = r'(?<!\w)' if word_start else ''
+        self.pattern = re.compile(prefix + _trie_pattern(trie)) if self.alias_ids else None
+
+        # Ids of every alias contained in a longer alias (including itself)
+        self.contained_ids = {
+            alias: frozenset().union(*(ids for other, ids in self.alias_ids.items() if other in alias))
+            for alias in self.alias_ids
+        }
+
+    @classmethod
+    def from_registry(cls, registry, *sources):
+        """Build (or load from the cache) a matcher for the given taxonomies of a CompetencyRegistry"""
+        return cls.cached(registry.alias_pairs(*sources))
+
+    @classmethod
+    def cached(cls, alias_pairs, cache_dir=None, word_start=False):
+        """
+        Matcher for alias_pairs, loaded from the taxonomy cache when the same pairs were compiled before
+
+        The cache key is the content hash of the pairs, so editing a taxonomy
+        file gives a new matcher and the old one is never used. The regex is
+        recompiled from its pattern on load; the trie pattern and the
+        contained-alias table (quadratic in the number of aliases) are not rebuilt.
+        """
+        alias_pairs = [(alias, term_id) for alias, term_id in alias_pairs]
+        key = f"matcher-{'word-' if word_start else ''}{content_hash(alias_pairs)}"
+        return cached(key, lambda: cls(alias_pairs, word_start), cache_dir)
+
+    def _scan(self, text):
+        """Yield (position, ids) for every position where an alias starts"""
+        if self.pattern is None:
+            return
+        search = self.pattern.search
+        match = search(text)
+        while match is not None:
+            yield match.start(), self.contained_ids[match.group()]
+            match = search(text, match.start() + 1)
+
+    def match(self, text):
+        """Return the set of ids whose aliases occur in text"""
+        found = set()
+        for _, ids in self._scan(text):
+            found |= ids
+        return found
+
+    def match_many(self, texts):
+        """
+        Match a batch of texts in one scan
+
+        The texts are joined with a separator that no alias contains, scanned once,
+        and every hit is mapped back to its text. Returns one set of ids per text.
+        """
+        texts = list(texts)
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+
+        results = [set() for _ in texts]
+        for position, ids in self._scan('\n'.join(texts)):
+            results[bisect.bisect_right(starts, position) - 1] |= ids
+        return results
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import pickle
+
+# Versioned taxonomy files; point COMPETENCY_TAXONOMY_DIR elsewhere to use other term lists without code changes
+TAXONOMY_DIR = os.environ.get(
+    'COMPETENCY_TAXONOMY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'taxonomy'))
+TAXONOMY_FILES = ('market', 'curriculum', 'aliases', 'agencies')
+
+# Compiled registries and matchers, one pickle per content hash
+CACHE_DIR = os.environ.get(
+    'COMPETENCY_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'competency_taxonomy'))
+# Bump when the pickled structures change shape, so old cache files are not read
+CACHE_FORMAT = 1
+
+
+def taxonomy_path(name, taxonomy_dir=None):
+    return os.path.join(taxonomy_dir or TAXONOMY_DIR, f"{name}.json")
+
+
+def load_taxonomy(name, taxonomy_dir=None):
+    """Contents of one taxonomy file; every file carries a name and a version"""
+    path = taxonomy_path(name, taxonomy_dir)
+    with open(path, encoding='utf-8') as f:
+        taxonomy = json.load(f)
+    if 'version' not in taxonomy:
+        raise ValueError(f"Taxonomy file {path} has no version")
+    return taxonomy
+
+
+def taxonomy_versions(taxonomy_dir=None):
+    """{taxonomy name: version} of all taxonomy files"""
+    return {name: load_taxonomy(name, taxonomy_dir)['version'] for name in TAXONOMY_FILES}
+
+
+def taxonomy_hash(names=TAXONOMY_FILES, taxonomy_dir=None):
+    """Hash of the contents of the taxonomy files (changes with every edit, not only with the version)"""
+    digest = hashlib.sha256(f"format {CACHE_FORMAT}".encode())
+    for name in names:
+        digest.update(name.encode())
+        with open(taxonomy_path(name, taxonomy_dir), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def content_hash(value):
+    """Hash of a JSON-serializable value, e.g. a list of (alias, id) pairs"""
+    data = json.dumps(value, ensure_ascii=False, sort_keys=True, default=sorted)
+    return hashlib.sha256(f"format {CACHE_FORMAT}\n{data}".encode('utf-8')).hexdigest()[:16]
+
+
+def cached(key, build, cache_dir=None):
+    """
+    Load the object stored under key, or build and store it
+
+    Files are written to a temporary name and renamed, so processes starting
+    at the same time never read a half-written file. An unreadable cache file
+    is rebuilt; when the cache directory is not writable the object is only
+    built.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    path = os.path.join(cache_dir, f"{key}.pkl")
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            pass
+
+    value = build()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+    except OSError:
+        pass
+    return value
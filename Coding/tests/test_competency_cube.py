@@ -0,0 +1,62 @@
+import copy
+
+import pandas as pd
+import pytest
+
+from competency_cube import CompetencyCube
+from competency_registry import REGISTRY
+from result_writer import read_competency_lists, write_results
+
+
+def _results_file(tmp_path, name, start, n_postings):
+    """Write n_postings analysed postings with ids start.. like analyze_descriptions + write_results"""
+    df = pd.DataFrame({
+        'id': [f"{i}_1" for i in range(start, start + n_postings)],
+        'datefound': ['2021-03-01'] * n_postings,
+        'organizationname': ['Dept'] * n_postings,
+        'competencies': [[i % 5, 10 + i % 3] for i in range(n_postings)],
+    })
+    output_path = str(tmp_path / f"{name}.parquet")
+    write_results(df, output_path)
+    return output_path
+
+
+def test_incremental_batches_from_saved_results(tmp_path):
+    first = read_competency_lists(_results_file(tmp_path, 'first', 0, 20))
+    second = read_competency_lists(_results_file(tmp_path, 'second', 20, 15))
+
+    cube = CompetencyCube()
+    cube.add(first)
+    cube.add(second)
+    assert len(cube.seen) == 35
+    assert cube.cells['postings'].sum() == 35
+
+    # Offering a batch again adds nothing
+    cube.add(second)
+    assert cube.cells['postings'].sum() == 35
+
+
+def test_saved_cube_keeps_the_posting_ids(tmp_path):
+    cube = CompetencyCube()
+    cube.add(read_competency_lists(_results_file(tmp_path, 'first', 0, 10)))
+    cube.save(str(tmp_path / 'cube'))
+
+    loaded = CompetencyCube.load(str(tmp_path / 'cube'))
+    loaded.add(read_competency_lists(_results_file(tmp_path, 'second', 5, 10)))
+    assert loaded.cells['postings'].sum() == 15
+
+
+def test_load_checks_the_registry(tmp_path):
+    cube = CompetencyCube()
+    cube.add(read_competency_lists(_results_file(tmp_path, 'first', 0, 10)))
+    cube.save(str(tmp_path / 'cube'))
+
+    # Appended competencies are allowed, a renamed one is not
+    grown = copy.deepcopy(REGISTRY)
+    grown.register('nieuwe competentie', category=REGISTRY.categories[0])
+    assert CompetencyCube.load(str(tmp_path / 'cube'), registry=grown).cells['postings'].sum() == 10
+
+    renamed = copy.deepcopy(REGISTRY)
+    renamed.names[0] = 'andere naam'
+    with pytest.raises(ValueError, match='rebuild the cube'):
+        CompetencyCube.load(str(tmp_path / 'cube'), registry=renamed)
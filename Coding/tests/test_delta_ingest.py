@@ -0,0 +1,54 @@
+import sqlite3
+
+import pandas as pd
+
+from competency_registry import REGISTRY
+from delta_ingest import DeltaIngestor
+
+
+class _Extractor:
+    """Extractor stand-in that finds the first competency in every posting"""
+    registry = REGISTRY
+
+    def extract_with_language(self, html_text):
+        return [0], 'nl'
+
+
+def _batch(rows):
+    return pd.DataFrame({
+        'id': [posting_id for posting_id, _ in rows],
+        'datefound': [datefound for _, datefound in rows],
+        'selectedtextincludinghtml': ['<p>tekst</p>'] * len(rows),
+        'physicallocationprovince': ['Utrecht'] * len(rows),
+    })
+
+
+def test_rows_are_keyed_on_posting_id_and_datefound(tmp_path):
+    ingestor = DeltaIngestor(str(tmp_path / 'state.sqlite'), _Extractor(), filters=())
+    ingestor.ingest(_batch([('1', '2021-03-01'), ('2', '2021-03-01'), ('2', '2021-03-01')]))
+
+    # The same posting found again on a later date is new; the same pair is not
+    tallies = ingestor.ingest(_batch([('1', '2021-03-01'), ('1', '2022-05-01'), ('3', '2022-05-01')]))
+    assert tallies[('postings', 'all')] == 2
+    assert ingestor.tally('postings')['all'] == 4
+    assert ingestor.tally('year').to_dict() == {'2021': 2, '2022': 2}
+
+    # Offering everything again adds nothing
+    tallies = ingestor.ingest(_batch([('1', '2021-03-01'), ('1', '2022-05-01'), ('2', '2021-03-01')]))
+    assert not tallies
+    assert ingestor.tally('postings')['all'] == 4
+    ingestor.close()
+
+
+def test_state_keyed_on_posting_id_only_is_migrated(tmp_path):
+    state_path = str(tmp_path / 'state.sqlite')
+    conn = sqlite3.connect(state_path)
+    conn.execute("CREATE TABLE seen (posting_id TEXT PRIMARY KEY, datefound TEXT)")
+    conn.execute("INSERT INTO seen VALUES ('1', '2021-03-01')")
+    conn.commit()
+    conn.close()
+
+    ingestor = DeltaIngestor(state_path, _Extractor(), filters=())
+    tallies = ingestor.ingest(_batch([('1', '2021-03-01'), ('1', '2022-05-01')]))
+    assert tallies[('postings', 'all')] == 1
+    ingestor.close()
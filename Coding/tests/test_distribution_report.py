@@ -0,0 +1,30 @@
+import pandas as pd
+
+from distribution_report import Dimension, DistributionReport
+from vacancy_db import ingest_csv
+
+
+def _report():
+    year = Dimension('Per year', 'datefound', by_year=True)
+    province = Dimension('Province', 'physicallocationprovince')
+    length = Dimension('Title length', 'title_length', source_column='positiontitle',
+                       derive=lambda titles: titles.str.len().map(lambda n: 'long' if n > 10 else 'short'))
+    return DistributionReport('Test', [year, province, length], crosstabs=[(year, province), (length, province)])
+
+
+def test_database_counts_match_streamed_counts(tmp_path):
+    df = pd.DataFrame({
+        'datefound': ['2020-01-05', '2021-02-01', '2021-03-01', None, '2022-07-01'],
+        'positiontitle': ['Marketeer', 'Online marketeer', 'Marketeer', 'Copywriter', None],
+        'physicallocationprovince': ['Utrecht', 'Utrecht', None, 'Drenthe', 'Drenthe'],
+    })
+    input_path = tmp_path / 'dump.csv'
+    df.to_csv(input_path, index=False)
+    db = ingest_csv(str(input_path), str(tmp_path / 'dump.sqlite'))
+
+    lengths = _report().dimensions[2].derive(df['positiontitle'])
+    streamed = df.assign(title_length=lengths.where(df['positiontitle'].notna()))
+    expected = _report().run(streamed, chunksize=2).to_dict()
+    aggregated = _report().run(db.subset()).to_dict()
+    assert aggregated == expected
+    db.close()
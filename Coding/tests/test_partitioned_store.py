@@ -0,0 +1,38 @@
+import pandas as pd
+
+from partitioned_store import load_partitions, write_partitions
+
+
+def _write_dump(tmp_path):
+    """Write a small dump with postings in March and April 2021 and partition it"""
+    df = pd.DataFrame({
+        'datefound': ['2021-03-05', '2021-03-20', '2021-04-02', 'not a date'],
+        'id': ['1', '2', '3', '4'],
+        'positiontitle': ['Marketeer', 'Copywriter', 'SEO specialist', 'Designer'],
+    })
+    input_path = tmp_path / 'dump.csv'
+    df.to_csv(input_path, index=False)
+    root = str(tmp_path / 'by_month')
+    write_partitions(str(input_path), root)
+    return root
+
+
+def test_window_selects_rows(tmp_path):
+    root = _write_dump(tmp_path)
+    df = load_partitions(root, start='2021-03-10', end='2021-04-30')
+    assert sorted(df['id']) == ['2', '3']
+
+
+def test_window_without_data_keeps_schema(tmp_path):
+    root = _write_dump(tmp_path)
+    df = load_partitions(root, start='2023-01-01')
+    assert df.empty
+    assert {'datefound', 'id', 'positiontitle'} <= set(df.columns)
+    # Callers such as load_recent_descriptions use the .dt accessor on the empty result
+    assert df['datefound'].dt.year.value_counts().empty
+
+
+def test_empty_root_keeps_date_column(tmp_path):
+    df = load_partitions(str(tmp_path), start='2021-01-01', columns=['id'])
+    assert list(df.columns) == ['datefound', 'id']
+    assert df['datefound'].dt.year.value_counts().empty
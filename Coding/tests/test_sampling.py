@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sampling import StratifiedReservoirSampler, stratified_sample
+
+
+def _postings(n_rows=3000, n_strata=50, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'stratum': rng.integers(0, n_strata, n_rows).astype(str), 'value': range(n_rows)})
+
+
+@pytest.mark.parametrize('sample_size', [7, 49, 50, 51, 123, 1000, 2999])
+def test_sample_has_the_requested_size(sample_size):
+    df = _postings()
+    sample = stratified_sample(df, sample_size, stratify_by='stratum', chunksize=170)
+    assert len(sample) == sample_size
+    assert sample['value'].is_unique
+
+
+def test_more_strata_than_sample_size():
+    df = _postings(n_rows=500, n_strata=200)
+    sampler = StratifiedReservoirSampler(10, stratify_by='stratum')
+    for start in range(0, len(df), 64):
+        sampler.update(df.iloc[start:start + 64])
+    sizes = sampler.stratum_sizes()
+    assert len(sampler.sample()) == 10
+    assert sizes['sampled'].max() == 1
+
+
+def test_strata_stay_balanced():
+    sizes_seen = {'a': 1000, 'b': 300, 'c': 20}
+    df = pd.DataFrame({'stratum': [s for s, n in sizes_seen.items() for _ in range(n)]})
+    sampler = StratifiedReservoirSampler(301, stratify_by='stratum')
+    sampler.update(df.sample(frac=1, random_state=1))
+    sampled = sampler.stratum_sizes()['sampled']
+    assert sampled['c'] == 20
+    assert sorted(sampled[['a', 'b']]) == [140, 141]
+
+
+def test_small_population_is_kept_completely():
+    df = _postings(n_rows=40, n_strata=5)
+    assert len(stratified_sample(df, 100, stratify_by='stratum')) == 40
@@ -0,0 +1,17 @@
+from text_sections import segment_html
+
+
+def test_leading_heading_starts_section():
+    segments = segment_html("<p>Wat vragen wij: HBO werk- en denkniveau</p><p>Dit is jouw rol: campagnes opzetten</p>")
+    assert segments == [('profile', 'hbo werk- en denkniveau'), ('role', 'campagnes opzetten')]
+
+
+def test_text_before_heading_in_block_is_kept():
+    html_text = ("<p>Wat bieden wij:</p>"
+                 "<p>Laptop, telefoon Meer informatie: bel Anna</p>")
+    assert segment_html(html_text) == [('offer', 'laptop, telefoon'), ('contact', 'bel anna')]
+
+
+def test_inline_uppercase_headings_split_block():
+    segments = segment_html("<p>Wij zijn een bureau. FUNCTIEPROFIEL: Je doet SEO. KANDIDAAT PROFIEL: HBO</p>")
+    assert segments == [('intro', 'wij zijn een bureau.'), ('role', 'je doet seo.'), ('profile', 'hbo')]
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from title_classifier import TitleClassifier
+
+
+def _classify(*titles):
+    return TitleClassifier().classify(pd.Series(titles)).tolist()
+
+
+def test_marketing_roles():
+    assert _classify(
+        'SEO specialist', 'Online Marketeer', 'Communicatieadviseur', 'Adviseur interne communicatie',
+        'Corporate Communications Manager', 'Eindredacteur', 'Contentmarketeer', 'Medewerker marketing',
+    ) == [
+        'seo_sea', 'online_marketing', 'communication', 'communication',
+        'communication', 'content', 'content', 'marketing_general',
+    ]
+
+
+def test_terms_inside_other_words_do_not_match():
+    assert _classify(
+        'Monteur telecommunicatie', 'Telecommunications Engineer', 'Medewerker datacommunicatie',
+    ) == [None, None, None]
+
+
+def test_excluded_titles():
+    assert _classify('Informatie- en communicatietechnologie docent', 'Executive search specialist') == [None, None]
@@ -0,0 +1,52 @@
+import pandas as pd
+
+from title_clustering import TitleClusterer, normalize_title, role_families
+
+# Spelling variants from the request
+EXAMPLE_TITLES = ['Online Marketeer', 'online marketeer (32-40u)', 'Marketeer Online']
+
+LEVELS = ['junior', 'senior', 'medior', 'lead', 'hoofd', 'assistent', 'trainee', 'stagiair', 'freelance', 'interim']
+AREAS = ['online', 'digital', 'content', 'seo', 'sea', 'social', 'email', 'performance', 'brand', 'product',
+         'trade', 'event', 'b2b', 'b2c', 'growth', 'data', 'crm', 'retail', 'international', 'regionaal']
+ROLES = ['marketeer', 'marketing manager', 'marketing medewerker', 'marketing specialist', 'marketing coordinator']
+
+
+def test_normalize_title():
+    assert normalize_title('online marketeer (32-40u)') == 'online marketeer'
+    assert normalize_title('Marketeer Online m/v 24-32 uur') == 'marketeer online'
+    assert normalize_title(None) == ''
+
+
+def test_example_variants_form_one_family():
+    titles = pd.Series(EXAMPLE_TITLES + ['Accountant', 'Accountant (m/v)', None])
+    families = role_families(titles)
+    assert families[:3].nunique() == 1
+    assert families[3] == families[4] != families[0]
+    assert pd.isna(families[5])
+
+
+def test_example_variants_among_many_marketing_titles():
+    # More than 50 distinct titles that all share the marketing n-grams
+    titles = pd.Series([f"{level} {area} {role}" for level in LEVELS for area in AREAS for role in ROLES]
+                       + EXAMPLE_TITLES)
+    families = TitleClusterer().fit(titles).assign(pd.Series(EXAMPLE_TITLES))
+    assert families.nunique() == 1
+
+
+def test_titles_made_of_frequent_ngrams_only():
+    titles = pd.Series([('marketeer ' * k + 'online ' * j).strip() for k in range(1, 12) for j in range(12)]
+                       + EXAMPLE_TITLES)
+    families = TitleClusterer().fit(titles).assign(pd.Series(EXAMPLE_TITLES))
+    assert families.nunique() == 1
+
+
+def test_titles_shorter_than_the_ngrams():
+    titles = pd.Series(['hr', 'it', 'hr'])
+    assert role_families(titles).tolist() == ['hr', 'it', 'hr']
+
+
+def test_earlier_family_names_are_kept():
+    titles = pd.Series(EXAMPLE_TITLES)
+    first = TitleClusterer().fit(titles)
+    previous = {title: 'online marketing' for title in first.families}
+    assert set(role_families(titles, previous=previous)) == {'online marketing'}
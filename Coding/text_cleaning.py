@@ -0,0 +1,21 @@
+import re
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+
+def clean_html(html_text, separator=''):
+    """
+    Clean HTML and prepare text for analysis
+
+    separator is placed between the texts of neighbouring elements; use ' ' when
+    words must not run together across tags (e.g. for word-based indexes).
+    """
+    if pd.isna(html_text):
+        return ""
+
+    # Remove HTML tags
+    soup = BeautifulSoup(html_text, 'html.parser')
+    text = soup.get_text(separator)
+    text = re.sub(r'\s+', ' ', text)
+    return text.lower().strip()
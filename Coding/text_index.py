@@ -0,0 +1,128 @@
+import sqlite3
+
+import pandas as pd
+
+from competency_registry import REGISTRY
+from csv_loader import iter_vacancy_csv
+from text_cleaning import clean_html
+from vacancy_columns import TEXT_COLUMN, posting_ids
+
+
+def phrase_query(term):
+    """FTS5 query for a (multi-word) term as an exact phrase"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+class PostingTextIndex:
+    """
+    Persistent full-text index over the cleaned job description text (SQLite FTS5)
+
+    Each posting is indexed once under its posting id; adding a batch skips
+    postings that are already in the index, so the index can be updated with every
+    new data drop. Terms are matched as whole-word phrases ('data analyse' also
+    matches 'data-analyse', but 'marketing' does not match 'contentmarketing').
+
+    Parameters:
+    index_path (str): Path of the SQLite index file
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.conn = sqlite3.connect(index_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings (rowid INTEGER PRIMARY KEY, posting_id TEXT UNIQUE)")
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS posting_text USING fts5(body, tokenize='unicode61')")
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+
+    def add_postings(self, df, text_column=TEXT_COLUMN):
+        """Clean and index the postings of a DataFrame that are not indexed yet"""
+        ids = posting_ids(df).astype(str).to_numpy()
+        # Look up in batches; SQLite limits the number of host parameters per statement
+        unique_ids = list(dict.fromkeys(ids.tolist()))
+        existing = set()
+        for start in range(0, len(unique_ids), 900):
+            batch = unique_ids[start:start + 900]
+            placeholders = ', '.join('?' * len(batch))
+            existing.update(row[0] for row in self.conn.execute(
+                f"SELECT posting_id FROM postings WHERE posting_id IN ({placeholders})", batch))
+
+        added = 0
+        with self.conn:
+            for posting_id, html_text in zip(ids, df[text_column].to_numpy()):
+                if posting_id in existing:
+                    continue
+                existing.add(posting_id)
+                cursor = self.conn.execute("INSERT INTO postings (posting_id) VALUES (?)", (posting_id,))
+                self.conn.execute("INSERT INTO posting_text (rowid, body) VALUES (?, ?)",
+                                  (cursor.lastrowid, clean_html(html_text, separator=' ')))
+                added += 1
+        return added
+
+    def build_from_csv(self, input_filepath, chunksize=50000):
+        """Index every posting of a CSV file (already indexed postings are skipped)"""
+        total_added = 0
+        for chunk in iter_vacancy_csv(input_filepath, chunksize=chunksize):
+            total_added += self.add_postings(chunk)
+            print(f"Indexed {total_added:,} new postings ({len(self):,} in index)...")
+        self.optimize()
+        return total_added
+
+    def optimize(self):
+        """Merge the index segments for faster queries"""
+        with self.conn:
+            self.conn.execute("INSERT INTO posting_text (posting_text) VALUES ('optimize')")
+
+    def _match(self, terms):
+        return ' OR '.join(phrase_query(term) for term in terms)
+
+    def count(self, *terms):
+        """Number of postings mentioning any of the terms"""
+        sql = "SELECT COUNT(*) FROM posting_text WHERE posting_text MATCH ?"
+        return self.conn.execute(sql, (self._match(terms),)).fetchone()[0]
+
+    def postings(self, *terms):
+        """Posting ids mentioning any of the terms"""
+        sql = ("SELECT p.posting_id FROM posting_text JOIN postings p ON p.rowid = posting_text.rowid "
+               "WHERE posting_text MATCH ? ORDER BY p.rowid")
+        return [row[0] for row in self.conn.execute(sql, (self._match(terms),))]
+
+    def count_terms(self, terms):
+        """Posting counts per term, most frequent first"""
+        counts = pd.Series({term: self.count(term) for term in terms}, name='postings')
+        return counts.sort_values(ascending=False)
+
+    def count_competency(self, competency_id, registry=REGISTRY):
+        """Postings mentioning any alias of a registry competency"""
+        return self.count(*registry.aliases[competency_id])
+
+    def count_category(self, terms):
+        """
+        Postings mentioning any term of a (new) taxonomy category
+
+        terms can be a list of terms or the name of a registry category.
+        """
+        if isinstance(terms, str):
+            terms = [alias for i, category in enumerate(REGISTRY.categories) if category == terms
+                     for alias in REGISTRY.aliases[i]]
+        return self.count(*terms)
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    # File paths
+    input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions.csv"
+    index_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions_text.sqlite"
+
+    # Build (or extend) the index, then answer lookups without rescanning the text
+    index = PostingTextIndex(index_file)
+    index.build_from_csv(input_file)
+
+    print("\nPostings per AI tool:")
+    for term, count in index.count_terms(REGISTRY.aliases[REGISTRY.lookup('chatgpt')] | {'midjourney'}).items():
+        print(f"{term}: {count:,} postings")
+    print(f"\nPostings mentioning any ai_tools term: {index.count_category('ai_tools'):,}")
@@ -0,0 +1,225 @@
+import re
+from collections import Counter
+from html.parser import HTMLParser
+
+import pandas as pd
+
+# Tags that start a new text block
+BLOCK_TAGS = {
+    'p', 'li', 'div', 'br', 'ul', 'ol', 'tr', 'td', 'section', 'article', 'header', 'footer',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+# Inline headings like 'FUNCTIEPROFIEL:' or 'KANDIDAAT PROFIEL:'
+INLINE_HEADING = re.compile(r"\b([A-Z][A-Z&/' -]{2,}[A-Z])\s*:")
+# Short lead-in at the start of a block, like 'Wat vragen wij: ...'
+LEADING_HEADING = re.compile(r"^([^:.!?]{3,40})[:?]\s*")
+
+# Heading keywords per section, checked longest first ('functieprofiel' before 'profiel')
+SECTION_KEYWORDS = {
+    'profile': [
+        'kandidaat profiel', 'kandidaatprofiel', 'jouw profiel', 'je profiel', 'profiel', 'functie-eisen',
+        'functie eisen', 'functievereisten', 'wat vragen wij', 'wat vragen we', 'wat wij vragen',
+        'wie ben jij', 'wie ben je', 'wie zoeken wij', 'wie zoeken we', 'wat breng je mee',
+        'wat neem je mee', 'wat heb je nodig', 'vereisten', 'eisen', 'requirements', 'your profile',
+        'who you are', 'what we ask', 'what you bring', 'qualifications', 'skills',
+    ],
+    'role': [
+        'functieprofiel', 'functieomschrijving', 'functie omschrijving', 'over de functie',
+        'de functie', 'jouw rol', 'je rol', 'wat ga je doen', 'wat ga jij doen', 'taken',
+        'werkzaamheden', 'verantwoordelijkheden', 'the role', 'your role', 'job description',
+        'what you will do', "what you'll do", 'responsibilities',
+    ],
+    'offer': [
+        'arbeidsvoorwaarden', 'wat bieden wij', 'wat bieden we', 'wat wij bieden', 'wij bieden',
+        'ons aanbod', 'aanbod', 'salaris', 'what we offer', 'we offer', 'benefits',
+    ],
+    'company': [
+        'bedrijfsprofiel', 'bedrijf', 'over ons', 'wie zijn wij', 'wie zijn we', 'de organisatie',
+        'over de organisatie', 'organisatie', 'werkgever', 'about us', 'the company', 'company',
+    ],
+    'contact': [
+        'informatie', 'meer informatie', 'contact', 'interesse', 'solliciteren', 'sollicitatie',
+        'procedure', 'how to apply',
+    ],
+}
+HEADING_KEYWORDS = sorted(
+    ((keyword, section) for section, keywords in SECTION_KEYWORDS.items() for keyword in keywords),
+    key=lambda item: -len(item[0]))
+
+# Sections whose text is matched, in the order used to tag a hit found in several sections.
+# 'intro' (text before the first heading) is mostly the company blurb and is only matched
+# when a posting has no recognised heading at all.
+MATCHED_SECTIONS = ('profile', 'role', 'other')
+
+# Sections never treated as boilerplate: they describe the vacancy itself, also when reposted
+PROTECTED_SECTIONS = ('profile', 'role')
+
+
+def heading_keyword(heading):
+    """(position of the keyword, section) for a heading text, or None when no keyword matches"""
+    heading = heading.lower()
+    for keyword, section in HEADING_KEYWORDS:
+        position = heading.find(keyword)
+        if position >= 0:
+            return position, section
+    return None
+
+
+def heading_section(heading):
+    """Section of a heading text, or None when no keyword matches"""
+    found = heading_keyword(heading)
+    return found[1] if found is not None else None
+
+
+class _BlockParser(HTMLParser):
+    """Collect the text blocks of an HTML document in one pass"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._parts = []
+        self._heading = False
+
+    def _flush(self):
+        text = ' '.join(''.join(self._parts).split())
+        if text:
+            self.blocks.append((text, self._heading))
+        self._parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._heading = tag in HEADING_TAGS
+
+    def handle_endtag(self, tag):
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._heading = False
+
+    def handle_data(self, data):
+        self._parts.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def html_blocks(html_text):
+    """(text, is_heading_tag) for every text block of a posting"""
+    if pd.isna(html_text):
+        return []
+    parser = _BlockParser()
+    parser.feed(html_text)
+    parser.close()
+    return parser.blocks
+
+
+def segment_html(html_text):
+    """
+    Split a posting into (section, text) blocks in one streaming pass
+
+    Blocks follow the <p>/<li>/heading structure; inline uppercase headings
+    ('FUNCTIEPROFIEL:', 'KANDIDAAT PROFIEL:', 'ARBEIDSVOORWAARDEN:') split a block
+    further. Short blocks ending in ':' or '?' and <h1>-<h6> blocks are headings
+    when they contain a known keyword. Text before the first heading is 'intro',
+    text under an unknown uppercase heading is 'other'. A known heading at the
+    start of a block ('Wat vragen wij: ...') also starts a section; when more
+    than a short lead-in ('Dit is jouw rol:') precedes its keyword, that text
+    stays in the previous section ('Leaseauto, laptop, telefoon Meer informatie:').
+    Block texts are lowercased.
+    """
+    section = 'intro'
+    segments = []
+    for text, is_heading_tag in html_blocks(html_text):
+        short = len(text.split()) <= 6
+        if is_heading_tag or (short and text.endswith((':', '?'))):
+            found = heading_section(text)
+            if found is not None:
+                section = found
+                continue
+
+        position = 0
+        lead = LEADING_HEADING.match(text)
+        if lead and not INLINE_HEADING.match(text):
+            found = heading_keyword(lead.group(1))
+            if found is not None:
+                before = text[:found[0]].strip()
+                if len(before.split()) > 2 or any(mark in before for mark in ',;'):
+                    segments.append((section, before.lower()))
+                section = found[1]
+                position = lead.end()
+
+        for match in INLINE_HEADING.finditer(text, position):
+            before = text[position:match.start()].strip()
+            if before:
+                segments.append((section, before.lower()))
+            section = heading_section(match.group(1)) or 'other'
+            position = match.end()
+        rest = text[position:].strip()
+        if rest:
+            segments.append((section, rest.lower()))
+    return segments
+
+
+class BoilerplateCache:
+    """
+    Per-organization cache of text blocks repeated across postings
+
+    A block that occurred in min_postings earlier postings of the same
+    organization is boilerplate (company blurbs, standard benefits) and is
+    skipped. Requirement and role blocks (PROTECTED_SECTIONS) are never
+    skipped: a reposted vacancy repeats its earlier role description, and a
+    repeated requirement is still a requirement of every posting.
+
+    Parameters:
+    min_postings (int): Number of postings after which a block counts as boilerplate
+    max_blocks (int): Blocks remembered per organization (the cache stops growing after that)
+    """
+
+    def __init__(self, min_postings=3, max_blocks=10000):
+        self.min_postings = min_postings
+        self.max_blocks = max_blocks
+        self.block_counts = {}
+        self.skipped = 0
+
+    def filter(self, organization, segments):
+        """Drop the boilerplate blocks of one posting and remember its blocks"""
+        if organization is None or pd.isna(organization):
+            return segments
+        counts = self.block_counts.setdefault(organization, Counter())
+
+        kept = []
+        for section, text in segments:
+            if section not in PROTECTED_SECTIONS and counts[hash(text)] >= self.min_postings:
+                self.skipped += 1
+            else:
+                kept.append((section, text))
+
+        for key in {hash(text) for section, text in segments if section not in PROTECTED_SECTIONS}:
+            if key in counts or len(counts) < self.max_blocks:
+                counts[key] += 1
+        return kept
+
+
+def section_texts(html_text, organization=None, boilerplate=None, sections=MATCHED_SECTIONS):
+    """
+    Text to match per section, in the order of sections
+
+    Company, offer and contact sections are left out (unless listed in
+    sections); with a BoilerplateCache the repeated blocks of the organization
+    are skipped as well. A posting without any recognised heading is all
+    'intro'; its intro is then matched, because there is nothing to separate.
+    """
+    segments = segment_html(html_text)
+    if 'intro' not in sections and all(section == 'intro' for section, _ in segments):
+        sections = (*sections, 'intro')
+    if boilerplate is not None:
+        segments = boilerplate.filter(organization, segments)
+
+    texts = {section: [] for section in sections}
+    for section, text in segments:
+        if section in texts:
+            texts[section].append(text)
+    return {section: '\n'.join(parts) for section, parts in texts.items() if parts}
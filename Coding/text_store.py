@@ -0,0 +1,198 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from csv_loader import iter_vacancy_csv, read_vacancy_csv
+from vacancy_columns import TEXT_COLUMN, posting_ids
+
+TEXT_FILE = 'texts.zst'
+BLOCKS_FILE = 'blocks.npy'
+INDEX_FILE = 'index.parquet'
+METADATA_FILE = 'metadata.parquet'
+
+
+class TextStoreWriter:
+    """
+    Write posting texts into zstd-compressed blocks with an offset index
+
+    Texts are appended to a block until it holds block_bytes of UTF-8; the block
+    is then compressed as one zstd frame. The index records, per posting id, the
+    block and the byte range inside the decompressed block.
+
+    Parameters:
+    store_dir (str): Output directory
+    block_bytes (int): Uncompressed size of a block
+    level (int): zstd compression level
+    """
+
+    def __init__(self, store_dir, block_bytes=1 << 20, level=3):
+        os.makedirs(store_dir, exist_ok=True)
+        self.store_dir = store_dir
+        self.block_bytes = block_bytes
+        self.codec = pa.Codec('zstd', compression_level=level)
+        self._file = open(os.path.join(store_dir, TEXT_FILE), 'wb')
+        self._block = []
+        self._block_size = 0
+        self.blocks = []
+        self.index = {'posting_id': [], 'block': [], 'start': [], 'length': []}
+
+    def add(self, posting_id, text):
+        """Add the text of one posting (missing texts are stored as length -1)"""
+        self.index['posting_id'].append(str(posting_id))
+        self.index['block'].append(len(self.blocks))
+        if text is None or pd.isna(text):
+            self.index['start'].append(0)
+            self.index['length'].append(-1)
+            return
+        data = str(text).encode('utf-8')
+        self.index['start'].append(self._block_size)
+        self.index['length'].append(len(data))
+        self._block.append(data)
+        self._block_size += len(data)
+        if self._block_size >= self.block_bytes:
+            self._flush_block()
+
+    def _flush_block(self):
+        if not self._block:
+            return
+        raw = b''.join(self._block)
+        compressed = self.codec.compress(raw, asbytes=True)
+        self.blocks.append((self._file.tell(), len(compressed), len(raw)))
+        self._file.write(compressed)
+        self._block = []
+        self._block_size = 0
+
+    def close(self):
+        self._flush_block()
+        self._file.close()
+        np.save(os.path.join(self.store_dir, BLOCKS_FILE), np.asarray(self.blocks, dtype=np.int64).reshape(-1, 3))
+        pd.DataFrame(self.index).to_parquet(os.path.join(self.store_dir, INDEX_FILE), index=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class TextStore:
+    """
+    Lazy access to the texts of a store written by TextStoreWriter
+
+    Only the blocks holding the requested postings are read and decompressed;
+    a small cache keeps the most recently used blocks, so fetching postings in
+    file order decompresses every block once.
+
+    Parameters:
+    store_dir (str): Store directory
+    cache_blocks (int): Number of decompressed blocks kept in memory
+    """
+
+    def __init__(self, store_dir, cache_blocks=8):
+        self.store_dir = store_dir
+        self.codec = pa.Codec('zstd')
+        self.blocks = np.load(os.path.join(store_dir, BLOCKS_FILE))
+        index = pd.read_parquet(os.path.join(store_dir, INDEX_FILE))
+        index = index[~index['posting_id'].duplicated(keep='last')]
+        self.index = index.set_index('posting_id')
+        self.cache_blocks = cache_blocks
+        self._cache = OrderedDict()
+        self._file = open(os.path.join(store_dir, TEXT_FILE), 'rb')
+
+    def __len__(self):
+        return len(self.index)
+
+    def _block(self, block):
+        if block in self._cache:
+            self._cache.move_to_end(block)
+            return self._cache[block]
+        offset, compressed_size, raw_size = self.blocks[block]
+        self._file.seek(offset)
+        raw = self.codec.decompress(self._file.read(compressed_size), decompressed_size=raw_size, asbytes=True)
+        self._cache[block] = raw
+        if len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
+        return raw
+
+    def get_many(self, ids):
+        """Texts of a batch of posting ids (None for missing texts or unknown ids)"""
+        rows = self.index.reindex(pd.Index(ids).astype(str))
+        blocks = rows['block'].fillna(-1).astype(np.int64).to_numpy()
+        starts = rows['start'].fillna(0).astype(np.int64).to_numpy()
+        lengths = rows['length'].fillna(-1).astype(np.int64).to_numpy()
+
+        texts = [None] * len(rows)
+        known = np.flatnonzero(lengths >= 0)
+        # Visit the postings block by block so each block is decompressed once per batch
+        for position in known[np.argsort(blocks[known], kind='stable')]:
+            start = starts[position]
+            texts[position] = self._block(blocks[position])[start:start + lengths[position]].decode('utf-8')
+        return texts
+
+    def get(self, posting_id):
+        return self.get_many([posting_id])[0]
+
+    def iter_texts(self, ids, batch_size=1000):
+        """Yield the texts of ids in order, fetching them in batches"""
+        ids = list(ids)
+        for start in range(0, len(ids), batch_size):
+            yield from self.get_many(ids[start:start + batch_size])
+
+    def close(self):
+        self._file.close()
+
+
+def split_text_column(input_filepath, store_dir, chunksize=100000, text_column=TEXT_COLUMN, block_bytes=1 << 20):
+    """
+    Move the HTML text of a vacancy CSV into a compressed text store
+
+    Writes store_dir/metadata.parquet with all other columns as strings (the
+    text column is dropped, the posting id stays) and the block store next to
+    it. Filter stages can then load the metadata only and fetch text lazily by
+    posting id.
+    """
+    print(f"Splitting {text_column} of {input_filepath} into {store_dir}...")
+    metadata = []
+    total_rows = 0
+    with TextStoreWriter(store_dir, block_bytes=block_bytes) as writer:
+        for chunk in iter_vacancy_csv(input_filepath, chunksize=chunksize):
+            for posting_id, text in zip(posting_ids(chunk), chunk[text_column]):
+                writer.add(posting_id, text)
+            metadata.append(chunk.drop(columns=text_column))
+            total_rows += len(chunk)
+            print(f"Stored {total_rows:,} texts in {len(writer.blocks):,} blocks...")
+
+    metadata_df = pd.concat(metadata, ignore_index=True) if metadata else pd.DataFrame()
+    metadata_df.to_parquet(os.path.join(store_dir, METADATA_FILE), index=False)
+
+    raw_bytes = sum(block[2] for block in writer.blocks)
+    stored_bytes = os.path.getsize(os.path.join(store_dir, TEXT_FILE))
+    print(f"Text store ready: {raw_bytes / 1e6:,.1f} MB of text in {stored_bytes / 1e6:,.1f} MB")
+    return TextStore(store_dir)
+
+
+def read_vacancies(input_filepath, columns=None):
+    """
+    Load a vacancy table from a CSV file or from a text store directory
+
+    A text store directory (or its metadata.parquet) gives the metadata without
+    the HTML text column.
+    """
+    if os.path.isdir(input_filepath):
+        input_filepath = os.path.join(input_filepath, METADATA_FILE)
+    if input_filepath.endswith('.parquet'):
+        return pd.read_parquet(input_filepath, columns=columns)
+    return read_vacancy_csv(input_filepath, usecols=columns)
+
+
+if __name__ == "__main__":
+    # File paths
+    input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_2017_2021.csv"
+    store_dir = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_2017_2021_text_store"
+
+    # Split once; dataset.py and dataset_marketing_agencies.py can then read store_dir instead of the CSV
+    split_text_column(input_file, store_dir)
@@ -0,0 +1,157 @@
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from csv_loader import read_vacancy_csv
+from skill_matcher import SkillMatcher
+
+# Marketing sub-roles and the title terms that identify them, most specific first.
+# A title gets the first role any of its terms matches. Terms only match at the start
+# of a word, so compounds that end in a term need their own entry ('eindredacteur').
+MARKETING_TITLE_ROLES = {
+    'seo_sea': [
+        'seo', 'sea specialist', 'sea marketeer', 'sea consultant', 'sea-specialist', 'sem specialist',
+        'zoekmachine', 'search engine', 'search specialist', 'google ads', 'adwords', 'ppc'
+    ],
+    'growth': [
+        'growth hacker', 'growth marketeer', 'growth marketer', 'growth marketing', 'growth manager'
+    ],
+    'performance_marketing': [
+        'performance marketeer', 'performance marketer', 'performance marketing', 'paid social',
+        'paid media', 'online campagne', 'campaign manager', 'campagnemanager', 'affiliate'
+    ],
+    'content': [
+        'content specialist', 'content marketeer', 'contentmarketeer', 'content marketer',
+        'content manager', 'contentmanager', 'content creator', 'content strateg', 'content editor',
+        'copywriter', 'redacteur', 'webredacteur', 'eindredacteur', 'hoofdredacteur'
+    ],
+    'social_media': [
+        'social media', 'socialmedia', 'community manager', 'influencer'
+    ],
+    'marketing_analytics': [
+        'marketing analist', 'marketing analyst', 'marketinganalist', 'web analist', 'webanalist',
+        'web analyst', 'marketing intelligence', 'crm analist', 'analytics specialist',
+        'cro specialist', 'conversie specialist', 'conversion specialist'
+    ],
+    'crm_email': [
+        'crm marketeer', 'crm specialist', 'crm manager', 'e-mail marketeer', 'email marketeer',
+        'e-mailmarketeer', 'emailmarketeer', 'e-mail marketing', 'email marketing', 'marketing automation'
+    ],
+    'brand_product': [
+        'brand manager', 'brandmanager', 'merkmanager', 'brand marketeer', 'product marketeer',
+        'productmarketeer', 'product marketing', 'trade marketeer', 'trade marketing', 'category marketeer'
+    ],
+    'online_marketing': [
+        'online marketeer', 'online marketer', 'online marketing', 'digital marketeer', 'digital marketer',
+        'digital marketing', 'digitale marketing', 'e-commerce marketeer', 'ecommerce marketeer',
+        'webmarketeer', 'onlinemarketeer', 'internet marketeer', 'online specialist'
+    ],
+    'marketing_management': [
+        'marketing manager', 'marketingmanager', 'head of marketing', 'hoofd marketing',
+        'marketing director', 'marketingdirecteur', 'marketing directeur', 'chief marketing',
+        'marketing lead', 'teamlead marketing'
+    ],
+    'communication': [
+        'communicatiemedewerker', 'communicatie medewerker', 'communicatieadviseur',
+        'communicatie adviseur', 'communicatiespecialist', 'communicatie specialist',
+        'communicatiemanager', 'communicatie', 'bedrijfscommunicatie', 'communications', 'communication',
+        'pr medewerker', 'pr-medewerker', 'public relations', 'woordvoerder', 'marcom'
+    ],
+    'marketing_general': [
+        'marketing', 'marketeer', 'marketer'
+    ],
+}
+
+ROLE_NAMES = list(MARKETING_TITLE_ROLES)
+
+# Title phrases that contain a role term but are not marketing roles; they are removed before matching
+TITLE_EXCLUSIONS = [
+    'executive search', 'communicatietechnolog', 'communicatie technolog', 'communication technolog',
+    'communications technolog'
+]
+
+
+class TitleClassifier:
+    """
+    Assign a marketing sub-role to position titles
+
+    Titles repeat heavily, so the column is factorized first and the multi-term
+    matcher only runs on the distinct titles; the labels are mapped back to the
+    rows through the factorize codes. Cost grows with the number of distinct
+    titles, not with the number of rows. Terms match at word starts only
+    ('Monteur telecommunicatie' is not a communication role) and the exclusion
+    phrases are removed first ('Executive search specialist' is not SEO).
+    """
+
+    def __init__(self, roles=MARKETING_TITLE_ROLES, exclusions=TITLE_EXCLUSIONS):
+        self.role_names = list(roles)
+        self.matcher = SkillMatcher.cached(
+            ((term, role_index) for role_index, terms in enumerate(roles.values()) for term in terms),
+            word_start=True)
+        self.exclusion_pattern = re.compile('|'.join(map(re.escape, exclusions))) if exclusions else None
+
+    def classify_unique(self, titles):
+        """Role label (or None) for every title in a list of distinct titles"""
+        lowered = [str(title).lower() for title in titles]
+        if self.exclusion_pattern is not None:
+            lowered = [self.exclusion_pattern.sub(' ', title) for title in lowered]
+        return [
+            self.role_names[min(role_ids)] if role_ids else None
+            for role_ids in self.matcher.match_many(lowered)
+        ]
+
+    def classify(self, titles):
+        """Role label per row of a title Series (None for non-marketing or missing titles)"""
+        codes, uniques = pd.factorize(titles)
+        labels = np.array(self.classify_unique(uniques) + [None], dtype=object)
+        # Missing titles have code -1, which picks the trailing None
+        return pd.Series(labels[codes], index=titles.index, name='marketing_role')
+
+
+TITLE_CLASSIFIER = TitleClassifier()
+
+
+def classify_titles(titles):
+    """Marketing sub-role per row of a positiontitle Series"""
+    return TITLE_CLASSIFIER.classify(titles)
+
+
+def benchmark_title_classifier(input_filepath, repeats=3):
+    """
+    Compare the old substring filter, a per-row classifier and the distinct-title classifier
+
+    Only the positiontitle column is loaded.
+    """
+    print(f"Loading position titles from {input_filepath}...")
+    titles = read_vacancy_csv(input_filepath, usecols=['positiontitle'])['positiontitle']
+    print(f"Rows: {len(titles):,}, distinct titles: {titles.nunique():,}")
+
+    def best_of(function):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = function()
+            timings.append(time.perf_counter() - start)
+        return min(timings), result
+
+    old_time, old_mask = best_of(lambda: titles.str.lower().str.contains('marketing', na=False))
+    row_time, _ = best_of(lambda: titles.map(
+        lambda title: TITLE_CLASSIFIER.classify_unique([title])[0] if pd.notna(title) else None))
+    new_time, labels = best_of(lambda: classify_titles(titles))
+
+    print(f"\nstr.contains('marketing'):     {old_time:.2f}s, {old_mask.sum():,} marketing rows")
+    print(f"Per-row classifier:            {row_time:.2f}s")
+    print(f"Distinct-title classifier:     {new_time:.2f}s, {labels.notna().sum():,} marketing rows")
+
+    print("\nRows per marketing sub-role:")
+    for role, count in labels.value_counts().items():
+        print(f"- {role}: {count:,} positions")
+
+
+if __name__ == "__main__":
+    # File path
+    input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_2017_2021.csv"
+
+    benchmark_title_classifier(input_file)
@@ -0,0 +1,218 @@
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from csv_loader import read_vacancy_csv
+
+# Hours, gender markers and other noise in position titles: 'online marketeer (32-40u)', 'marketeer m/v'
+BRACKETS = re.compile(r'\(.*?\)|\[.*?\]')
+GENDER_MARKERS = re.compile(r'\b(?:m/v/x|m/v|v/m|m/w|f/m|m/f)\b')
+HOURS = re.compile(r'\b\d+(?:\s*[-/]\s*\d+)?\s*(?:uur|u|hrs|hours|uren)\b')
+NON_LETTERS = re.compile(r'[^a-zà-ÿ]+')
+
+
+def normalize_title(title):
+    """Lowercased title without hours, gender markers, bracketed parts, digits and punctuation"""
+    if pd.isna(title):
+        return ''
+    title = str(title).lower()
+    title = BRACKETS.sub(' ', title)
+    title = GENDER_MARKERS.sub(' ', title)
+    title = HOURS.sub(' ', title)
+    return ' '.join(NON_LETTERS.sub(' ', title).split())
+
+
+class TitleClusterer:
+    """
+    Group position title variants into role families
+
+    Titles are normalized and deduplicated first, so the work grows with the
+    number of distinct titles. Every distinct title becomes a char n-gram
+    TF-IDF vector (word order does not matter much: 'marketeer online' and
+    'online marketeer' share almost all n-grams). Candidate neighbours are
+    found block by block with a sparse product against all titles on the
+    n-grams found in at most max_df of the titles, which keeps the products
+    sparse; a title made up of frequent n-grams only uses all of its n-grams.
+    Candidates are then scored on all n-grams and the top_k most similar
+    titles above the threshold are kept. The neighbour graph is split into
+    connected components (scipy.sparse.csgraph). A family is named
+    after its most frequent title, so the id stays the same as long as that
+    title leads the family; with the families of an earlier run the earlier
+    name is kept for the titles it covered.
+
+    Parameters:
+    threshold (float): Minimum cosine similarity of neighbouring titles
+    top_k (int): Neighbours kept per title
+    block_size (int): Titles per block of the similarity product
+    ngram_range (tuple): Character n-gram lengths
+    max_df (float): Maximum share of titles an n-gram used to find candidates may occur in (at least 50 titles)
+    """
+
+    def __init__(self, threshold=0.6, top_k=10, block_size=1000, ngram_range=(3, 4), max_df=0.02):
+        self.threshold = threshold
+        self.top_k = top_k
+        self.block_size = block_size
+        self.ngram_range = ngram_range
+        self.max_df = max_df
+        self.vectorizer = None
+        self.vectors = None
+        self.candidate_vectors = None
+        self.titles = []
+        self.families = {}
+
+    def _candidate_vectors(self):
+        """The title vectors without the frequent n-grams, except for titles that have no other n-grams"""
+        vectors = self.vectors
+        max_titles = max(50, int(self.max_df * len(self.titles)))
+        frequent = np.bincount(vectors.indices, minlength=vectors.shape[1])[vectors.indices] > max_titles
+        entry_rows = np.repeat(np.arange(vectors.shape[0]), np.diff(vectors.indptr))
+        only_frequent = np.bincount(entry_rows, weights=~frequent, minlength=vectors.shape[0]) == 0
+        keep = ~frequent | only_frequent[entry_rows]
+        return csr_matrix((vectors.data[keep], (entry_rows[keep], vectors.indices[keep])), shape=vectors.shape)
+
+    def _neighbours(self, block_rows):
+        """(row, column) pairs of the top_k neighbours above the threshold of a block of rows"""
+        block = self.candidate_vectors[block_rows.start:block_rows.stop]
+        candidates = (block @ self.candidate_vectors.T).tocoo()
+        rows = candidates.row.astype(np.int64) + block_rows.start
+        columns = candidates.col.astype(np.int64)
+
+        # Cosine similarity on all n-grams
+        scores = np.asarray(self.vectors[rows].multiply(self.vectors[columns]).sum(axis=1)).ravel()
+        keep = scores >= self.threshold
+        rows, columns, scores = rows[keep], columns[keep], scores[keep]
+
+        # top_k per row: rank within the row after sorting on (row, -score)
+        order = np.lexsort((-scores, rows))
+        rows, columns = rows[order], columns[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        return rows[rank < self.top_k], columns[rank < self.top_k]
+
+    def fit(self, titles, previous=None):
+        """
+        Cluster the distinct titles of a positiontitle Series
+
+        Parameters:
+        titles (Series): Position titles (one per posting, repeats weigh the family name)
+        previous (dict): {normalized title: role family} of an earlier run (see load_families)
+        """
+        started = time.perf_counter()
+        codes, uniques = pd.factorize(titles)
+        normalized = pd.Series([normalize_title(title) for title in uniques], dtype=object)
+        title_codes, distinct = pd.factorize(normalized)
+        rows = np.bincount(title_codes[codes[codes >= 0]], minlength=len(distinct))
+
+        keep = np.asarray([title != '' for title in distinct], dtype=bool)
+        self.titles = [title for title, kept in zip(distinct, keep) if kept]
+        rows = rows[keep]
+        if not self.titles:
+            self.families = {}
+            return self
+
+        self.vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=self.ngram_range,
+                                          sublinear_tf=True, dtype=np.float32)
+        try:
+            self.vectors = self.vectorizer.fit_transform(self.titles)
+        except ValueError:
+            # No title is as long as the shortest n-gram: every title is its own family
+            self.vectorizer = None
+            self.families = {title: title for title in self.titles}
+            return self
+        self.candidate_vectors = self._candidate_vectors()
+
+        pair_rows, pair_columns = [], []
+        for start in range(0, len(self.titles), self.block_size):
+            block_rows, block_columns = self._neighbours(range(start, min(start + self.block_size, len(self.titles))))
+            pair_rows.append(block_rows)
+            pair_columns.append(block_columns)
+        pair_rows = np.concatenate(pair_rows)
+        pair_columns = np.concatenate(pair_columns)
+        graph = coo_matrix((np.ones(len(pair_rows), dtype=np.int8), (pair_rows, pair_columns)),
+                           shape=(len(self.titles), len(self.titles)))
+        n_families, components = connected_components(graph, directed=False)
+
+        # Family name: earlier family with the most postings, else the most frequent title
+        previous = previous or {}
+        order = np.lexsort((np.asarray([len(title) for title in self.titles]), -rows, components))
+        names = {}
+        earlier = {}
+        for index in order:
+            component = components[index]
+            names.setdefault(component, self.titles[index])
+            family = previous.get(self.titles[index])
+            if family is not None:
+                votes = earlier.setdefault(component, {})
+                votes[family] = votes.get(family, 0) + rows[index]
+        for component, votes in earlier.items():
+            names[component] = max(votes.items(), key=lambda item: (item[1], item[0]))[0]
+
+        self.families = {title: names[component] for title, component in zip(self.titles, components)}
+        print(f"Clustered {len(uniques):,} title variants ({len(self.titles):,} normalized) "
+              f"into {n_families:,} role families in {time.perf_counter() - started:.1f}s")
+        return self
+
+    def assign(self, titles):
+        """
+        Role family per row of a positiontitle Series
+
+        Titles unseen by fit get the family of their most similar fitted title
+        when it passes the threshold, else their own normalized title.
+        """
+        codes, uniques = pd.factorize(titles)
+        normalized = [normalize_title(title) for title in uniques]
+        unseen = sorted({title for title in normalized if title and title not in self.families})
+        if unseen and self.vectorizer is not None:
+            vectors = self.vectorizer.transform(unseen)
+            similarities = (vectors @ self.vectors.T).tocsr()
+            for offset, title in enumerate(unseen):
+                start, end = similarities.indptr[offset], similarities.indptr[offset + 1]
+                values = similarities.data[start:end]
+                if len(values) and values.max() >= self.threshold:
+                    nearest = self.titles[similarities.indices[start + int(np.argmax(values))]]
+                    self.families[title] = self.families[nearest]
+        families = [self.families.get(title, title) if title else None for title in normalized]
+        labels = np.array(families + [None], dtype=object)
+        # Missing titles have code -1, which picks the trailing None
+        return pd.Series(labels[codes], index=titles.index, name='role_family')
+
+    def family_table(self):
+        """One row per normalized title with its role family"""
+        return pd.DataFrame({'title': list(self.families), 'role_family': list(self.families.values())})
+
+    def save(self, path):
+        self.family_table().to_parquet(path, index=False)
+
+
+def load_families(path):
+    """{normalized title: role family} saved by TitleClusterer.save, for fit(previous=...)"""
+    table = pd.read_parquet(path)
+    return dict(zip(table['title'], table['role_family']))
+
+
+def role_families(titles, previous=None, **kwargs):
+    """Cluster a positiontitle Series and return the role family per row"""
+    return TitleClusterer(**kwargs).fit(titles, previous=previous).assign(titles)
+
+
+if __name__ == "__main__":
+    import os
+
+    # File paths
+    input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_2017_2021.csv"
+    families_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/role_families.parquet"
+
+    # Only the titles are loaded; the names of an earlier run are kept where possible
+    titles = read_vacancy_csv(input_file, usecols=['positiontitle'])['positiontitle']
+    previous = load_families(families_file) if os.path.exists(families_file) else None
+    clusterer = TitleClusterer().fit(titles, previous=previous)
+    clusterer.save(families_file)
+
+    families = clusterer.assign(titles)
+    print("\nLargest role families:")
+    for family, count in families.value_counts().head(30).items():
+        print(f"- {family}: {count:,} positions")
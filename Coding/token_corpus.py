@@ -0,0 +1,216 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from csv_loader import iter_vacancy_csv
+from text_cleaning import clean_html
+from vacancy_columns import DATE_COLUMN, TEXT_COLUMN, posting_ids
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+VOCAB_FILE = 'vocab.json'
+TOKENS_FILE = 'tokens.int32'
+OFFSETS_FILE = 'offsets.npy'
+POSITIONS_FILE = 'positions.npy'
+TOKEN_STARTS_FILE = 'token_starts.npy'
+POSTINGS_FILE = 'postings.parquet'
+
+
+def tokenize(text):
+    """Word tokens of a cleaned text; 'data-analyse' and 'data analyse' give the same tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _counting_sort_positions(tokens, vocab_size, output_path, block_size=10_000_000):
+    """
+    Write all token positions grouped by token id (positions ascending within a token)
+
+    A chunked counting sort, so the whole token array never has to be argsorted
+    in memory. Returns the start of every token's run (length vocab_size + 1).
+    """
+    counts = np.zeros(vocab_size, dtype=np.int64)
+    for start in range(0, len(tokens), block_size):
+        counts += np.bincount(tokens[start:start + block_size], minlength=vocab_size)
+    token_starts = np.concatenate([[0], np.cumsum(counts)])
+
+    positions = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.int64, shape=(len(tokens),))
+    cursor = token_starts[:-1].copy()
+    for start in range(0, len(tokens), block_size):
+        block = np.asarray(tokens[start:start + block_size])
+        order = np.argsort(block, kind='stable')
+        sorted_tokens = block[order]
+        unique, first, run_lengths = np.unique(sorted_tokens, return_index=True, return_counts=True)
+        rank = np.arange(len(block)) - np.repeat(first, run_lengths)
+        positions[cursor[sorted_tokens] + rank] = order + start
+        cursor[unique] += run_lengths
+    positions.flush()
+    return token_starts
+
+
+def build_token_corpus(source, corpus_dir, chunksize=50000, text_column=TEXT_COLUMN):
+    """
+    Clean and tokenize every posting once into a memory-mapped corpus
+
+    Files in corpus_dir:
+    - vocab.json: token strings, the position is the token id
+    - tokens.int32: token ids of all postings back to back
+    - offsets.npy: start of every posting in tokens (plus the total at the end)
+    - positions.npy / token_starts.npy: positional inverted index (all positions of a token)
+    - postings.parquet: posting id and datefound per corpus row
+
+    Parameters:
+    source (str or DataFrame): CSV path (read in chunks) or DataFrame
+    corpus_dir (str): Output directory
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    if isinstance(source, pd.DataFrame):
+        chunks = (source.iloc[start:start + chunksize] for start in range(0, len(source), chunksize))
+    else:
+        chunks = iter_vacancy_csv(source, chunksize=chunksize)
+
+    vocab = {}
+    offsets = [0]
+    metadata = []
+    print(f"Tokenizing postings into {corpus_dir}...")
+    with open(os.path.join(corpus_dir, TOKENS_FILE), 'wb') as token_file:
+        for chunk in chunks:
+            dates = chunk[DATE_COLUMN] if DATE_COLUMN in chunk.columns else [None] * len(chunk)
+            for posting_id, html_text, date in zip(posting_ids(chunk), chunk[text_column], dates):
+                token_ids = [vocab.setdefault(token, len(vocab)) for token in tokenize(clean_html(html_text, ' '))]
+                np.asarray(token_ids, dtype=np.int32).tofile(token_file)
+                offsets.append(offsets[-1] + len(token_ids))
+                metadata.append((str(posting_id), date))
+            print(f"Tokenized {len(metadata):,} postings ({offsets[-1]:,} tokens, {len(vocab):,} distinct)...")
+
+    np.save(os.path.join(corpus_dir, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+    with open(os.path.join(corpus_dir, VOCAB_FILE), 'w', encoding='utf-8') as f:
+        json.dump(list(vocab), f, ensure_ascii=False)
+    postings = pd.DataFrame(metadata, columns=['posting_id', DATE_COLUMN])
+    postings[DATE_COLUMN] = pd.to_datetime(postings[DATE_COLUMN], errors='coerce')
+    postings.to_parquet(os.path.join(corpus_dir, POSTINGS_FILE), index=False)
+
+    tokens = _open_tokens(os.path.join(corpus_dir, TOKENS_FILE))
+    token_starts = _counting_sort_positions(tokens, len(vocab), os.path.join(corpus_dir, POSITIONS_FILE))
+    np.save(os.path.join(corpus_dir, TOKEN_STARTS_FILE), token_starts)
+    print(f"Corpus ready: {len(metadata):,} postings, {offsets[-1]:,} tokens")
+    return TokenCorpus(corpus_dir)
+
+
+def _open_tokens(path):
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.int32)
+    return np.memmap(path, dtype=np.int32, mode='r')
+
+
+class TokenCorpus:
+    """
+    Read-only view on a corpus built with build_token_corpus
+
+    Token arrays and the positional index are memory-mapped, so opening a
+    corpus is nearly free and worker processes share the same pages. Terms are
+    matched as token id sequences: the rarest token of a term is looked up in
+    the positional index and the other tokens are checked around it. Matching
+    is on whole tokens ('sea' does not match inside 'research').
+    """
+
+    def __init__(self, corpus_dir):
+        self.corpus_dir = corpus_dir
+        with open(os.path.join(corpus_dir, VOCAB_FILE), encoding='utf-8') as f:
+            self.vocab = json.load(f)
+        self.token_ids = {token: i for i, token in enumerate(self.vocab)}
+        self.tokens = _open_tokens(os.path.join(corpus_dir, TOKENS_FILE))
+        self.offsets = np.load(os.path.join(corpus_dir, OFFSETS_FILE), mmap_mode='r')
+        self.positions = np.load(os.path.join(corpus_dir, POSITIONS_FILE), mmap_mode='r')
+        self.token_starts = np.load(os.path.join(corpus_dir, TOKEN_STARTS_FILE))
+        self.postings = pd.read_parquet(os.path.join(corpus_dir, POSTINGS_FILE))
+        self._row_of = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def posting_tokens(self, index):
+        """Token ids of one posting (a view on the memory map)"""
+        return self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+    def posting_text(self, index):
+        """Cleaned text of one posting, rebuilt from its tokens"""
+        return ' '.join(self.vocab[token] for token in self.posting_tokens(index))
+
+    def index_of(self, ids):
+        """Corpus row of every posting id (-1 when the posting is not in the corpus)"""
+        if self._row_of is None:
+            self._row_of = pd.Series(np.arange(len(self)), index=self.postings['posting_id'].to_numpy())
+            self._row_of = self._row_of[~self._row_of.index.duplicated()]
+        rows = self._row_of.reindex(pd.Index(ids).astype(str))
+        return rows.fillna(-1).astype(np.int64).to_numpy()
+
+    def encode(self, term):
+        """Token ids of a term, or None when one of its tokens never occurs"""
+        token_ids = [self.token_ids.get(token) for token in tokenize(term)]
+        if not token_ids or None in token_ids:
+            return None
+        return np.asarray(token_ids, dtype=np.int64)
+
+    def find(self, term):
+        """Sorted corpus rows containing the term as a token sequence"""
+        sequence = self.encode(term)
+        if sequence is None:
+            return np.zeros(0, dtype=np.int64)
+
+        frequencies = self.token_starts[sequence + 1] - self.token_starts[sequence]
+        anchor = int(np.argmin(frequencies))
+        token = sequence[anchor]
+        starts = np.asarray(self.positions[self.token_starts[token]:self.token_starts[token + 1]]) - anchor
+        starts = starts[(starts >= 0) & (starts + len(sequence) <= len(self.tokens))]
+        for k, token in enumerate(sequence):
+            if k != anchor and len(starts):
+                starts = starts[self.tokens[starts + k] == token]
+
+        rows = np.searchsorted(self.offsets, starts, side='right') - 1
+        last_rows = np.searchsorted(self.offsets, starts + len(sequence) - 1, side='right') - 1
+        return np.unique(rows[rows == last_rows])
+
+    def match_terms(self, alias_pairs, rows=None):
+        """
+        Ids found per posting for (alias, id) pairs, e.g. registry.alias_pairs('market')
+
+        Returns a list of sorted id lists for the given corpus rows (default: all).
+        """
+        found_rows, found_ids = [], []
+        for alias, term_id in alias_pairs:
+            hits = self.find(alias)
+            found_rows.append(hits)
+            found_ids.append(np.full(len(hits), term_id, dtype=np.int64))
+        found_rows = np.concatenate(found_rows) if found_rows else np.zeros(0, dtype=np.int64)
+        found_ids = np.concatenate(found_ids) if found_ids else np.zeros(0, dtype=np.int64)
+
+        # Unique (row, id) pairs sorted by row, then split per row
+        n_ids = int(found_ids.max()) + 1 if len(found_ids) else 1
+        pairs = np.unique(found_rows * n_ids + found_ids)
+        pair_rows, pair_ids = np.divmod(pairs, n_ids)
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows)
+        bounds_start = np.searchsorted(pair_rows, rows, side='left')
+        bounds_end = np.searchsorted(pair_rows, rows, side='right')
+        return [pair_ids[start:end].tolist() for start, end in zip(bounds_start, bounds_end)]
+
+    def document_frequency(self, alias_pairs):
+        """Number of postings per id for (alias, id) pairs"""
+        counts = {}
+        rows_per_id = {}
+        for alias, term_id in alias_pairs:
+            rows_per_id.setdefault(term_id, []).append(self.find(alias))
+        for term_id, hits in rows_per_id.items():
+            counts[term_id] = len(np.unique(np.concatenate(hits)))
+        return pd.Series(counts, dtype='int64').sort_values(ascending=False, kind='stable')
+
+
+if __name__ == "__main__":
+    # File paths
+    input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_positions.csv"
+    corpus_dir = "/Users/dennishagen/Desktop/Verzameldocumenten master/digital_agency_corpus"
+
+    # Build once; later analyses open the memory-mapped corpus instead of cleaning the HTML again
+    build_token_corpus(input_file, corpus_dir)
@@ -0,0 +1,18 @@
+# Column names of the vacancy dump (dialogic_hu_2017_2021.csv)
+POSTING_ID_COLUMN = 'id'
+TEXT_COLUMN = 'selectedtextincludinghtml'
+DATE_COLUMN = 'datefound'
+
+
+def posting_ids(df):
+    """
+    Return the posting ids of a DataFrame
+
+    Uses the id column of the dump, else the posting_id column of saved results
+    (read_competency_lists, write_postings), else the row index.
+    """
+    if POSTING_ID_COLUMN in df.columns:
+        return df[POSTING_ID_COLUMN]
+    if 'posting_id' in df.columns:
+        return df['posting_id']
+    return df.index.to_series(index=df.index, name=POSTING_ID_COLUMN)
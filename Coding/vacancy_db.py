@@ -0,0 +1,180 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from csv_loader import iter_vacancy_csv
+
+DATE_COLUMNS = ['datefound', 'startingdate']
+INDEXED_COLUMNS = ['organizationname', 'datefound', 'positiontitle']
+
+
+def ingest_csv(input_filepath, db_path, table='vacancies', chunksize=100000):
+    """
+    Load the vacancy dump once into a local SQLite database
+
+    Values are stored as text; date columns are normalized to ISO timestamps
+    (NULL when they cannot be parsed, like pd.to_datetime(errors='coerce')).
+    Indexes are created on organizationname, datefound and positiontitle.
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    print(f"Ingesting {input_filepath} into {db_path}...")
+    conn = sqlite3.connect(db_path)
+    total_rows = 0
+    for chunk in iter_vacancy_csv(input_filepath, chunksize=chunksize):
+        for column in DATE_COLUMNS:
+            if column in chunk.columns:
+                dates = pd.to_datetime(chunk[column], errors='coerce')
+                chunk[column] = dates.dt.strftime('%Y-%m-%d %H:%M:%S').where(dates.notna(), None)
+        chunk.to_sql(table, conn, if_exists='append', index=False)
+        total_rows += len(chunk)
+        print(f"Ingested {total_rows:,} rows...")
+
+    for column in INDEXED_COLUMNS:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table} ("{column}")')
+    conn.commit()
+    conn.close()
+    print(f"Database ready with {total_rows:,} rows")
+    return VacancyDatabase(db_path, table)
+
+
+class VacancyDatabase:
+    """
+    Query backend over a vacancy database created with ingest_csv
+
+    Every method takes an optional SQL where clause (with ? parameters), so the
+    same distributions can be computed for any slice (per agency, year, province)
+    without reloading the CSV.
+    """
+
+    def __init__(self, db_path, table='vacancies'):
+        self.db_path = db_path
+        self.table = table
+        self.conn = sqlite3.connect(db_path)
+        self.columns = [row[1] for row in self.conn.execute(f'PRAGMA table_info({table})')]
+
+    def _where(self, where):
+        return f" WHERE {where}" if where else ""
+
+    def query(self, sql, params=()):
+        """Run a query and return the result as a DataFrame"""
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def count(self, where=None, params=()):
+        sql = f"SELECT COUNT(*) FROM {self.table}{self._where(where)}"
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def select(self, where=None, params=(), columns=None):
+        """Rows matching the where clause as a DataFrame (dates parsed)"""
+        column_sql = ', '.join(f'"{c}"' for c in columns) if columns else '*'
+        df = self.query(f"SELECT {column_sql} FROM {self.table}{self._where(where)} ORDER BY rowid", params)
+        for column in DATE_COLUMNS:
+            if column in df.columns:
+                df[column] = pd.to_datetime(df[column])
+        return df
+
+    def select_chunks(self, where=None, params=(), columns=None, chunksize=100000):
+        """Rows matching the where clause as a stream of DataFrames (dates left as ISO text)"""
+        column_sql = ', '.join(f'"{c}"' for c in columns) if columns else '*'
+        sql = f"SELECT {column_sql} FROM {self.table}{self._where(where)} ORDER BY rowid"
+        return pd.read_sql_query(sql, self.conn, params=params, chunksize=chunksize)
+
+    def value_counts(self, column, where=None, params=()):
+        """
+        Counts per value, like Series.value_counts(): missing values are skipped and
+        equal counts keep the order of first appearance
+        """
+        condition = f'"{column}" IS NOT NULL' + (f" AND ({where})" if where else "")
+        sql = (f'SELECT "{column}" AS value, COUNT(*) AS count FROM {self.table} WHERE {condition} '
+               f'GROUP BY "{column}" ORDER BY count DESC, MIN(rowid)')
+        result = self.query(sql, params)
+        return pd.Series(result['count'].to_numpy(), index=result['value'].to_numpy(), name='count')
+
+    def year_counts(self, column, where=None, params=()):
+        """Counts per year of a date column, sorted by year"""
+        condition = f'"{column}" IS NOT NULL' + (f" AND ({where})" if where else "")
+        sql = (f'SELECT CAST(substr("{column}", 1, 4) AS INTEGER) AS year, COUNT(*) AS count '
+               f'FROM {self.table} WHERE {condition} GROUP BY year ORDER BY year')
+        result = self.query(sql, params)
+        return pd.Series(result['count'].to_numpy(), index=result['year'].to_numpy(), name='count')
+
+    def pair_counts(self, row_column, col_column, where=None, params=(), row_by_year=False, col_by_year=False):
+        """
+        Counts per (row, column) value pair as a DataFrame with columns row, column, count;
+        rows missing either value are skipped and by_year counts a date column per year
+        """
+        def key(column, by_year):
+            return f'CAST(substr("{column}", 1, 4) AS INTEGER)' if by_year else f'"{column}"'
+
+        condition = f'"{row_column}" IS NOT NULL AND "{col_column}" IS NOT NULL' + (f" AND ({where})" if where else "")
+        sql = (f'SELECT {key(row_column, row_by_year)} AS "row", {key(col_column, col_by_year)} AS "column", '
+               f'COUNT(*) AS count FROM {self.table} WHERE {condition} GROUP BY 1, 2 ORDER BY MIN(rowid)')
+        return self.query(sql, params)
+
+    def distinct(self, column, where=None, params=()):
+        """Distinct non-missing values of a column"""
+        condition = f'"{column}" IS NOT NULL' + (f" AND ({where})" if where else "")
+        sql = f'SELECT DISTINCT "{column}" FROM {self.table} WHERE {condition}'
+        return [row[0] for row in self.conn.execute(sql, params)]
+
+    def register_values(self, name, column, values):
+        """
+        Store values in a temporary table and return a where clause selecting the
+        rows whose column is one of them (no limit on the number of values)
+        """
+        self.conn.execute(f"DROP TABLE IF EXISTS temp.{name}")
+        self.conn.execute(f"CREATE TEMP TABLE {name} (value TEXT PRIMARY KEY)")
+        self.conn.executemany(f"INSERT OR IGNORE INTO temp.{name} (value) VALUES (?)", ((v,) for v in values))
+        return f'"{column}" IN (SELECT value FROM temp.{name})'
+
+    def subset(self, where=None, params=()):
+        """A view on one slice of the table with the same counting methods"""
+        return VacancySubset(self, where, params)
+
+    def close(self):
+        self.conn.close()
+
+
+class VacancySubset:
+    """Slice of a VacancyDatabase defined by a where clause"""
+
+    def __init__(self, db, where=None, params=()):
+        self.db = db
+        self.where = where
+        self.params = tuple(params)
+        self.columns = db.columns
+
+    def __len__(self):
+        return self.db.count(self.where, self.params)
+
+    def value_counts(self, column):
+        return self.db.value_counts(column, self.where, self.params)
+
+    def year_counts(self, column):
+        return self.db.year_counts(column, self.where, self.params)
+
+    def pair_counts(self, row_column, col_column, row_by_year=False, col_by_year=False):
+        return self.db.pair_counts(row_column, col_column, self.where, self.params, row_by_year, col_by_year)
+
+    def select(self, columns=None):
+        return self.db.select(self.where, self.params, columns)
+
+    def select_chunks(self, columns=None, chunksize=100000):
+        return self.db.select_chunks(self.where, self.params, columns, chunksize)
+
+
+def in_clause(column, values):
+    """Where clause and parameters for column IN (values)"""
+    values = list(values)
+    return f'"{column}" IN ({", ".join("?" * len(values))})', values
+
+
+if __name__ == "__main__":
+    # File paths
+    input_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_2017_2021.csv"
+    db_file = "/Users/dennishagen/Desktop/Verzameldocumenten master/dialogic_hu_2017_2021.sqlite"
+
+    # Build the database once; dataset.py and dataset_marketing_agencies.py use it when it exists
+    ingest_csv(input_file, db_file)